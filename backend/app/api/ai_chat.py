@@ -1,6 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
+import time
 from ..services.gemini_service import gemini_service
+from ..services.streaming import sse_events, sse_response, stream_stats
 
 router = APIRouter()
 
@@ -25,6 +27,13 @@ async def ai_chat(request: ChatRequest):
         "context": request.context
     }
 
+@router.post("/chat/stream")
+async def ai_chat_stream(chat_request: ChatRequest, request: Request):
+    """AI chat streamed as Server-Sent Events: "token" events, then "done" or "error"."""
+    started = time.perf_counter()
+    chunks = gemini_service.stream_explain_concept(chat_request.message, chat_request.level)
+    return sse_response(sse_events(request, chunks, started, lambda text: {"context": chat_request.context}))
+
 @router.post("/explain")
 async def explain_concept(request: ExplainRequest):
     """Explain a concept at different levels"""
@@ -37,10 +46,40 @@ async def explain_concept(request: ExplainRequest):
         "explanation": explanation
     }
 
+@router.post("/explain/stream")
+async def explain_concept_stream(explain_request: ExplainRequest, request: Request):
+    """Explanation streamed as Server-Sent Events: "token" events, then "done" or "error"."""
+    started = time.perf_counter()
+    chunks = gemini_service.stream_explain_concept(explain_request.concept, explain_request.level)
+    return sse_response(sse_events(
+        request, chunks, started,
+        lambda text: {"concept": explain_request.concept, "level": explain_request.level}
+    ))
+
 @router.get("/motivate")
 async def get_motivation():
     """Get motivational message"""
     return {
         "message": "You're doing great! Keep up the excellent work! 🚀",
         "tip": "Take breaks every 25 minutes to stay focused."
-    }
\ No newline at end of file
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get AI response cache hit/miss counters and coalesced concurrent requests"""
+    return {**gemini_service.cache.stats(), "single_flight": gemini_service.single_flight.stats()}
+
+@router.get("/usage")
+async def get_token_usage():
+    """Get model calls and prompt tokens sent, per generation method"""
+    return gemini_service.usage.stats()
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    """Get streamed response outcomes and time to first token"""
+    return stream_stats.stats()
+
+@router.get("/upstream")
+async def get_upstream_stats():
+    """Get rate limiter, retry and circuit breaker state for model calls"""
+    return gemini_service.upstream.stats()
@@ -0,0 +1,15 @@
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Per-request async session; an unfinished transaction is rolled back on close"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_current_user_id() -> str:
+    """Resolve the requesting user (a single demo user until JWT auth is implemented)"""
+    return settings.DEMO_USER_ID
@@ -1,23 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from typing import List, Optional
 from pydantic import BaseModel
 import os
-import uuid
+import re
+import time
 from datetime import datetime
 
-from ..models.database import SessionLocal, Document
+from ..models.database import Blob, Document, IngestionJob
+from ..services.folders import subtree_ids
 from ..services.gemini_service import gemini_service
+from ..services.ingestion import ingestion_queue, complete_document
+from ..services.retrieval import retrieve
+from ..services.storage import discard_upload, keep_upload, spool_upload, UploadTooLarge
+from ..services.streaming import sse_events, sse_response
+from ..services.study_sets import get_or_generate
 from ..core.config import settings
+from .deps import get_db, get_current_user_id
+from .pagination import keyset_page, split_page
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_owned_document(db: AsyncSession, document_id: str, user_id: str, with_blob: bool = False) -> Document:
+    query = select(Document).where(Document.id == document_id, Document.owner_id == user_id)
+    if with_blob:
+        # Relationships cannot lazy-load under asyncio
+        query = query.options(selectinload(Document.blob))
+    document = (await db.execute(query)).scalar_one_or_none()
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
+def ready_blob(document: Document) -> Blob:
+    """The document's blob once ingestion has produced its text"""
+    if document.blob is None or document.blob.status != "ready":
+        raise HTTPException(status_code=400, detail="Document text not available")
+    return document.blob
 
 class DocumentResponse(BaseModel):
     id: str
@@ -25,25 +47,75 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_type: str
     file_size: int
+    status: str
+    progress: int
+    error: Optional[str] = None
     ai_summary: str
     ai_tags: List[str]
     ai_key_concepts: List[str]
     created_at: datetime
 
+class DocumentSummary(BaseModel):
+    id: str
+    original_filename: str
+    file_type: str
+    file_size: int
+    status: str
+    progress: int
+    ai_summary: str
+    ai_tags: List[str]
+    created_at: datetime
+    updated_at: datetime
+
+class DocumentPage(BaseModel):
+    documents: List[DocumentSummary]
+    next_cursor: Optional[str]
+
+DOCUMENT_LIST_COLUMNS = (
+    Document.id, Document.original_filename, Document.file_type, Document.file_size, Document.status,
+    Document.progress, Document.ai_summary, Document.ai_tags, Document.created_at, Document.updated_at
+)
+
+class DocumentStatusResponse(BaseModel):
+    document_id: str
+    status: str
+    progress: int
+    error: Optional[str]
+    attempts: int
+
+class BlobUsage(BaseModel):
+    sha256: str
+    file_type: str
+    size: int
+    document_count: int
+
+class StorageUsageResponse(BaseModel):
+    blobs: List[BlobUsage]
+    unique_bytes: int
+    logical_bytes: int
+    saved_bytes: int
+
 class ChatRequest(BaseModel):
     question: str
 
+class ChunkCitation(BaseModel):
+    chunk: int
+    score: float
+    excerpt: str
+
 class ChatResponse(BaseModel):
     answer: str
     document_id: str
+    citations: List[ChunkCitation] = []
 
-@router.post("/upload", response_model=DocumentResponse)
+@router.post("/upload", response_model=DocumentResponse, status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     folder_id: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Upload and process document with AI"""
+    """Upload a document and queue it for text extraction and AI enrichment"""
     
     # Validate file type
     allowed_types = {
@@ -59,44 +131,63 @@ async def upload_document(
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="File type not supported")
     
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    extension = allowed_types[file.content_type]
-    filename = f"{file_id}{extension}"
-    
-    # Create upload directory if it doesn't exist
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(settings.UPLOAD_DIR, filename)
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # One pass over the upload: spool it to disk and hash it together
+    try:
+        stored = await spool_upload(file, settings.UPLOAD_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Extract text content (placeholder - would use actual extraction libraries)
-    extracted_text = await extract_text_from_file(file_path, file.content_type)
+    blob = None
+    try:
+        blob = await db.get(Blob, stored.sha256)
+        if blob is None:
+            # New content: keep it as a content-addressed file
+            filename = f"{stored.sha256}{allowed_types[file.content_type]}"
+            stored = keep_upload(stored, filename)
+            
+            blob = Blob(
+                sha256=stored.sha256,
+                file_path=stored.path,
+                file_type=file.content_type,
+                size=stored.size
+            )
+            db.add(blob)
+            try:
+                await db.commit()
+            except IntegrityError:
+                # A concurrent upload of the same bytes created the blob first
+                await db.rollback()
+                blob = await db.get(Blob, stored.sha256)
+    finally:
+        if stored.path != getattr(blob, "file_path", None):
+            # The bytes were already stored, or the request failed before they were kept
+            discard_upload(stored)
     
-    # Create document record
     document = Document(
-        filename=filename,
+        filename=os.path.basename(blob.file_path),
         original_filename=file.filename,
-        file_path=file_path,
+        file_path=blob.file_path,
         file_type=file.content_type,
-        file_size=len(content),
-        owner_id=str(uuid.uuid4()),  # TODO: Get from auth
+        file_size=blob.size,
+        content_hash=blob.sha256,
+        owner_id=user_id,
         folder_id=folder_id,
-        extracted_text=extracted_text
+        status="pending",
+        progress=0
     )
-    
-    # Generate AI enhancements
-    if extracted_text:
-        document.ai_summary = await gemini_service.generate_summary(extracted_text)
-        document.ai_tags = await gemini_service.extract_key_concepts(extracted_text)
-        document.ai_key_concepts = await gemini_service.extract_key_concepts(extracted_text)
-    
     db.add(document)
-    db.commit()
-    db.refresh(document)
+    await db.flush()
+    
+    if blob.status == "ready":
+        # Same bytes were ingested before: reuse their text and AI artifacts
+        await complete_document(db, document, blob)
+        await db.commit()
+    else:
+        # Extraction and enrichment run on the ingestion queue
+        ingestion_queue.enqueue(db, document)
+        await db.commit()
+        ingestion_queue.notify()
+    await db.refresh(document)
     
     return DocumentResponse(
         id=str(document.id),
@@ -104,117 +195,209 @@ async def upload_document(
         original_filename=document.original_filename,
         file_type=document.file_type,
         file_size=document.file_size,
+        status=document.status,
+        progress=document.progress,
+        error=document.error,
         ai_summary=document.ai_summary or "",
         ai_tags=document.ai_tags or [],
         ai_key_concepts=document.ai_key_concepts or [],
         created_at=document.created_at
     )
 
-@router.get("/", response_model=List[DocumentResponse])
-async def get_documents(folder_id: str = None, db: Session = Depends(get_db)):
-    """Get all documents, optionally filtered by folder"""
+@router.get("/", response_model=DocumentPage)
+async def get_documents(
+    folder_id: str = None,
+    include_subfolders: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """List documents newest first, a page at a time"""
     
-    # For demo purposes, return empty list since we don't have auth yet
-    # query = db.query(Document).filter(Document.owner_id == "temp-user-id")
-    documents = []
+    # Only the list columns are loaded; extracted text stays on the blob
+    query = select(Document).options(load_only(*DOCUMENT_LIST_COLUMNS)).where(Document.owner_id == user_id)
+    if folder_id and include_subfolders:
+        # The whole subtree in the same query, through the folders' materialized paths
+        query = query.where(Document.folder_id.in_(subtree_ids(user_id, folder_id)))
+    elif folder_id:
+        query = query.where(Document.folder_id == folder_id)
+    documents, next_cursor = split_page(
+        list((await db.execute(keyset_page(query, Document, cursor, limit))).scalars()), limit
+    )
     
-    # For demo purposes, return empty list
-    # if folder_id:
-    #     query = query.filter(Document.folder_id == folder_id)
-    # documents = query.all()
+    return DocumentPage(
+        documents=[
+            DocumentSummary(
+                id=str(doc.id),
+                original_filename=doc.original_filename,
+                file_type=doc.file_type,
+                file_size=doc.file_size,
+                status=doc.status,
+                progress=doc.progress or 0,
+                ai_summary=doc.ai_summary or "",
+                ai_tags=doc.ai_tags or [],
+                created_at=doc.created_at,
+                updated_at=doc.updated_at
+            )
+            for doc in documents
+        ],
+        next_cursor=next_cursor
+    )
+
+@router.get("/storage", response_model=StorageUsageResponse)
+async def get_storage_usage(
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Report disk usage per unique blob referenced by the user's documents"""
     
+    rows = (await db.execute(
+        select(
+            Blob.sha256,
+            Blob.file_type,
+            Blob.size,
+            func.count(Document.id)
+        ).join(Document, Document.content_hash == Blob.sha256).where(
+            Document.owner_id == user_id
+        ).group_by(Blob.sha256, Blob.file_type, Blob.size)
+    )).all()
+    
+    blobs = [
+        BlobUsage(sha256=sha256, file_type=file_type, size=size, document_count=count)
+        for sha256, file_type, size, count in rows
+    ]
+    unique_bytes = sum(b.size for b in blobs)
+    logical_bytes = sum(b.size * b.document_count for b in blobs)
+    
+    return StorageUsageResponse(
+        blobs=blobs,
+        unique_bytes=unique_bytes,
+        logical_bytes=logical_bytes,
+        saved_bytes=logical_bytes - unique_bytes
+    )
+
+@router.get("/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(
+    document_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Poll the ingestion status of an uploaded document"""
+    
+    document = await get_owned_document(db, document_id, user_id)
+    
+    job = (await db.execute(
+        select(IngestionJob).where(
+            IngestionJob.document_id == document.id
+        ).order_by(IngestionJob.created_at.desc()).limit(1)
+    )).scalar()
+    
+    return DocumentStatusResponse(
+        document_id=document_id,
+        status=document.status,
+        progress=document.progress or 0,
+        error=document.error,
+        attempts=job.attempts if job else 0
+    )
+
+def cited_chunks(answer: str, hits) -> List[ChunkCitation]:
+    # If the model cited nothing, report every excerpt it was given
+    cited = {int(n) for n in re.findall(r"\[(\d+)\]", answer)}
     return [
-        DocumentResponse(
-            id=str(doc.id),
-            filename=doc.filename,
-            original_filename=doc.original_filename,
-            file_type=doc.file_type,
-            file_size=doc.file_size,
-            ai_summary=doc.ai_summary or "",
-            ai_tags=doc.ai_tags or [],
-            ai_key_concepts=doc.ai_key_concepts or [],
-            created_at=doc.created_at
-        )
-        for doc in documents
+        ChunkCitation(chunk=chunk.ordinal, score=round(score, 4), excerpt=chunk.text[:300])
+        for number, (chunk, score) in enumerate(hits, start=1)
+        if number in cited or not cited
     ]
 
 @router.post("/{document_id}/chat", response_model=ChatResponse)
 async def chat_with_document(
     document_id: str,
     chat_request: ChatRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
 ):
     """Chat with a specific document"""
     
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == "temp-user-id"
-    ).first()
+    document = await get_owned_document(db, document_id, user_id, with_blob=True)
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    if not document.extracted_text:
+    # Only the most relevant chunks go into the prompt; the full text is never loaded
+    hits = await retrieve(db, ready_blob(document), chat_request.question, settings.RAG_TOP_K)
+    if not hits:
         raise HTTPException(status_code=400, detail="Document text not available")
-    
+    # Release the connection before the model call
+    await db.commit()
     answer = await gemini_service.chat_with_document(
-        document.extracted_text,
+        [chunk.text for chunk, _ in hits],
         chat_request.question
     )
     
     return ChatResponse(
         answer=answer,
-        document_id=document_id
+        document_id=document_id,
+        citations=cited_chunks(answer, hits)
     )
 
-@router.post("/{document_id}/flashcards")
-async def generate_flashcards(document_id: str, count: int = 10, db: Session = Depends(get_db)):
-    """Generate flashcards from document"""
+@router.post("/{document_id}/chat/stream")
+async def chat_with_document_stream(
+    document_id: str,
+    chat_request: ChatRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Document chat streamed as Server-Sent Events; the "done" event carries the citations"""
+    started = time.perf_counter()
+    document = await get_owned_document(db, document_id, user_id, with_blob=True)
     
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == "temp-user-id"
-    ).first()
+    hits = await retrieve(db, ready_blob(document), chat_request.question, settings.RAG_TOP_K)
+    if not hits:
+        raise HTTPException(status_code=400, detail="Document text not available")
+    # The session stays open until the response finishes, so end its transaction now
+    await db.commit()
+    chunks = gemini_service.stream_chat_with_document([chunk.text for chunk, _ in hits], chat_request.question)
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    return sse_response(sse_events(
+        request, chunks, started,
+        lambda answer: {
+            "document_id": document_id,
+            "citations": [citation.model_dump() for citation in cited_chunks(answer, hits)]
+        }
+    ))
+
+@router.post("/{document_id}/flashcards")
+async def generate_flashcards(
+    document_id: str,
+    count: int = Query(10, ge=1, le=50),
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Flashcards for a document, served from storage; regenerate=true stores a new version"""
     
-    flashcards = await gemini_service.generate_flashcards(document.extracted_text, count)
+    document = await get_owned_document(db, document_id, user_id, with_blob=True)
+    artifact = await get_or_generate(db, ready_blob(document), "flashcards", {"count": count}, regenerate)
     
-    return {"flashcards": flashcards}
+    if artifact is None:
+        return {"flashcards": []}
+    return {"flashcards": artifact.payload, "version": artifact.version, "generated_at": artifact.created_at}
 
 @router.post("/{document_id}/quiz")
 async def generate_quiz(
     document_id: str,
-    difficulty: str = "medium",
-    count: int = 5,
-    db: Session = Depends(get_db)
+    difficulty: str = Query("medium", pattern="^(easy|medium|hard)$"),
+    count: int = Query(5, ge=1, le=30),
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
 ):
-    """Generate quiz from document"""
+    """Quiz for a document, served from storage; regenerate=true stores a new version"""
     
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == "temp-user-id"
-    ).first()
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    quiz = await gemini_service.generate_quiz(document.extracted_text, difficulty, count)
-    
-    return quiz
-
-async def extract_text_from_file(file_path: str, content_type: str) -> str:
-    """Extract text from uploaded file - placeholder implementation"""
-    
-    if content_type == 'text/plain':
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    
-    # For other file types, you would use libraries like:
-    # - PyPDF2 or pdfplumber for PDFs
-    # - python-docx for DOCX files
-    # - python-pptx for PowerPoint files
-    # - OCR libraries like pytesseract for images
+    document = await get_owned_document(db, document_id, user_id, with_blob=True)
+    artifact = await get_or_generate(
+        db, ready_blob(document), "quiz", {"difficulty": difficulty, "count": count}, regenerate
+    )
     
-    return f"Extracted text from {content_type} file (placeholder implementation)"
\ No newline at end of file
+    if artifact is None:
+        return {"questions": []}
+    return {**artifact.payload, "version": artifact.version, "generated_at": artifact.created_at}
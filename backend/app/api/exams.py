@@ -1,43 +1,392 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import uuid
+
+import numpy as np
+
+from ..core.config import settings
+from ..models.database import Exam, ExamAttempt
+from ..services.exams import (
+    DIFFICULTY_LEVELS, assemble, bank_size, grade, question_banks, question_stats, resolve_sources, response_vector
+)
+from .deps import get_db, get_current_user_id
 
 router = APIRouter()
 
 class ExamRequest(BaseModel):
     subject: str
+    title: Optional[str] = None
     difficulty: str = "medium"
     question_count: int = 10
+    # Where questions come from: these notes and documents plus everything in the folder
+    note_ids: List[str] = []
+    document_ids: List[str] = []
+    folder_id: Optional[str] = None
+    include_subfolders: bool = True
 
-@router.post("/generate")
-async def generate_exam(request: ExamRequest):
-    """Generate exam questions"""
-    return {
-        "exam": {
-            "subject": request.subject,
-            "difficulty": request.difficulty,
-            "questions": [
-                {
-                    "id": 1,
-                    "question": "Sample question about " + request.subject,
-                    "options": ["A", "B", "C", "D"],
-                    "correct_answer": 0
-                }
-            ]
-        }
-    }
+class QuestionSource(BaseModel):
+    kind: str   # note or document
+    id: str
+
+class ExamQuestion(BaseModel):
+    id: int
+    question: str
+    options: List[str]
+    source: QuestionSource
+
+class ExamResponse(BaseModel):
+    id: str
+    title: str
+    subject: Optional[str]
+    difficulty: str
+    question_count: int
+    questions: List[ExamQuestion]   # without answers or explanations; those come back on submission
+    created_at: datetime
+
+class ExamSummary(BaseModel):
+    id: str
+    title: str
+    subject: Optional[str]
+    difficulty: str
+    question_count: int
+    attempts: int
+    best_score: Optional[float]
+    created_at: datetime
+
+class ExamSubmission(BaseModel):
+    answers: Dict[str, Optional[int]]   # question id -> chosen option index; omitted or null when skipped
+    duration_seconds: Optional[float] = None
+
+class QuestionResult(BaseModel):
+    id: int
+    answer: Optional[int]
+    correct_answer: int
+    correct: bool
+    explanation: Optional[str]
+
+class AttemptResult(BaseModel):
+    attempt_id: str
+    exam_id: str
+    score: float
+    correct: int
+    question_count: int
+    results: List[QuestionResult]
+    created_at: datetime
+
+class AttemptSummary(BaseModel):
+    id: str
+    score: float
+    correct: int
+    duration_seconds: Optional[float]
+    created_at: datetime
+
+class QuestionAnalytics(BaseModel):
+    id: int
+    question: str
+    accuracy: float
+    skip_rate: float
+    answer_counts: List[int]              # how often each option was chosen
+    common_wrong_answer: Optional[int]
+    discrimination: Optional[float]       # correlation of this question with the rest of the score
 
-@router.get("/")
-async def get_exams():
-    """Get all exams"""
-    return {"exams": []}
+class ExamAnalytics(BaseModel):
+    exam_id: str
+    attempts: int
+    mean_score: Optional[float]
+    questions: List[QuestionAnalytics]
 
-@router.post("/{exam_id}/submit")
-async def submit_exam(exam_id: str, answers: Dict[str, Any]):
-    """Submit exam answers for grading"""
-    return {"score": 85, "feedback": "Good job!"}
+async def get_owned_exam(db: AsyncSession, exam_id: str, user_id: str) -> Exam:
+    try:
+        exam_id = uuid.UUID(exam_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    exam = (await db.execute(
+        select(Exam).where(Exam.id == exam_id, Exam.owner_id == user_id)
+    )).scalar_one_or_none()
+    
+    if not exam:
+        raise HTTPException(status_code=404, detail="Exam not found")
+    return exam
+
+def parse_ids(values: List[str], field: str) -> List[uuid.UUID]:
+    try:
+        return [uuid.UUID(value) for value in values]
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{field} must be a list of valid ids")
+
+def exam_response(exam: Exam) -> ExamResponse:
+    return ExamResponse(
+        id=str(exam.id),
+        title=exam.title,
+        subject=exam.subject,
+        difficulty=exam.difficulty,
+        question_count=len(exam.questions),
+        questions=[ExamQuestion(**question) for question in exam.questions],
+        created_at=exam.created_at
+    )
+
+def answer_key(exam: Exam):
+    """The exam's correct options and option counts as arrays, in question order"""
+    return (
+        np.asarray(exam.answers, dtype=np.int16),
+        np.asarray([len(question["options"]) for question in exam.questions], dtype=np.int16)
+    )
+
+@router.post("/generate", response_model=ExamResponse)
+async def generate_exam(
+    request: ExamRequest,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Generate and store a multiple choice exam from the user's notes and documents"""
+    
+    if request.difficulty not in DIFFICULTY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"difficulty must be one of {', '.join(DIFFICULTY_LEVELS)}")
+    if not 1 <= request.question_count <= settings.EXAM_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400, detail=f"question_count must be between 1 and {settings.EXAM_MAX_QUESTIONS}"
+        )
+    
+    note_ids = parse_ids(request.note_ids, "note_ids")
+    document_ids = parse_ids(request.document_ids, "document_ids")
+    folder_id = None
+    if request.folder_id:
+        try:
+            folder_id = uuid.UUID(request.folder_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Folder not found")
+    
+    notes, documents = await resolve_sources(
+        db, user_id, note_ids, document_ids, folder_id, request.include_subfolders
+    )
+    if not notes and not documents:
+        raise HTTPException(status_code=400, detail="No notes or processed documents to draw questions from")
+    # No connection is held while the question banks are generated
+    await db.commit()
+    
+    banks = await question_banks(
+        notes, documents, request.difficulty, bank_size(request.question_count, len(notes) + len(documents))
+    )
+    exam_id = uuid.uuid4()
+    questions = assemble(banks, request.question_count, seed=exam_id.int)
+    
+    exam = Exam(
+        id=exam_id,
+        title=request.title or f"{request.subject} exam",
+        subject=request.subject,
+        difficulty=request.difficulty,
+        # The answer key is kept apart from the questions, so grading reads one array
+        questions=[{key: value for key, value in q.items() if key != "correct_answer"} for q in questions],
+        answers=[q["correct_answer"] for q in questions],
+        owner_id=user_id
+    )
+    db.add(exam)
+    await db.commit()
+    
+    return exam_response(exam)
+
+@router.get("/", response_model=List[ExamSummary])
+async def get_exams(
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """The user's exams, newest first, with their attempt count and best score"""
+    
+    attempts = (
+        select(
+            ExamAttempt.exam_id,
+            func.count().label("attempts"),
+            func.max(ExamAttempt.score).label("best_score")
+        ).group_by(ExamAttempt.exam_id).subquery()
+    )
+    rows = (await db.execute(
+        select(Exam, attempts.c.attempts, attempts.c.best_score)
+        .outerjoin(attempts, attempts.c.exam_id == Exam.id)
+        .where(Exam.owner_id == user_id)
+        .order_by(Exam.created_at.desc()).limit(limit)
+    )).all()
+    
+    return [
+        ExamSummary(
+            id=str(exam.id),
+            title=exam.title,
+            subject=exam.subject,
+            difficulty=exam.difficulty,
+            question_count=len(exam.questions),
+            attempts=count or 0,
+            best_score=best,
+            created_at=exam.created_at
+        )
+        for exam, count, best in rows
+    ]
 
 @router.get("/practice")
-async def get_practice_questions():
-    """Get practice questions"""
-    return {"questions": []}
\ No newline at end of file
+async def get_practice_questions(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """The questions the user has missed most often in their recent attempts, with answers"""
+    
+    rows = (await db.execute(
+        select(ExamAttempt.correct, Exam)
+        .join(Exam, Exam.id == ExamAttempt.exam_id)
+        .where(ExamAttempt.owner_id == user_id)
+        .order_by(ExamAttempt.created_at.desc()).limit(200)
+    )).all()
+    
+    misses: Counter = Counter()
+    questions: Dict[Any, Dict[str, Any]] = {}
+    for correct, exam in rows:
+        for index in np.flatnonzero(np.asarray(correct) == 0).tolist():
+            key = (exam.id, index)
+            misses[key] += 1
+            if key not in questions:
+                questions[key] = {
+                    **exam.questions[index], "exam_id": str(exam.id), "correct_answer": exam.answers[index]
+                }
+    
+    return {"questions": [{**questions[key], "times_missed": count} for key, count in misses.most_common(limit)]}
+
+@router.get("/{exam_id}", response_model=ExamResponse)
+async def get_exam(
+    exam_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Get an exam's questions, without answers"""
+    return exam_response(await get_owned_exam(db, exam_id, user_id))
+
+@router.delete("/{exam_id}")
+async def delete_exam(
+    exam_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Delete an exam and its attempts"""
+    
+    exam = await get_owned_exam(db, exam_id, user_id)
+    await db.delete(exam)
+    await db.commit()
+    
+    return {"message": "Exam deleted successfully"}
+
+@router.post("/{exam_id}/submit", response_model=AttemptResult)
+async def submit_exam(
+    exam_id: str,
+    submission: ExamSubmission,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Grade answers against the stored key and record the attempt; no model call is made"""
+    
+    exam = await get_owned_exam(db, exam_id, user_id)
+    key, _ = answer_key(exam)
+    responses = response_vector(
+        {question_id: choice for question_id, choice in submission.answers.items() if choice is not None}, len(key)
+    )
+    correct = grade(key, responses)
+    correct_count = int(correct.sum())
+    
+    attempt = ExamAttempt(
+        exam_id=exam.id,
+        owner_id=user_id,
+        responses=responses.tolist(),
+        correct=correct.astype(np.int8).tolist(),
+        correct_count=correct_count,
+        score=round(100 * correct_count / len(key), 2),
+        duration_seconds=submission.duration_seconds
+    )
+    db.add(attempt)
+    await db.commit()
+    
+    return AttemptResult(
+        attempt_id=str(attempt.id),
+        exam_id=str(exam.id),
+        score=attempt.score,
+        correct=correct_count,
+        question_count=len(key),
+        results=[
+            QuestionResult(
+                id=i + 1,
+                answer=answer if answer >= 0 else None,
+                correct_answer=right,
+                correct=hit,
+                explanation=question.get("explanation")
+            )
+            for i, (answer, right, hit, question) in enumerate(zip(
+                responses.tolist(), key.tolist(), correct.tolist(), exam.questions
+            ))
+        ],
+        created_at=attempt.created_at
+    )
+
+@router.get("/{exam_id}/attempts", response_model=List[AttemptSummary])
+async def get_attempts(
+    exam_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """The user's attempts at an exam, newest first"""
+    
+    exam = await get_owned_exam(db, exam_id, user_id)
+    attempts = (await db.execute(
+        select(ExamAttempt).where(ExamAttempt.exam_id == exam.id, ExamAttempt.owner_id == user_id)
+        .order_by(ExamAttempt.created_at.desc())
+    )).scalars()
+    
+    return [
+        AttemptSummary(
+            id=str(attempt.id),
+            score=attempt.score,
+            correct=attempt.correct_count,
+            duration_seconds=attempt.duration_seconds,
+            created_at=attempt.created_at
+        )
+        for attempt in attempts
+    ]
+
+@router.get("/{exam_id}/analytics", response_model=ExamAnalytics)
+async def get_exam_analytics(
+    exam_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Per-question accuracy, answer distribution and discrimination across every attempt"""
+    
+    exam = await get_owned_exam(db, exam_id, user_id)
+    responses = list((await db.execute(
+        select(ExamAttempt.responses).where(ExamAttempt.exam_id == exam.id)
+    )).scalars())
+    
+    if not responses:
+        return ExamAnalytics(exam_id=str(exam.id), attempts=0, mean_score=None, questions=[])
+    
+    key, option_counts = answer_key(exam)
+    matrix = np.asarray(responses, dtype=np.int16)
+    stats = question_stats(key, option_counts, matrix)
+    discrimination = [None if np.isnan(d) else round(float(d), 4) for d in stats["discrimination"]]
+    
+    return ExamAnalytics(
+        exam_id=str(exam.id),
+        attempts=len(responses),
+        mean_score=round(100 * float(stats["accuracy"].mean()), 2),
+        questions=[
+            QuestionAnalytics(
+                id=question["id"],
+                question=question["question"],
+                accuracy=round(float(stats["accuracy"][i]), 4),
+                skip_rate=round(float(stats["skip_rate"][i]), 4),
+                answer_counts=stats["picks"][i, :option_counts[i]].tolist(),
+                common_wrong_answer=int(stats["common_wrong"][i]) if stats["common_wrong"][i] >= 0 else None,
+                discrimination=discrimination[i]
+            )
+            for i, question in enumerate(exam.questions)
+        ]
+    )
@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from pydantic import BaseModel
+
+from ..models.database import Folder
+from ..services import folders
+from .deps import get_db, get_current_user_id
+
+router = APIRouter()
+
+class FolderCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    parent_id: Optional[str] = None
+
+class FolderUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+class FolderMove(BaseModel):
+    parent_id: Optional[str] = None   # None moves the folder to the top level
+
+class FolderNode(BaseModel):
+    id: str
+    name: str
+    description: Optional[str]
+    parent_id: Optional[str]
+    depth: int
+    ai_summary: Optional[str]     # rebuilt from the children's summaries shortly after they change
+    ai_tags: Optional[List[str]]
+    # Totals for this folder and everything below it
+    note_count: int
+    document_count: int
+    total_size: int
+    children: List["FolderNode"]
+
+class FolderTree(BaseModel):
+    folders: List[FolderNode]
+
+async def get_owned_folder(db: AsyncSession, folder_id: str, user_id: str) -> Folder:
+    folder = (await db.execute(
+        select(Folder).where(Folder.id == folder_id, Folder.owner_id == user_id)
+    )).scalar_one_or_none()
+    
+    if not folder:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return folder
+
+async def folder_node(db: AsyncSession, folder: Folder) -> FolderNode:
+    return FolderNode(**(await folders.folder_tree(db, folder.owner_id, root=folder))[0])
+
+@router.get("/tree", response_model=FolderTree)
+async def get_folder_tree(
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """All of the user's folders, nested, with note and document rollups"""
+    
+    return FolderTree(folders=await folders.folder_tree(db, user_id))
+
+@router.post("/", response_model=FolderNode)
+async def create_folder(
+    folder: FolderCreate,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Create a folder, at the top level or inside parent_id"""
+    
+    parent = await get_owned_folder(db, folder.parent_id, user_id) if folder.parent_id else None
+    db_folder = await folders.create_folder(db, user_id, folder.name, folder.description, parent)
+    await db.commit()
+    
+    return await folder_node(db, db_folder)
+
+@router.get("/{folder_id}", response_model=FolderNode)
+async def get_folder(
+    folder_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """A folder with its whole subtree"""
+    
+    return await folder_node(db, await get_owned_folder(db, folder_id, user_id))
+
+@router.put("/{folder_id}", response_model=FolderNode)
+async def update_folder(
+    folder_id: str,
+    folder_update: FolderUpdate,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Rename a folder or change its description"""
+    
+    folder = await get_owned_folder(db, folder_id, user_id)
+    if folder_update.name is not None:
+        folder.name = folder_update.name
+    if folder_update.description is not None:
+        folder.description = folder_update.description
+    if folder_update.name is not None:
+        # Subfolder names are part of the parent's summary
+        await folders.mark_dirty(db, folder.parent_id)
+    await db.commit()
+    
+    return await folder_node(db, folder)
+
+@router.post("/{folder_id}/move", response_model=FolderNode)
+async def move_folder(
+    folder_id: str,
+    target: FolderMove,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Move a folder, with everything below it, under another folder or to the top level"""
+    
+    folder = await get_owned_folder(db, folder_id, user_id)
+    parent = await get_owned_folder(db, target.parent_id, user_id) if target.parent_id else None
+    try:
+        await folders.move_folder(db, folder, parent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    
+    return await folder_node(db, folder)
+
+@router.delete("/{folder_id}")
+async def delete_folder(
+    folder_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Delete a folder and its subfolders; their notes and documents move up to its parent"""
+    
+    folder = await get_owned_folder(db, folder_id, user_id)
+    await folders.delete_folder(db, folder)
+    await db.commit()
+    
+    return {"message": "Folder deleted successfully"}
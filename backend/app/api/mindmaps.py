@@ -1,20 +1,11 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Dict, Any
 
-from ..models.database import SessionLocal
 from ..services.gemini_service import gemini_service
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class MindMapRequest(BaseModel):
     content: str
     title: str
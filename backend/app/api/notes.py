@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
+import logging
+import os
 import uuid
 
-from ..models.database import SessionLocal, Note, Folder
+from ..models.database import Note, Folder
+from ..services.folders import mark_dirty, subtree_ids
 from ..services.gemini_service import gemini_service
+from ..services.note_enrichment import content_signature, needs_enrichment
+from ..services.note_import import (
+    ImportProgress, ImportTooLarge, ndjson_records, note_importer, spool, zip_records
+)
+from ..services.resilience import AIError
+from ..services.vector_index import vector_store
+from ..services.write_queue import write_queue
+from .deps import get_db, get_current_user_id
+from .pagination import keyset_page, split_page
 
 router = APIRouter()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+logger = logging.getLogger(__name__)
 
 class NoteCreate(BaseModel):
     title: str
@@ -27,6 +35,41 @@ class NoteUpdate(BaseModel):
     content: Optional[str] = None
     folder_id: Optional[str] = None
 
+async def enrich_note(content: str) -> Optional[Dict[str, Any]]:
+    """AI fields for a note body, or None when generation fails so the save still goes through"""
+    try:
+        return await gemini_service.enrich(content)
+    except AIError as e:
+        logger.warning("Saving note without AI enrichment: %s", e)
+        return None
+
+async def get_owned_note(db: AsyncSession, note_id: str, user_id: str, with_content: bool = False) -> Note:
+    query = select(Note).where(Note.id == note_id, Note.owner_id == user_id)
+    if with_content:
+        query = query.options(undefer(Note.content))
+    note = (await db.execute(query)).scalar_one_or_none()
+    
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return note
+
+class NoteSummary(BaseModel):
+    id: str
+    title: str
+    folder_id: Optional[str]
+    ai_summary: Optional[str]
+    ai_tags: Optional[List[str]]
+    created_at: datetime
+    updated_at: datetime
+
+class NotePage(BaseModel):
+    notes: List[NoteSummary]
+    next_cursor: Optional[str]   # pass back as ?cursor= for the next page; None on the last page
+
+NOTE_LIST_COLUMNS = (
+    Note.id, Note.title, Note.folder_id, Note.ai_summary, Note.ai_tags, Note.created_at, Note.updated_at
+)
+
 class NoteResponse(BaseModel):
     id: str
     title: str
@@ -38,7 +81,10 @@ class NoteResponse(BaseModel):
     updated_at: datetime
 
 @router.post("/", response_model=NoteResponse)
-async def create_note(note: NoteCreate, db: Session = Depends(get_db)):
+async def create_note(
+    note: NoteCreate,
+    user_id: str = Depends(get_current_user_id)
+):
     """Create a new note with AI enhancement"""
     
     # Create note
@@ -46,17 +92,28 @@ async def create_note(note: NoteCreate, db: Session = Depends(get_db)):
         title=note.title,
         content=note.content,
         folder_id=note.folder_id,
-        owner_id=str(uuid.uuid4())  # TODO: Get from auth
+        owner_id=user_id
     )
     
-    # Generate AI enhancements
-    if note.content:
-        db_note.ai_summary = await gemini_service.generate_summary(note.content)
-        db_note.ai_tags = await gemini_service.extract_key_concepts(note.content)
+    # Generate AI enhancements before any transaction is opened
+    enrichment = await enrich_note(note.content) if note.content else None
+    if enrichment:
+        db_note.ai_summary = enrichment["summary"]
+        db_note.ai_tags = enrichment["tags"]
+        db_note.ai_difficulty = enrichment["difficulty"]
+        db_note.ai_signature = content_signature(note.content)
+    elif note.content:
+        # Saved without AI fields; the background enricher retries
+        db_note.ai_dirty_at = datetime.utcnow()
+    
+    async def insert(writer: AsyncSession) -> Note:
+        writer.add(db_note)
+        await mark_dirty(writer, db_note.folder_id)
+        return db_note
     
-    db.add(db_note)
-    db.commit()
-    db.refresh(db_note)
+    # Saved through the group-commit writer alongside other concurrent note saves
+    await write_queue.submit(insert)
+    await vector_store.index_note(db_note)
     
     return NoteResponse(
         id=str(db_note.id),
@@ -69,44 +126,126 @@ async def create_note(note: NoteCreate, db: Session = Depends(get_db)):
         updated_at=db_note.updated_at
     )
 
-@router.get("/", response_model=List[NoteResponse])
-async def get_notes(folder_id: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get all notes, optionally filtered by folder"""
-    
-    # For demo purposes, return empty list since we don't have auth yet
-    # query = db.query(Note).filter(Note.owner_id == "temp-user-id")
-    notes = []
-    
-    # For demo purposes, return empty list
-    # if folder_id:
-    #     query = query.filter(Note.folder_id == folder_id)
-    # notes = query.all()
-    
-    return [
-        NoteResponse(
-            id=str(note.id),
-            title=note.title,
-            content=note.content,
-            folder_id=str(note.folder_id) if note.folder_id else None,
-            ai_summary=note.ai_summary,
-            ai_tags=note.ai_tags,
-            created_at=note.created_at,
-            updated_at=note.updated_at
-        )
-        for note in notes
-    ]
+class BulkImportResponse(BaseModel):
+    import_id: str
+    status: str                          # importing, enriching or done
+    imported: int
+    skipped: int
+    errors: List[str]                    # the first few skipped lines or files, with the reason
+    enriched: int
+    enrichment_deferred: int             # left to the background enricher after a model failure
+    pending_enrichment: int
+    model_calls: int
+    seconds: float
+    notes_per_second: Optional[float]    # insert throughput
+    enriched_per_second: Optional[float]
+
+NDJSON_TYPES = {"application/x-ndjson", "application/jsonl", "application/json-lines", "application/x-jsonlines"}
+ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+@router.post("/bulk", response_model=BulkImportResponse, status_code=201)
+async def bulk_import_notes(
+    request: Request,
+    folder_id: Optional[str] = None,
+    enrich: bool = True,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Import many notes from an NDJSON body (one note per line) or a zip of markdown files
+    
+    Returns once every note is stored; AI enrichment carries on in the background,
+    and GET /api/notes/bulk/{import_id} reports how far it has got.
+    """
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in NDJSON_TYPES | ZIP_TYPES:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or application/zip")
+    
+    target_folder = None
+    if folder_id:
+        try:
+            target_folder = uuid.UUID(folder_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Folder not found")
+    
+    progress = ImportProgress(id=str(uuid.uuid4()), owner_id=str(user_id))
+    archive = None
+    try:
+        if content_type in ZIP_TYPES:
+            # Zip members are read by offset, so the body is spooled to disk first
+            archive = await spool(request.stream())
+            records = zip_records(archive, progress)
+        else:
+            records = ndjson_records(request.stream(), progress)
+        await note_importer.run(records, progress, folder_id=target_folder, enrich=enrich)
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    finally:
+        if archive:
+            os.remove(archive)
+    
+    return BulkImportResponse(**progress.snapshot())
+
+@router.get("/bulk/{import_id}", response_model=BulkImportResponse)
+async def get_bulk_import(
+    import_id: str,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Progress of a bulk import and its background enrichment"""
+    
+    progress = note_importer.get(import_id, user_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return BulkImportResponse(**progress.snapshot())
+
+@router.get("/", response_model=NotePage)
+async def get_notes(
+    folder_id: Optional[str] = None,
+    include_subfolders: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """List notes newest first, a page at a time; fetch a note by id for its content"""
+    
+    # Only the list columns are loaded, never the note bodies
+    query = select(Note).options(load_only(*NOTE_LIST_COLUMNS)).where(Note.owner_id == user_id)
+    if folder_id and include_subfolders:
+        # The whole subtree in the same query, through the folders' materialized paths
+        query = query.where(Note.folder_id.in_(subtree_ids(user_id, folder_id)))
+    elif folder_id:
+        query = query.where(Note.folder_id == folder_id)
+    notes, next_cursor = split_page(
+        list((await db.execute(keyset_page(query, Note, cursor, limit))).scalars()), limit
+    )
+    
+    return NotePage(
+        notes=[
+            NoteSummary(
+                id=str(note.id),
+                title=note.title,
+                folder_id=str(note.folder_id) if note.folder_id else None,
+                ai_summary=note.ai_summary,
+                ai_tags=note.ai_tags,
+                created_at=note.created_at,
+                updated_at=note.updated_at
+            )
+            for note in notes
+        ],
+        next_cursor=next_cursor
+    )
 
 @router.get("/{note_id}", response_model=NoteResponse)
-async def get_note(note_id: str, db: Session = Depends(get_db)):
+async def get_note(
+    note_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
     """Get a specific note"""
     
-    note = db.query(Note).filter(
-        Note.id == note_id,
-        Note.owner_id == "temp-user-id"
-    ).first()
-    
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    note = await get_owned_note(db, note_id, user_id, with_content=True)
     
     return NoteResponse(
         id=str(note.id),
@@ -120,32 +259,47 @@ async def get_note(note_id: str, db: Session = Depends(get_db)):
     )
 
 @router.put("/{note_id}", response_model=NoteResponse)
-async def update_note(note_id: str, note_update: NoteUpdate, db: Session = Depends(get_db)):
-    """Update a note with AI re-enhancement"""
+async def update_note(
+    note_id: str,
+    note_update: NoteUpdate,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Update a note; AI fields are refreshed in the background once edits settle"""
     
-    note = db.query(Note).filter(
-        Note.id == note_id,
-        Note.owner_id == "temp-user-id"
-    ).first()
+    note = await get_owned_note(db, note_id, user_id)
+    await db.commit()
     
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
-    
-    # Update fields
-    if note_update.title is not None:
-        note.title = note_update.title
-    if note_update.content is not None:
-        note.content = note_update.content
-        # Re-generate AI enhancements
-        note.ai_summary = await gemini_service.generate_summary(note_update.content)
-        note.ai_tags = await gemini_service.extract_key_concepts(note_update.content)
-    if note_update.folder_id is not None:
-        note.folder_id = note_update.folder_id
+    # Compared with the text the AI fields came from, so small edits do not re-enrich
+    drifted = note_update.content is not None and needs_enrichment(note.ai_signature, note_update.content)
     
-    note.updated_at = datetime.utcnow()
+    async def apply(writer: AsyncSession) -> Note:
+        # The response and the search indexes need the body
+        target = await writer.get(Note, note.id, options=[undefer(Note.content)])
+        if target is None:
+            raise HTTPException(status_code=404, detail="Note not found")
+        previous_folder_id = target.folder_id
+        
+        # Update fields
+        if note_update.title is not None:
+            target.title = note_update.title
+        if note_update.content is not None:
+            target.content = note_update.content
+            # Each save of a pending note restarts its debounce window
+            if drifted or target.ai_dirty_at is not None:
+                target.ai_dirty_at = datetime.utcnow()
+        if note_update.folder_id is not None:
+            target.folder_id = note_update.folder_id
+        
+        target.updated_at = datetime.utcnow()
+        if note_update.title is not None or note_update.folder_id is not None:
+            # Both folders' summaries list this note's title; the enricher flags them for summary changes
+            await mark_dirty(writer, previous_folder_id, target.folder_id)
+        return target
     
-    db.commit()
-    db.refresh(note)
+    note = await write_queue.submit(apply)
+    if note_update.title is not None or note_update.content is not None:
+        await vector_store.index_note(note)
     
     return NoteResponse(
         id=str(note.id),
@@ -159,18 +313,23 @@ async def update_note(note_id: str, note_update: NoteUpdate, db: Session = Depen
     )
 
 @router.delete("/{note_id}")
-async def delete_note(note_id: str, db: Session = Depends(get_db)):
+async def delete_note(
+    note_id: str,
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
     """Delete a note"""
     
-    note = db.query(Note).filter(
-        Note.id == note_id,
-        Note.owner_id == "temp-user-id"
-    ).first()
+    note = await get_owned_note(db, note_id, user_id)
+    await db.commit()
     
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    async def remove(writer: AsyncSession):
+        target = await writer.get(Note, note.id)
+        if target is not None:
+            await writer.delete(target)
+            await mark_dirty(writer, target.folder_id)
     
-    db.delete(note)
-    db.commit()
+    await write_queue.submit(remove)
+    await vector_store.remove(user_id, "note", note_id)
     
     return {"message": "Note deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+import base64
+import json
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+def encode_cursor(updated_at: datetime, item_id) -> str:
+    """Opaque cursor pointing just past an item in (updated_at, id) order"""
+    raw = json.dumps([updated_at.isoformat(), str(item_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, item_id = json.loads(raw)
+        return datetime.fromisoformat(updated_at), uuid.UUID(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(query, model, cursor: Optional[str], limit: int):
+    """Newest first on (updated_at, id), starting after the cursor; fetches one extra row to detect a next page"""
+    if cursor:
+        updated_at, item_id = decode_cursor(cursor)
+        # Bind with the columns' own types so ids compare in their stored form
+        query = query.where(tuple_(model.updated_at, model.id) < tuple_(
+            literal(updated_at, model.updated_at.type), literal(item_id, model.id.type)
+        ))
+    return query.order_by(model.updated_at.desc(), model.id.desc()).limit(limit + 1)
+
+def split_page(rows: List, limit: int) -> Tuple[List, Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the following page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].updated_at, rows[-1].id)
@@ -0,0 +1,128 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from typing import List
+from pydantic import BaseModel
+import time
+
+from ..models.database import Note, Document, TextChunk
+from ..services import fulltext
+from ..services.vector_index import vector_store, note_chunks
+from .deps import get_db, get_current_user_id
+
+router = APIRouter()
+
+class SearchHit(BaseModel):
+    kind: str          # note or document
+    id: str
+    title: str
+    snippet: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    took_ms: float
+
+class KeywordHit(BaseModel):
+    kind: str
+    id: str
+    title: str         # with <mark> highlights
+    snippet: str       # with <mark> highlights
+    rank: float
+
+class KeywordSearchResponse(BaseModel):
+    query: str
+    total: int
+    page: int
+    page_size: int
+    results: List[KeywordHit]
+
+@router.get("", response_model=SearchResponse)
+async def semantic_search(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Semantic search across the user's notes and documents"""
+    
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    
+    start = time.perf_counter()
+    # Over-fetch chunks since several may belong to the same item
+    hits = await vector_store.search(user_id, q, limit * 4)
+    took_ms = (time.perf_counter() - start) * 1000
+    
+    best = {}
+    for kind, item_id, chunk, score in hits:
+        if (kind, item_id) not in best:
+            best[(kind, item_id)] = (chunk, score)
+    top = list(best.items())[:limit]
+    
+    note_ids = [item_id for (kind, item_id), _ in top if kind == "note"]
+    document_ids = [item_id for (kind, item_id), _ in top if kind == "document"]
+    notes = {
+        str(note.id): note
+        for note in (await db.execute(
+            select(Note).options(undefer(Note.content)).where(Note.id.in_(note_ids), Note.owner_id == user_id)
+        )).scalars()
+    } if note_ids else {}
+    documents = {
+        str(doc.id): doc
+        for doc in (await db.execute(
+            select(Document).where(Document.id.in_(document_ids), Document.owner_id == user_id)
+        )).scalars()
+    } if document_ids else {}
+    # Snippets for every document hit in one query
+    chunk_keys = [
+        (documents[item_id].content_hash, chunk)
+        for (kind, item_id), (chunk, _) in top if kind == "document" and item_id in documents
+    ]
+    snippets = {
+        (blob_sha256, ordinal): text
+        for blob_sha256, ordinal, text in (await db.execute(
+            select(TextChunk.blob_sha256, TextChunk.ordinal, TextChunk.text).where(
+                tuple_(TextChunk.blob_sha256, TextChunk.ordinal).in_(chunk_keys)
+            )
+        )).all()
+    } if chunk_keys else {}
+    
+    results = []
+    for (kind, item_id), (chunk, score) in top:
+        if kind == "note" and item_id in notes:
+            note = notes[item_id]
+            chunks = note_chunks(note.title, note.content)
+            snippet = chunks[chunk] if chunk < len(chunks) else ""
+            results.append(SearchHit(kind=kind, id=item_id, title=note.title, snippet=snippet[:300], score=round(score, 4)))
+        elif kind == "document" and item_id in documents:
+            doc = documents[item_id]
+            snippet = snippets.get((doc.content_hash, chunk)) or ""
+            results.append(SearchHit(kind=kind, id=item_id, title=doc.original_filename, snippet=snippet[:300], score=round(score, 4)))
+    
+    return SearchResponse(query=q, results=results, took_ms=round(took_ms, 2))
+
+@router.get("/keyword", response_model=KeywordSearchResponse)
+async def keyword_search(
+    q: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    user_id: str = Depends(get_current_user_id)
+):
+    """Full-text keyword and "exact phrase" search with ranked, highlighted results"""
+    
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    
+    total, rows = await fulltext.search(db, user_id, q, page, page_size)
+    
+    return KeywordSearchResponse(
+        query=q,
+        total=total,
+        page=page,
+        page_size=page_size,
+        results=[KeywordHit(**row) for row in rows]
+    )
@@ -1,26 +1,136 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./afternote.db"
+    ASYNC_DATABASE_URL: Optional[str] = None   # derived from DATABASE_URL (aiosqlite / asyncpg) when unset
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20              # extra connections allowed above the pool size under load
+    DB_POOL_TIMEOUT: float = 30.0          # seconds to wait for a free connection
+    DB_POOL_PRE_PING: bool = True          # test connections on checkout so dropped ones are replaced
+    DB_POOL_RECYCLE: int = 1800            # seconds before a pooled connection is reopened
+    
+    # SQLite production profile, applied to every new connection (ignored for other databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"       # readers never block the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"     # fsync at checkpoints only; safe under WAL
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64000        # negative means KiB, so ~64MB of page cache per connection
+    SQLITE_BUSY_TIMEOUT: int = 30000       # ms to wait for the write lock before "database is locked"
+    
+    # Group commit
+    DB_GROUP_COMMIT: bool = True           # funnel note writes through a single writer that commits in batches
+    DB_GROUP_COMMIT_MAX: int = 64          # most writes folded into one commit
     
     # AI Configuration
     GEMINI_API_KEY: str = "your-gemini-api-key-here"
     GEMINI_MODEL: str = "gemini-1.5-flash"
+    LLM_PROVIDER: str = "gemini"       # gemini, or stub to run offline (benchmarks, CI)
+    LLM_TASK_MODELS: Dict[str, str] = {}   # per-method model overrides, e.g. {"condense": "gemini-1.5-flash-8b"}
+    LLM_STUB_LATENCY: float = 0.05     # seconds before the stub provider answers
+    LLM_STUB_TOKENS_PER_SECOND: float = 0.0  # stub output pace after that; 0 answers all at once
+    AI_MAX_CONCURRENCY: int = 8        # Max model calls in flight per worker
+    AI_REQUEST_TIMEOUT: float = 60.0   # Seconds before a model call is abandoned
+    
+    # Upstream protection
+    AI_RATE_LIMIT_RPM: int = 1000          # model calls per minute our Gemini quota allows
+    AI_RATE_LIMIT_BURST: int = 50          # calls allowed at once before the per-minute rate applies
+    AI_RATE_LIMIT_MAX_WAIT: float = 10.0   # seconds a call may wait for quota before failing
+    AI_RETRY_ATTEMPTS: int = 4             # tries per call on 429, 5xx and timeouts
+    AI_RETRY_BASE_DELAY: float = 0.5       # seconds; doubled per retry, with full jitter
+    AI_RETRY_MAX_DELAY: float = 20.0
+    AI_BREAKER_FAILURES: int = 5           # consecutive upstream failures that open the circuit
+    AI_BREAKER_RESET: float = 30.0         # seconds calls fail fast before one probe is let through
+    
+    # Prompt budgeting
+    AI_CHARS_PER_TOKEN: float = 4.0        # used to estimate prompt tokens from text length
+    AI_INPUT_TOKEN_BUDGET: int = 32000     # longer inputs are map-reduced down to this before the final call
+    AI_MAP_CHUNK_TOKENS: int = 8000        # input per map (condense) call
+    AI_MAP_SUMMARY_TOKENS: int = 800       # target length of each condensed piece
+    
+    # Streamed (SSE) responses
+    AI_STREAM_BUFFER: int = 32             # model chunks read ahead of a slow client before reading pauses
+    AI_STREAM_HEARTBEAT: float = 15.0      # seconds of model silence before a keep-alive comment is sent
     
     # Security
     SECRET_KEY: str = "your-super-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    DEMO_USER_ID: str = "00000000-0000-0000-0000-000000000001"  # the single user every request acts as (see api/deps.py)
     
     # File Storage
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024   # 1MB read/write chunks when streaming uploads
+    
+    # Stored text bodies (note content, extracted document text)
+    TEXT_COMPRESSION: str = "zlib"         # zlib, zstd (needs the zstandard package) or none
+    TEXT_COMPRESSION_MIN_BYTES: int = 256  # shorter bodies are stored uncompressed
+    
+    # Text extraction
+    EXTRACTION_WORKERS: int = 2            # files parsed at once, each in its own process
+    EXTRACTION_TIMEOUT: float = 300.0      # seconds per file
+    EXTRACTION_PAGE_BATCH: int = 20        # pages a worker sends at a time
+    
+    # Document chat retrieval
+    RAG_CHUNK_SIZE: int = 1200             # characters per chunk
+    RAG_CHUNK_OVERLAP: int = 200           # characters shared by neighbouring chunks
+    RAG_TOP_K: int = 5                     # chunks sent to the model per question
+    
+    # Flashcard and quiz sets
+    PREGENERATE_STUDY_SETS: bool = True    # build the default flashcard set and quiz when a document is ingested
+    
+    # Semantic search
+    VECTOR_INDEX_DIR: str = "vector_index"
+    EMBEDDING_DIM: int = 256
+    VECTOR_CODE_BITS: int = 256            # SimHash bits per chunk for candidate search
+    VECTOR_RERANK_CANDIDATES: int = 2048   # shortlist size re-ranked with exact cosine
+    
+    # Document ingestion queue
+    INGESTION_WORKERS: int = 2             # in-process workers; 0 when running worker.py separately
+    INGESTION_POLL_INTERVAL: float = 2.0   # seconds between queue polls when idle
+    INGESTION_MAX_ATTEMPTS: int = 5
+    INGESTION_RETRY_BACKOFF: float = 5.0   # base delay in seconds, doubled per attempt
+    INGESTION_JOB_LEASE: int = 15 * 60     # seconds before a running job is considered abandoned
+    
+    # Note re-enrichment after edits (autosave)
+    NOTE_REENRICH_DEBOUNCE: float = 10.0   # seconds a note must go unedited before its AI fields are refreshed
+    NOTE_REENRICH_SIMILARITY: float = 0.85 # edits keeping at least this much of the enriched text are not re-enriched
+    NOTE_REENRICH_POLL_INTERVAL: float = 2.0
+    NOTE_REENRICH_BATCH: int = 20
+    NOTE_MINHASH_PERMUTATIONS: int = 64    # signature size for estimating how much of a note changed
+    
+    # Bulk note import
+    NOTE_IMPORT_MAX_BYTES: int = 200 * 1024 * 1024  # largest NDJSON body or zip accepted, and a zip's unpacked size
+    NOTE_IMPORT_MAX_FILES: int = 50000     # entries a zip may hold
+    NOTE_IMPORT_MAX_FILE_BYTES: int = 10 * 1024 * 1024  # largest unpacked file in a zip; bigger ones are skipped
+    NOTE_IMPORT_BATCH: int = 500           # notes per insert transaction
+    NOTE_IMPORT_PACK_NOTES: int = 10       # short notes enriched together in one prompt
+    NOTE_IMPORT_PACK_TOKENS: int = 4000    # input budget of one packed prompt; longer notes go alone
+    NOTE_IMPORT_CONCURRENCY: int = 4       # enrichment calls in flight per import
+    
+    # Exams
+    EXAM_MAX_QUESTIONS: int = 100
+    EXAM_MAX_SOURCES: int = 20             # most recently updated notes and documents an exam draws on
+    EXAM_BANK_SIZE: int = 10               # question banks per source are generated in multiples of this
+    
+    # Folder summaries, rolled up from the summaries of each folder's notes, documents and subfolders
+    FOLDER_SUMMARIES: bool = True          # rebuild summaries of changed folders in the background
+    FOLDER_SUMMARY_DEBOUNCE: float = 30.0  # seconds a folder must go unchanged before it is re-summarized
+    FOLDER_SUMMARY_POLL_INTERVAL: float = 5.0
+    FOLDER_SUMMARY_BATCH: int = 20         # dirty folders summarized per pass, deepest first
+    FOLDER_SUMMARY_MAX_CHILDREN: int = 200 # most recently updated children listed in the prompt
     
     # Redis (for caching and real-time features)
     REDIS_URL: str = "redis://localhost:6379"
     
+    # AI response cache
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_TTL: int = 7 * 24 * 3600   # seconds
+    AI_CACHE_MAX_ENTRIES: int = 2048    # in-process LRU size
+    AI_CACHE_USE_REDIS: bool = False    # share cached responses across workers via REDIS_URL
+    AI_SINGLE_FLIGHT: bool = True       # identical concurrent requests share one model call
+    
     # Development settings
     DEBUG: bool = True
     ENVIRONMENT: str = "development"
@@ -1,12 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+import math
 import uvicorn
 import os
 
-from .api import auth, notes, documents, mindmaps, exams, ai_chat, community
+from .api import auth, notes, folders, documents, mindmaps, exams, ai_chat, community, search
 from .core.config import settings
-from .models.database import init_db
+from .models.database import async_engine, init_db
+from .services.extraction import shutdown_extraction_workers
+from .services.folder_summaries import folder_summarizer
+from .services.ingestion import ingestion_queue
+from .services.note_enrichment import note_enricher
+from .services.note_import import note_importer
+from .services.resilience import AIError
+from .services.write_queue import write_queue
 
 app = FastAPI(
     title="AfterNote API",
@@ -21,6 +30,28 @@ async def startup_event():
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     # Initialize database tables
     init_db()
+    # Start document ingestion workers
+    await ingestion_queue.start(settings.INGESTION_WORKERS)
+    # Refresh AI fields of edited notes, then summaries of folders whose contents changed
+    await note_enricher.start()
+    await folder_summarizer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingestion_queue.stop()
+    # Unfinished bulk-import enrichment is flagged for the note enricher on the next start
+    await note_importer.stop()
+    await note_enricher.stop()
+    await folder_summarizer.stop()
+    await write_queue.stop()
+    shutdown_extraction_workers()
+    await async_engine.dispose()
+
+@app.exception_handler(AIError)
+async def ai_error_handler(request: Request, exc: AIError):
+    # 503 with Retry-After while rate limited or upstream is down, 502 for unusable answers
+    headers = {"Retry-After": str(math.ceil(exc.retry_after))} if exc.retry_after else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
 
 # CORS middleware
 app.add_middleware(
@@ -34,11 +65,13 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(notes.router, prefix="/api/notes", tags=["notes"])
+app.include_router(folders.router, prefix="/api/folders", tags=["folders"])
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(mindmaps.router, prefix="/api/mindmaps", tags=["mindmaps"])
 app.include_router(exams.router, prefix="/api/exams", tags=["exams"])
 app.include_router(ai_chat.router, prefix="/api/ai", tags=["ai"])
 app.include_router(community.router, prefix="/api/community", tags=["community"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
 
 @app.get("/")
 async def root():
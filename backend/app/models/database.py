@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Float, Text, Boolean, ForeignKey, Index, JSON, LargeBinary, UniqueConstraint
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import deferred, sessionmaker, relationship
 from sqlalchemy.types import TypeDecorator, CHAR
 from datetime import datetime
 import uuid
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used when it is missing
+    zstandard = None
 
 from ..core.config import settings
 
@@ -37,11 +44,96 @@ class GUID(TypeDecorator):
                 return uuid.UUID(value)
             return value
 
+# Codec tag stored as the first byte of every compressed text value
+_RAW, _ZLIB, _ZSTD = b"\x00", b"\x01", b"\x02"
+
+def compress_text(text: str) -> bytes:
+    data = text.encode("utf-8")
+    if settings.TEXT_COMPRESSION == "none" or len(data) < settings.TEXT_COMPRESSION_MIN_BYTES:
+        return _RAW + data
+    if settings.TEXT_COMPRESSION == "zstd" and zstandard is not None:
+        return _ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+    return _ZLIB + zlib.compress(data, 6)
+
+def decompress_text(value: bytes) -> str:
+    codec, data = value[:1], value[1:]
+    if codec == _ZLIB:
+        data = zlib.decompress(data)
+    elif codec == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Text was stored with zstd; install the zstandard package to read it")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return data.decode("utf-8")
+
+# Large text bodies stored compressed; reads of rows written before compression pass through
+class CompressedText(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(bytes(value))
+
+def _async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver"""
+    for prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+def _pool_options(url: str) -> dict:
+    # In-memory SQLite uses a single static connection, which takes no pool sizing
+    if ":memory:" in url:
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        f"journal_mode = {settings.SQLITE_JOURNAL_MODE}",
+        f"synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"mmap_size = {settings.SQLITE_MMAP_SIZE}",
+        f"cache_size = {settings.SQLITE_CACHE_SIZE}",
+        f"busy_timeout = {settings.SQLITE_BUSY_TIMEOUT}",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+def apply_sqlite_pragmas(engine):
+    """Configure each new connection of a SQLite engine with the production pragmas"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+# Sync engine for schema creation, scripts and CLI maintenance tasks
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
+apply_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by request handlers and the ingestion workers
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or _async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL))
+apply_sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 class User(Base):
@@ -77,22 +169,32 @@ class Folder(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # AI-generated metadata
+    # Materialized path "/<root id>/.../<own id>/" and depth, maintained by services.folders
+    path = Column(String)
+    depth = Column(Integer, default=0)
+    
+    # AI-generated metadata, rolled up from the children's summaries
     ai_tags = Column(JSON)
     ai_summary = Column(Text)
+    ai_dirty_at = Column(DateTime)  # set when a child changes, cleared once the summary is rebuilt
     
     # Relationships
     owner = relationship("User", back_populates="folders")
-    parent = relationship("Folder", remote_side=[id])
-    children = relationship("Folder")
+    parent = relationship("Folder", remote_side=[id], back_populates="children")
+    children = relationship("Folder", back_populates="parent")
     notes = relationship("Note", back_populates="folder")
+    
+    # A subtree is a range scan on path within one owner's folders
+    __table_args__ = (
+        Index("ix_folders_owner_path", "owner_id", "path"),
+        Index("ix_folders_ai_dirty", "ai_dirty_at"),
+    )
 
 class Note(Base):
     __tablename__ = "notes"
     
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
-    content = Column(Text)
     folder_id = Column(GUID(), ForeignKey("folders.id"))
     owner_id = Column(GUID(), ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -102,10 +204,23 @@ class Note(Base):
     ai_summary = Column(Text)
     ai_tags = Column(JSON)
     ai_difficulty = Column(String)  # easy, medium, hard
+    ai_signature = Column(JSON)     # MinHash of the content the AI fields were generated from
+    ai_dirty_at = Column(DateTime)  # set by edits that need re-enrichment, cleared once it has run
+    
+    # Body last and deferred: SQLite spills the tail of a large row to overflow pages, so
+    # metadata stays on the main page, and queries only load the body when asked to
+    content = deferred(Column(CompressedText))
     
     # Relationships
     owner = relationship("User", back_populates="notes")
     folder = relationship("Folder", back_populates="notes")
+    
+    # Keyset pagination walks (updated_at, id) newest first, within a folder or across all of them
+    __table_args__ = (
+        Index("ix_notes_owner_folder_updated", "owner_id", "folder_id", "updated_at", "id"),
+        Index("ix_notes_owner_updated", "owner_id", "updated_at", "id"),
+        Index("ix_notes_ai_dirty", "ai_dirty_at"),
+    )
 
 class Document(Base):
     __tablename__ = "documents"
@@ -116,18 +231,110 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_size = Column(Integer)
+    content_hash = Column(String(64), ForeignKey("blobs.sha256"), index=True)
     owner_id = Column(GUID(), ForeignKey("users.id"))
     folder_id = Column(GUID(), ForeignKey("folders.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Ingestion pipeline state
+    status = Column(String, default="pending", index=True)  # pending, processing, ready, failed
+    progress = Column(Integer, default=0)                    # percent complete
+    error = Column(Text)
     
-    # AI-extracted content
-    extracted_text = Column(Text)
+    # AI-extracted content (copied from the blob once it has been enriched)
     ai_summary = Column(Text)
     ai_tags = Column(JSON)
     ai_key_concepts = Column(JSON)
     
     # Relationships
     owner = relationship("User", back_populates="documents")
+    blob = relationship("Blob", back_populates="documents")
+    jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_documents_owner_folder_updated", "owner_id", "folder_id", "updated_at", "id"),
+        Index("ix_documents_owner_updated", "owner_id", "updated_at", "id"),
+    )
+    
+    @property
+    def extracted_text(self):
+        return self.blob.extracted_text if self.blob else None
+
+class Blob(Base):
+    """Content-addressed file shared by every Document with the same bytes"""
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    file_path = Column(String, nullable=False)
+    file_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    status = Column(String, default="pending")  # pending, ready
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Computed once per blob and reused by every upload of the same bytes
+    ai_summary = Column(Text)
+    ai_tags = Column(JSON)
+    ai_key_concepts = Column(JSON)
+    
+    # Full text is only loaded for flashcards, quizzes and re-chunking (undefer it there)
+    extracted_text = deferred(Column(CompressedText))
+    
+    # Relationships
+    documents = relationship("Document", back_populates="blob")
+    chunks = relationship(
+        "TextChunk",
+        back_populates="blob",
+        order_by="TextChunk.ordinal",
+        cascade="all, delete-orphan"
+    )
+
+class TextChunk(Base):
+    """Overlapping slice of a blob's extracted text, with its BM25 term statistics"""
+    __tablename__ = "text_chunks"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), index=True, nullable=False)
+    ordinal = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    length = Column(Integer)      # token count, for BM25 length normalisation
+    term_freqs = Column(JSON)     # term -> occurrences in this chunk
+    
+    # Relationships
+    blob = relationship("Blob", back_populates="chunks")
+
+class StudyArtifact(Base):
+    """Generated flashcard set or quiz for a blob, versioned per generation parameters"""
+    __tablename__ = "study_artifacts"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=False)
+    kind = Column(String, nullable=False)        # flashcards, quiz
+    params = Column(String, nullable=False)      # canonical JSON of the generation parameters
+    version = Column(Integer, nullable=False, default=1)
+    model = Column(String)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("blob_sha256", "kind", "params", "version", name="uq_study_artifacts_version"),
+    )
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+    
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    document_id = Column(GUID(), ForeignKey("documents.id"), index=True)
+    status = Column(String, default="pending", index=True)  # pending, running, done, failed
+    attempts = Column(Integer, default=0)
+    run_after = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    document = relationship("Document", back_populates="jobs")
 
 class MindMap(Base):
     __tablename__ = "mindmaps"
@@ -152,8 +359,41 @@ class Exam(Base):
     subject = Column(String)
     owner_id = Column(GUID(), ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    attempts = relationship("ExamAttempt", back_populates="exam", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index("ix_exams_owner_created", "owner_id", "created_at"),
+    )
+
+class ExamAttempt(Base):
+    """One graded submission of an exam, kept per question for analytics"""
+    __tablename__ = "exam_attempts"
+    
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    exam_id = Column(GUID(), ForeignKey("exams.id"), nullable=False)
+    owner_id = Column(GUID(), ForeignKey("users.id"))
+    responses = Column(JSON, nullable=False)  # chosen option per question, -1 when unanswered
+    correct = Column(JSON, nullable=False)    # per question, 1 when right
+    correct_count = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)     # percent of questions answered correctly
+    duration_seconds = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    exam = relationship("Exam", back_populates="attempts")
+    
+    __table_args__ = (
+        Index("ix_exam_attempts_exam_created", "exam_id", "created_at"),
+        Index("ix_exam_attempts_owner_created", "owner_id", "created_at"),
+    )
 
 # Database initialization function
 def init_db():
     """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all leaves existing tables alone; bring ones from earlier versions up to date
+    from .migrations import upgrade_schema
+    upgrade_schema(engine)
+    # Keyword search tables are dialect-specific DDL, not ORM models
+    from ..services.fulltext import create_fulltext_index
+    create_fulltext_index(engine)
\ No newline at end of file
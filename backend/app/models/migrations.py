@@ -0,0 +1,185 @@
+"""
+Upgrades for databases created by earlier versions of the schema
+
+create_all only creates missing tables; it never alters one that exists.
+upgrade_schema() brings existing tables up to the models and is safe to run on
+every start (init_db does):
+
+  - adds the columns and indexes a table is missing
+  - turns note bodies and extracted text into CompressedText: PostgreSQL TEXT
+    columns become BYTEA, and plain-text values SQLite kept are compressed
+  - moves document text out of documents.extracted_text into a
+    content-addressed blob per file, as uploads are stored now
+  - fills in folder paths
+
+Search indexes are not part of the schema; rebuild them for existing data with
+    cd backend && python -m app.services.fulltext rebuild
+
+Run the upgrade on its own with:
+    cd backend && python -m app.models.migrations
+"""
+
+from datetime import datetime
+from typing import Dict
+import hashlib
+import os
+
+from sqlalchemy import bindparam, column, inspect, insert, select, text, update
+
+from .database import Base, Blob, CompressedText, Document, Folder, IngestionJob, Note, engine
+
+BATCH_SIZE = 500
+
+def _add_missing_columns(connection) -> int:
+    """ALTER TABLE ... ADD COLUMN for model columns an existing table lacks (nullable, no constraints)"""
+    inspector = inspect(connection)
+    added = 0
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for model_column in table.columns:
+            if model_column.name in existing:
+                continue
+            column_type = model_column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{model_column.name}" {column_type}'))
+            added += 1
+    return added
+
+def _create_missing_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def _compressed_columns():
+    return [
+        (table, model_column)
+        for table in Base.metadata.sorted_tables
+        for model_column in table.columns
+        if isinstance(model_column.type, CompressedText)
+    ]
+
+def _convert_text_columns(connection) -> int:
+    """Store plain-text bodies in the CompressedText format; returns the rows rewritten"""
+    inspector = inspect(connection)
+    rewritten = 0
+    for table, model_column in _compressed_columns():
+        if connection.dialect.name == "postgresql":
+            column_type = next(
+                c["type"] for c in inspector.get_columns(table.name) if c["name"] == model_column.name
+            )
+            if column_type.python_type is str:
+                # Tag the existing text as uncompressed; it is compressed the next time it is saved
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ALTER COLUMN "{model_column.name}" TYPE BYTEA '
+                    f"USING decode('00', 'hex') || convert_to(\"{model_column.name}\", 'UTF8')"
+                ))
+            continue
+
+        # SQLite keeps whatever type was written, so only rows from before compression hold text
+        key = list(table.primary_key.columns)[0]
+        legacy = text(
+            f'SELECT "{key.name}" FROM {table.name} WHERE typeof("{model_column.name}") = \'text\''
+        ).columns(column(key.name, key.type))
+        ids = list(connection.execute(legacy).scalars())
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            rows = connection.execute(select(key, model_column).where(key.in_(batch))).all()
+            values = {model_column.name: bindparam("_value")}
+            if "updated_at" in table.c:
+                # A format change is not an edit; keep onupdate from reordering the rows
+                values["updated_at"] = table.c.updated_at
+            connection.execute(
+                update(table).where(key == bindparam("_key")).values(values),
+                [{"_key": row[0], "_value": row[1]} for row in rows]
+            )
+            rewritten += len(rows)
+    return rewritten
+
+def _file_digest(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest(), os.path.getsize(path)
+
+def _move_document_text(connection) -> int:
+    """Give documents from before content-addressed storage a blob holding their file and text"""
+    documents = Document.__table__
+    has_legacy_text = "extracted_text" in {c["name"] for c in inspect(connection).get_columns("documents")}
+    legacy_text = column("extracted_text", CompressedText()) if has_legacy_text else None
+    columns = [
+        documents.c.id, documents.c.file_path, documents.c.file_type, documents.c.file_size,
+        documents.c.created_at, documents.c.ai_summary, documents.c.ai_tags, documents.c.ai_key_concepts
+    ]
+    # Documents from before the status column have none; ones given up on below are marked failed
+    rows = connection.execute(
+        select(*columns, *([legacy_text] if has_legacy_text else [])).where(
+            documents.c.content_hash.is_(None), documents.c.status.is_(None)
+        )
+    ).all()
+
+    for row in rows:
+        extracted_text = row.extracted_text if has_legacy_text else None
+        if os.path.exists(row.file_path):
+            sha256, size = _file_digest(row.file_path)
+        elif extracted_text is not None:
+            # The file is gone but its text survives; key the blob on that instead
+            sha256, size = hashlib.sha256(extracted_text.encode("utf-8")).hexdigest(), row.file_size or 0
+        else:
+            connection.execute(update(documents).where(documents.c.id == row.id).values(
+                status="failed", error="The uploaded file is missing; upload it again",
+                updated_at=row.created_at
+            ))
+            continue
+
+        ready = extracted_text is not None
+        if connection.execute(select(Blob.sha256).where(Blob.sha256 == sha256)).first() is None:
+            connection.execute(insert(Blob).values(
+                sha256=sha256,
+                file_path=row.file_path,
+                file_type=row.file_type,
+                size=size,
+                status="ready" if ready else "pending",
+                created_at=row.created_at or datetime.utcnow(),
+                extracted_text=extracted_text,
+                ai_summary=row.ai_summary,
+                ai_tags=row.ai_tags,
+                ai_key_concepts=row.ai_key_concepts
+            ))
+        connection.execute(update(documents).where(documents.c.id == row.id).values(
+            content_hash=sha256,
+            status="ready" if ready else "pending",
+            progress=100 if ready else 0,
+            updated_at=row.created_at
+        ))
+        if not ready:
+            # Never extracted: let the ingestion queue do it
+            connection.execute(insert(IngestionJob).values(document_id=row.id))
+
+    if has_legacy_text and rows:
+        # The text lives on the blobs now
+        connection.execute(text("UPDATE documents SET extracted_text = NULL WHERE extracted_text IS NOT NULL"))
+    return len(rows)
+
+def upgrade_schema(bind=engine) -> Dict[str, int]:
+    """Bring tables created by earlier versions up to the current models (idempotent)"""
+    with bind.begin() as connection:
+        counts = {"columns": _add_missing_columns(connection)}
+        _create_missing_indexes(connection)
+        counts["text_rows"] = _convert_text_columns(connection)
+        counts["documents"] = _move_document_text(connection)
+        missing_paths = connection.execute(select(Folder.id).where(Folder.path.is_(None)).limit(1)).first()
+
+    if missing_paths:
+        from ..services.folders import rebuild_paths
+        counts["folders"] = rebuild_paths()
+    return counts
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    counts = upgrade_schema()
+    print(
+        f"Added {counts['columns']} columns, converted {counts['text_rows']} text bodies, "
+        f"moved {counts['documents']} documents onto blobs, rebuilt {counts.get('folders', 0)} folder paths"
+    )
@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers asking for the same key
+
+    The first caller starts the call as a task; callers arriving before it
+    finishes await the same task and get a copy of its result (or its
+    exception). The task is shielded, so a caller that is cancelled, such as
+    a disconnected client, does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # Waiters must not share a mutable result with the leader
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self.leaders += 1
+        task = asyncio.ensure_future(call())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # Mark the error retrieved in case every caller was cancelled before it arrived
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / requests, 4) if requests else 0.0
+        }
+
+class ResponseCache:
+    """Content-addressed cache for model results: in-process LRU with an optional Redis tier"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: int,
+        redis_url: Optional[str] = None,
+        namespace: str = "afternote:ai:"
+    ):
+        self.ttl = ttl
+        self.namespace = namespace
+        self.memory = LRUCache(max_entries, ttl)
+        self.redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+                self.redis = aioredis.from_url(redis_url)
+            except ImportError:
+                logger.warning("redis package not installed; AI cache is in-process only")
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def make_key(method: str, model: str, params: Dict[str, Any], text: str) -> str:
+        """Hash (method, model, prompt parameters, input text) into a cache key"""
+        payload = json.dumps([method, model, params, text], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Any:
+        """Look a key up in memory, then Redis; returns None on a miss"""
+        # Entries are kept serialized so callers never share mutable results
+        raw = self.memory.get(key)
+        if raw is not None:
+            self.hits += 1
+            return json.loads(raw)
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self.namespace + key)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("AI cache Redis read failed: %s", e)
+                raw = None
+            if raw is not None:
+                self.memory.set(key, raw)
+                self.hits += 1
+                self.redis_hits += 1
+                return json.loads(raw)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        raw = json.dumps(value)
+        self.memory.set(key, raw)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self.namespace + key, raw, ex=self.ttl)
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning("AI cache Redis write failed: %s", e)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "redis_hits": self.redis_hits,
+            "redis_errors": self.redis_errors,
+            "entries": len(self.memory),
+            "max_entries": self.memory.max_entries,
+            "ttl": self.ttl,
+            "redis_enabled": self.redis is not None
+        }
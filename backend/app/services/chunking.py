@@ -0,0 +1,35 @@
+from typing import List
+
+# Preferred break points, strongest first
+_BOUNDARIES = ("\n\n", "\n", ". ", "? ", "! ", "; ", " ")
+
+def split_text(text: str, chunk_size: int, overlap: int = 0) -> List[str]:
+    """Split text into chunks of about chunk_size characters that overlap by `overlap`"""
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Break at the strongest boundary in the back half of the window
+            window = text[start + chunk_size // 2:end]
+            for boundary in _BOUNDARIES:
+                cut = window.rfind(boundary)
+                if cut != -1:
+                    end = start + chunk_size // 2 + cut + len(boundary)
+                    break
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        next_start = max(end - overlap, start + 1)
+        # Begin the overlap on a word boundary rather than mid-word
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    
+    return chunks
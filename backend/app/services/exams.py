@@ -0,0 +1,228 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import random
+import uuid
+
+import numpy as np
+from sqlalchemy import or_, select
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal, Blob, Document, Note
+from .folders import subtree_ids
+from .gemini_service import DIFFICULTY_LEVELS, gemini_service
+from .resilience import AIBadResponse, AIError
+from .study_sets import get_or_generate
+
+logger = logging.getLogger(__name__)
+
+UNANSWERED = -1
+
+def clean_question(question: Any) -> Optional[Dict[str, Any]]:
+    """A generated multiple choice question in stored form, or None if it cannot be graded"""
+    if not isinstance(question, dict) or not isinstance(question.get("question"), str):
+        return None
+    options = question.get("options")
+    answer = question.get("correct_answer")
+    if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) for o in options):
+        return None
+    if isinstance(answer, bool) or not isinstance(answer, int) or not 0 <= answer < len(options):
+        return None
+    explanation = question.get("explanation")
+    return {
+        "question": question["question"].strip(),
+        "options": [o.strip() for o in options],
+        "correct_answer": answer,
+        "explanation": explanation if isinstance(explanation, str) else None
+    }
+
+async def resolve_sources(
+    db,
+    owner_id: str,
+    note_ids: Sequence[uuid.UUID] = (),
+    document_ids: Sequence[uuid.UUID] = (),
+    folder_id: Optional[uuid.UUID] = None,
+    include_subfolders: bool = True
+) -> Tuple[List[uuid.UUID], List[Tuple[uuid.UUID, str]]]:
+    """The user's notes, and ready documents with their blob, an exam may draw on; newest first
+
+    Ids are parsed by the caller; ids the user does not own are ignored.
+    """
+    limit = settings.EXAM_MAX_SOURCES
+    note_filters, document_filters = [], []
+    if note_ids:
+        note_filters.append(Note.id.in_(note_ids))
+    if document_ids:
+        document_filters.append(Document.id.in_(document_ids))
+    if folder_id:
+        folders = subtree_ids(owner_id, folder_id) if include_subfolders else [folder_id]
+        note_filters.append(Note.folder_id.in_(folders))
+        document_filters.append(Document.folder_id.in_(folders))
+
+    notes = []
+    if note_filters:
+        notes = list((await db.execute(
+            select(Note.id).where(Note.owner_id == owner_id, or_(*note_filters))
+            .order_by(Note.updated_at.desc()).limit(limit)
+        )).scalars())
+    documents = []
+    if document_filters:
+        documents = [tuple(row) for row in (await db.execute(
+            select(Document.id, Document.content_hash).join(Blob, Blob.sha256 == Document.content_hash).where(
+                Document.owner_id == owner_id,
+                Blob.status == "ready",
+                or_(*document_filters)
+            ).order_by(Document.updated_at.desc()).limit(limit)
+        )).all()]
+    # Share the limit between the two kinds, alternating so neither crowds out the other
+    sources = [("note", n) for n in notes], [("document", d) for d in documents]
+    mixed = [s for pair in zip(*sources) for s in pair] + sources[0][len(documents):] + sources[1][len(notes):]
+    mixed = mixed[:limit]
+    return [s for kind, s in mixed if kind == "note"], [s for kind, s in mixed if kind == "document"]
+
+def bank_size(question_count: int, sources: int) -> int:
+    """Questions to ask of each source, rounded up to EXAM_BANK_SIZE so banks are reused across exam lengths"""
+    step = settings.EXAM_BANK_SIZE
+    per_source = -(-question_count // max(sources, 1))
+    return -(-per_source // step) * step
+
+async def _note_bank(note_id: uuid.UUID, difficulty: str, count: int) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
+        content = (await db.execute(select(Note.content).where(Note.id == note_id))).scalar()
+    if not content or not content.strip():
+        return []
+    # Keyed on the note text, so the bank is served from the response cache until the note changes
+    quiz = await gemini_service.generate_quiz(content, difficulty, count)
+    return quiz["questions"]
+
+async def _document_bank(sha256: str, difficulty: str, count: int) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
+        blob = await db.get(Blob, sha256)
+        # Stored per blob and parameters like the quiz endpoint's, so documents are asked once
+        artifact = await get_or_generate(db, blob, "quiz", {"difficulty": difficulty, "count": count})
+    return artifact.payload["questions"] if artifact else []
+
+async def question_banks(
+    notes: List[uuid.UUID],
+    documents: List[Tuple[uuid.UUID, str]],
+    difficulty: str,
+    count: int
+) -> List[List[Dict[str, Any]]]:
+    """One bank of gradable questions per source, each question tagged with where it came from
+
+    A source whose generation fails is left out; AIError is raised only when every source failed.
+    """
+    jobs = [(("note", note_id), _note_bank(note_id, difficulty, count)) for note_id in notes] + [
+        (("document", document_id), _document_bank(sha256, difficulty, count)) for document_id, sha256 in documents
+    ]
+    results = await asyncio.gather(*[job for _, job in jobs], return_exceptions=True)
+
+    banks, failures = [], []
+    for ((kind, source_id), _), result in zip(jobs, results):
+        if isinstance(result, AIError):
+            logger.warning("Exam questions from %s %s unavailable: %s", kind, source_id, result)
+            failures.append(result)
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        bank = []
+        for question in result:
+            question = clean_question(question)
+            if question is not None:
+                bank.append({**question, "source": {"kind": kind, "id": str(source_id)}})
+        banks.append(bank)
+    if failures and not any(banks):
+        raise failures[0]
+    return banks
+
+def assemble(banks: List[List[Dict[str, Any]]], count: int, seed: int) -> List[Dict[str, Any]]:
+    """Draw count questions round-robin across the shuffled banks, skipping repeats; ids are 1-based positions
+
+    Deterministic for a seed, so an exam can be rebuilt from the same banks.
+    """
+    rng = random.Random(seed)
+    pools = []
+    for bank in banks:
+        pool = list(bank)
+        rng.shuffle(pool)
+        pools.append(pool)
+
+    questions, seen = [], set()
+    while len(questions) < count and any(pools):
+        for pool in pools:
+            while pool:
+                question = pool.pop()
+                key = question["question"].lower()
+                if key not in seen:
+                    seen.add(key)
+                    questions.append(question)
+                    break
+            if len(questions) == count:
+                break
+    if not questions:
+        raise AIBadResponse("No usable exam questions were generated")
+
+    numbered = []
+    for i, question in enumerate(questions, 1):
+        # Models favour some answer positions; shuffle so the key is not guessable from them
+        order = list(range(len(question["options"])))
+        rng.shuffle(order)
+        numbered.append({
+            "id": i,
+            **question,
+            "options": [question["options"][j] for j in order],
+            "correct_answer": order.index(question["correct_answer"])
+        })
+    return numbered
+
+def response_vector(answers: Dict[str, Any], question_count: int) -> np.ndarray:
+    """Chosen option per question from {question id: option index}; UNANSWERED where missing or invalid"""
+    responses = np.full(question_count, UNANSWERED, dtype=np.int16)
+    for question_id, choice in answers.items():
+        try:
+            index, choice = int(question_id) - 1, int(choice)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < question_count and 0 <= choice < 2**15:
+            responses[index] = choice
+    return responses
+
+def grade(key: np.ndarray, responses: np.ndarray) -> np.ndarray:
+    """Per question (and per attempt, for a stack of responses), whether the chosen option is the key"""
+    return responses == key
+
+def question_stats(key: np.ndarray, option_counts: np.ndarray, responses: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-question analytics over an (attempts x questions) matrix of responses
+
+    accuracy and skip rate per question, the answer distribution, the most
+    chosen wrong option (-1 if none), and discrimination: the correlation of
+    getting the question right with the score on the rest of the exam, None
+    until there is spread in both.
+    """
+    attempts, questions = responses.shape
+    correct = grade(key, responses)
+    answered = responses != UNANSWERED
+    valid = answered & (responses < option_counts)
+
+    picks = np.zeros((questions, int(option_counts.max())), dtype=np.int64)
+    rows, cols = np.nonzero(valid)
+    np.add.at(picks, (cols, responses[rows, cols]), 1)
+    wrong = picks.copy()
+    wrong[np.arange(questions), key] = 0
+    common_wrong = np.where(wrong.max(axis=1) > 0, wrong.argmax(axis=1), -1)
+
+    right = correct.astype(np.float64)
+    rest = right.sum(axis=1, keepdims=True) - right
+    right_centered = right - right.mean(axis=0)
+    rest_centered = rest - rest.mean(axis=0)
+    denominator = np.sqrt((right_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discrimination = np.where(denominator > 0, (right_centered * rest_centered).sum(axis=0) / denominator, np.nan)
+
+    return {
+        "accuracy": right.mean(axis=0),
+        "skip_rate": 1 - answered.mean(axis=0),
+        "picks": picks,
+        "common_wrong": common_wrong,
+        "discrimination": discrimination
+    }
@@ -0,0 +1,237 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import asyncio
+import io
+import multiprocessing
+
+from ..core.config import settings
+
+class ExtractionError(Exception):
+    """Raised when text could not be extracted from a file"""
+
+class UnsupportedFormat(ExtractionError):
+    """Raised for files that can never be extracted; ingestion does not retry these"""
+
+class Extractor(ABC):
+    """Extracts text from one file format, a page (or slide) at a time
+
+    open() parses the file once per extraction; its result is what count_pages
+    and extract_pages receive.
+    """
+    mime_types: List[str] = []
+
+    def open(self, file_path: str) -> Any:
+        return file_path
+
+    def count_pages(self, document: Any) -> int:
+        return 1
+
+    @abstractmethod
+    def extract_pages(self, document: Any, start: int, stop: int) -> List[str]:
+        """Texts of pages start to stop (exclusive)"""
+
+class PlainTextExtractor(Extractor):
+    mime_types = ["text/plain"]
+
+    def extract_pages(self, document: str, start: int, stop: int) -> List[str]:
+        with open(document, "r", encoding="utf-8", errors="replace") as f:
+            return [f.read()]
+
+class PdfExtractor(Extractor):
+    mime_types = ["application/pdf"]
+
+    def open(self, file_path: str):
+        from PyPDF2 import PdfReader
+        return PdfReader(file_path)
+
+    def count_pages(self, document) -> int:
+        return len(document.pages)
+
+    def extract_pages(self, document, start: int, stop: int) -> List[str]:
+        return [document.pages[i].extract_text() or "" for i in range(start, stop)]
+
+class DocxExtractor(Extractor):
+    mime_types = ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+
+    def open(self, file_path: str):
+        import docx
+        return docx.Document(file_path)
+
+    def extract_pages(self, document, start: int, stop: int) -> List[str]:
+        # DOCX has no stored page breaks, so the whole body is a single page
+        parts = [p.text for p in document.paragraphs if p.text]
+        for table in document.tables:
+            for row in table.rows:
+                parts.append(" | ".join(cell.text for cell in row.cells))
+        return ["\n".join(parts)]
+
+class PptxExtractor(Extractor):
+    mime_types = ["application/vnd.openxmlformats-officedocument.presentationml.presentation"]
+
+    def open(self, file_path: str):
+        from pptx import Presentation
+        return Presentation(file_path)
+
+    def count_pages(self, document) -> int:
+        return len(document.slides)
+
+    def extract_pages(self, document, start: int, stop: int) -> List[str]:
+        slides = list(document.slides)[start:stop]
+        pages = []
+        for slide in slides:
+            texts = [
+                shape.text_frame.text
+                for shape in slide.shapes
+                if shape.has_text_frame and shape.text_frame.text
+            ]
+            pages.append("\n".join(texts))
+        return pages
+
+class LegacyPptExtractor(Extractor):
+    mime_types = ["application/vnd.ms-powerpoint"]
+
+    def extract_pages(self, document: str, start: int, stop: int) -> List[str]:
+        raise UnsupportedFormat("Legacy .ppt files are not supported; please convert to .pptx")
+
+class ImageExtractor(Extractor):
+    mime_types = ["image/jpeg", "image/png"]
+
+    def extract_pages(self, document: str, start: int, stop: int) -> List[str]:
+        import pytesseract
+        from PIL import Image
+        try:
+            with Image.open(document) as image:
+                return [pytesseract.image_to_string(image)]
+        except pytesseract.TesseractNotFoundError:
+            raise UnsupportedFormat("OCR is unavailable: tesseract is not installed on the server")
+
+_extractors: Dict[str, Extractor] = {}
+
+def register_extractor(extractor: Extractor):
+    """Register an extractor for each MIME type it handles"""
+    for mime_type in extractor.mime_types:
+        _extractors[mime_type] = extractor
+
+for _extractor in (
+    PlainTextExtractor(),
+    PdfExtractor(),
+    DocxExtractor(),
+    PptxExtractor(),
+    LegacyPptExtractor(),
+    ImageExtractor()
+):
+    register_extractor(_extractor)
+
+def get_extractor(content_type: str) -> Extractor:
+    extractor = _extractors.get(content_type)
+    if extractor is None:
+        raise UnsupportedFormat(f"No extractor for {content_type}")
+    return extractor
+
+def _extract_worker(file_path: str, content_type: str, batch: int, connection):
+    """Worker process: open the file once and send its pages over connection a batch at a time
+
+    Messages are ("pages", [...]) per batch, then ("done", None), or ("error", ExtractionError).
+    """
+    try:
+        extractor = get_extractor(content_type)
+        document = extractor.open(file_path)
+        page_count = extractor.count_pages(document)
+        for start in range(0, page_count, batch):
+            # Blocks while the pipe is full, so parsing runs at most a batch ahead of the consumer
+            connection.send(("pages", extractor.extract_pages(document, start, min(start + batch, page_count))))
+        connection.send(("done", None))
+    except ExtractionError as e:
+        connection.send(("error", e))
+    except Exception as e:
+        # Parser exceptions need not pickle; send their message instead
+        connection.send(("error", ExtractionError(f"Extraction failed: {e}")))
+    finally:
+        connection.close()
+
+# Workers fork from a server process that has this module (and the entry script) preloaded:
+# quick to start, and free of the app process's threads
+_context = multiprocessing.get_context("forkserver")
+_context.set_forkserver_preload(["__main__", __name__])
+_slots: Optional[asyncio.Semaphore] = None
+_workers: Set[multiprocessing.Process] = set()
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.EXTRACTION_WORKERS)
+    return _slots
+
+def shutdown_extraction_workers():
+    """Kill any extraction still running, e.g. on app shutdown"""
+    for worker in list(_workers):
+        worker.kill()
+
+async def _receive(connection):
+    """The next message from a worker, waiting on its pipe without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    readable = loop.create_future()
+    loop.add_reader(connection.fileno(), lambda: readable.done() or readable.set_result(None))
+    try:
+        await readable
+    finally:
+        loop.remove_reader(connection.fileno())
+    return connection.recv()
+
+async def iter_pages(file_path: str, content_type: str) -> AsyncIterator[str]:
+    """Yield page texts as a worker process extracts them, EXTRACTION_PAGE_BATCH pages at a time
+
+    Each file gets its own process, at most EXTRACTION_WORKERS at once. The process
+    is killed when the consumer is cancelled (by the extraction timeout, say) or
+    closes the iterator early, so a parser that hangs never keeps its slot.
+    """
+    get_extractor(content_type)  # fail fast on unknown types before starting a worker
+    async with _get_slots():
+        receiver, sender = _context.Pipe(duplex=False)
+        worker = _context.Process(
+            target=_extract_worker,
+            args=(file_path, content_type, settings.EXTRACTION_PAGE_BATCH, sender),
+            daemon=True
+        )
+        worker.start()
+        _workers.add(worker)
+        sender.close()
+        try:
+            while True:
+                try:
+                    kind, payload = await _receive(receiver)
+                except EOFError:
+                    worker.join()
+                    raise ExtractionError(f"Extraction worker exited unexpectedly (code {worker.exitcode})")
+                if kind == "error":
+                    raise payload
+                if kind == "done":
+                    break
+                for page in payload:
+                    yield page
+        finally:
+            if worker.is_alive():
+                worker.kill()
+            worker.join()
+            _workers.discard(worker)
+            receiver.close()
+
+async def extract_text_from_file(file_path: str, content_type: str) -> str:
+    """Extract text from an uploaded file in a worker process, bounded by EXTRACTION_TIMEOUT"""
+    # Pages are appended as their batch arrives; only the finished text is built as one string
+    text = io.StringIO()
+
+    async def collect():
+        async for page in iter_pages(file_path, content_type):
+            page = page.strip()
+            if page:
+                if text.tell():
+                    text.write("\n\n")
+                text.write(page)
+
+    try:
+        await asyncio.wait_for(collect(), timeout=settings.EXTRACTION_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ExtractionError(f"Extraction timed out after {settings.EXTRACTION_TIMEOUT}s")
+
+    return text.getvalue()
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import select, update
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal, Document, Folder, Note
+from .folders import mark_dirty
+from .gemini_service import gemini_service
+from .resilience import AIError
+
+logger = logging.getLogger(__name__)
+
+def _describe(kind: str, name: str, summary: Optional[str], tags: Optional[List[str]]) -> str:
+    line = f"- {kind} \"{name}\""
+    if summary:
+        line += f": {summary}"
+    if tags:
+        line += f" [{', '.join(tags)}]"
+    return line
+
+class FolderSummarizer:
+    """Background task that rebuilds the AI summary and tags of changed folders
+
+    Writes to a note, document or folder flag the affected folders and their
+    ancestors (services.folders.mark_dirty). Once a folder has gone
+    FOLDER_SUMMARY_DEBOUNCE seconds without another change it is summarized from
+    its children's stored summaries and tags, deepest folders first so parents
+    see their subfolders' fresh summaries. Raw note and document text is never
+    sent. An unchanged folder keeps its stored summary, and an unchanged set of
+    children is answered from the response cache.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.rebuilt = 0
+        self.failed = 0
+
+    async def start(self):
+        if not settings.FOLDER_SUMMARIES or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="folder-summarizer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Keep going while full batches come back; otherwise wait for the next poll
+                while await self.run_once() >= settings.FOLDER_SUMMARY_BATCH:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Folder summary pass crashed")
+            await asyncio.sleep(settings.FOLDER_SUMMARY_POLL_INTERVAL)
+
+    async def run_once(self) -> int:
+        """Summarize one batch of folders whose debounce window has passed; returns how many were due"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.FOLDER_SUMMARY_DEBOUNCE)
+        async with AsyncSessionLocal() as db:
+            due = (await db.execute(
+                select(Folder.id, Folder.ai_dirty_at).where(
+                    Folder.ai_dirty_at.is_not(None),
+                    Folder.ai_dirty_at <= cutoff
+                ).order_by(Folder.depth.desc()).limit(settings.FOLDER_SUMMARY_BATCH)
+            )).all()
+        for folder_id, dirty_at in due:
+            await self._summarize(folder_id, dirty_at)
+        return len(due)
+
+    async def _summarize(self, folder_id: uuid.UUID, dirty_at: datetime):
+        limit = settings.FOLDER_SUMMARY_MAX_CHILDREN
+        async with AsyncSessionLocal() as db:
+            folder = await db.get(Folder, folder_id)
+            if folder is None or folder.ai_dirty_at != dirty_at:
+                # Deleted, or changed again (e.g. a subfolder's rebuild failed) since this pass started
+                return
+            subfolders = (await db.execute(
+                select(Folder.name, Folder.ai_summary, Folder.ai_tags).where(Folder.parent_id == folder_id)
+                .order_by(Folder.updated_at.desc()).limit(limit)
+            )).all()
+            notes = (await db.execute(
+                select(Note.title, Note.ai_summary, Note.ai_tags).where(Note.folder_id == folder_id)
+                .order_by(Note.updated_at.desc()).limit(limit)
+            )).all()
+            documents = (await db.execute(
+                select(Document.original_filename, Document.ai_summary, Document.ai_tags)
+                .where(Document.folder_id == folder_id, Document.status == "ready")
+                .order_by(Document.updated_at.desc()).limit(limit)
+            )).all()
+            # No connection is held while the model runs
+            await db.commit()
+
+        children = (
+            [_describe("Folder", *row) for row in subfolders] +
+            [_describe("Note", *row) for row in notes] +
+            [_describe("Document", *row) for row in documents]
+        )[:limit]
+        summary = tags = None
+        if children:
+            try:
+                result = await gemini_service.summarize_folder(folder.name, children)
+            except AIError as e:
+                # Re-flag it and its ancestors, so neither is rebuilt before another debounce window
+                logger.warning("Folder %s summary deferred: %s", folder_id, e)
+                self.failed += 1
+                async with AsyncSessionLocal() as db:
+                    await mark_dirty(db, folder_id)
+                    await db.commit()
+                return
+            summary, tags = result["summary"], result["tags"]
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Folder).where(Folder.id == folder_id).values(
+                    ai_summary=summary, ai_tags=tags, updated_at=Folder.updated_at
+                ).execution_options(synchronize_session=False)
+            )
+            # A child that changed while the model ran has moved ai_dirty_at on, so the folder stays due
+            await db.execute(
+                update(Folder).where(Folder.id == folder_id, Folder.ai_dirty_at == dirty_at).values(
+                    ai_dirty_at=None, updated_at=Folder.updated_at
+                ).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        self.rebuilt += 1
+
+# Global instance
+folder_summarizer = FolderSummarizer()
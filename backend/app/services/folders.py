@@ -0,0 +1,215 @@
+"""
+Folder hierarchy over materialized paths
+
+Every folder stores the ids of its root-to-self chain as "/<root id>/.../<own id>/"
+plus its depth, kept up to date by create_folder, move_folder and delete_folder.
+A subtree is then one range scan on the (owner_id, path) index, and a move
+rewrites the prefix of the whole subtree in a single UPDATE instead of walking
+it a level at a time.
+
+Fill in paths for folders written before the column existed with:
+    cd backend && python -m app.services.folders rebuild
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import sys
+import uuid
+
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.database import SessionLocal, Document, Folder, MindMap, Note
+
+# Sorts after every character a path can hold (hex digits, "-" and "/")
+_PATH_END = "~"
+
+def child_path(parent: Optional[Folder], folder_id) -> str:
+    return f"{parent.path if parent else '/'}{folder_id}/"
+
+def in_subtree(path):
+    """Condition matching the folder at `path` and all of its descendants
+
+    `path` may be a string or a SQL expression such as a scalar subquery.
+    """
+    return Folder.path.between(path, path + _PATH_END)
+
+def subtree_ids(owner_id, folder_id):
+    """SELECT of the ids of a folder and everything below it, for use in IN (...)"""
+    root = select(Folder.path).where(Folder.id == folder_id, Folder.owner_id == owner_id).scalar_subquery()
+    return select(Folder.id).where(Folder.owner_id == owner_id, in_subtree(root))
+
+async def mark_dirty(db, *folder_ids):
+    """Flag the given folders and all their ancestors for a summary rebuild
+
+    Called in the transaction that changes a note, document or subfolder; the
+    ancestors come straight from the stored paths.
+    """
+    ids = {folder_id for folder_id in folder_ids if folder_id}
+    if not ids:
+        return
+    paths = (await db.execute(select(Folder.path).where(Folder.id.in_(ids)))).scalars()
+    chain = {uuid.UUID(part) for path in paths if path for part in path.strip("/").split("/")}
+    await db.execute(
+        # Bookkeeping rather than an edit, so updated_at is left alone
+        update(Folder).where(Folder.id.in_(chain)).values(ai_dirty_at=datetime.utcnow(), updated_at=Folder.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+async def create_folder(
+    db: AsyncSession,
+    owner_id,
+    name: str,
+    description: Optional[str] = None,
+    parent: Optional[Folder] = None
+) -> Folder:
+    folder_id = uuid.uuid4()
+    folder = Folder(
+        id=folder_id,
+        name=name,
+        description=description,
+        parent_id=parent.id if parent else None,
+        owner_id=owner_id,
+        path=child_path(parent, folder_id),
+        depth=parent.depth + 1 if parent else 0
+    )
+    db.add(folder)
+    await db.flush()
+    await mark_dirty(db, folder.parent_id)
+    return folder
+
+async def move_folder(db: AsyncSession, folder: Folder, parent: Optional[Folder]) -> Folder:
+    """Re-parent a folder; its descendants follow in the same statement
+
+    Raises ValueError when `parent` is the folder itself or one of its descendants.
+    """
+    if parent is not None and parent.path.startswith(folder.path):
+        raise ValueError("A folder cannot be moved into itself or one of its subfolders")
+    old_parent_id = folder.parent_id
+    old_path, new_path = folder.path, child_path(parent, folder.id)
+    shift = (parent.depth + 1 if parent else 0) - folder.depth
+    await db.execute(
+        update(Folder).where(Folder.owner_id == folder.owner_id, in_subtree(old_path)).values(
+            path=literal(new_path) + func.substr(Folder.path, len(old_path) + 1),
+            depth=Folder.depth + shift
+        ).execution_options(synchronize_session=False)
+    )
+    folder.parent_id = parent.id if parent else None
+    folder.path = new_path
+    folder.depth += shift
+    await db.flush()
+    await mark_dirty(db, old_parent_id, folder.parent_id)
+    return folder
+
+async def delete_folder(db: AsyncSession, folder: Folder):
+    """Delete a folder and its subfolders, moving everything filed in them up to its parent"""
+    ids = select(Folder.id).where(Folder.owner_id == folder.owner_id, in_subtree(folder.path))
+    for model in (Note, Document, MindMap):
+        await db.execute(
+            update(model).where(model.folder_id.in_(ids)).values(folder_id=folder.parent_id)
+            .execution_options(synchronize_session=False)
+        )
+    await db.execute(
+        delete(Folder).where(Folder.owner_id == folder.owner_id, in_subtree(folder.path))
+        .execution_options(synchronize_session=False)
+    )
+    await mark_dirty(db, folder.parent_id)
+
+async def folder_tree(db: AsyncSession, owner_id, root: Optional[Folder] = None) -> List[Dict[str, Any]]:
+    """A user's folders (or one folder's subtree) as nested dicts with rolled-up counts
+
+    note_count, document_count and total_size (document bytes) cover each folder
+    and everything below it. Three queries regardless of tree size: the folders,
+    then note and document totals grouped per folder.
+    """
+    conditions = [Folder.owner_id == owner_id]
+    if root is not None:
+        conditions.append(in_subtree(root.path))
+    folders = (await db.execute(
+        select(
+            Folder.id, Folder.name, Folder.description, Folder.parent_id, Folder.depth,
+            Folder.ai_summary, Folder.ai_tags
+        )
+        .where(*conditions).order_by(Folder.path)
+    )).all()
+
+    ids = select(Folder.id).where(*conditions)
+    notes = dict((await db.execute(
+        select(Note.folder_id, func.count()).where(Note.owner_id == owner_id, Note.folder_id.in_(ids))
+        .group_by(Note.folder_id)
+    )).all())
+    documents = {
+        folder_id: (count, size or 0)
+        for folder_id, count, size in (await db.execute(
+            select(Document.folder_id, func.count(), func.sum(Document.file_size))
+            .where(Document.owner_id == owner_id, Document.folder_id.in_(ids))
+            .group_by(Document.folder_id)
+        )).all()
+    }
+
+    nodes = {}
+    for folder in folders:
+        document_count, total_size = documents.get(folder.id, (0, 0))
+        nodes[folder.id] = {
+            "id": str(folder.id),
+            "name": folder.name,
+            "description": folder.description,
+            "parent_id": str(folder.parent_id) if folder.parent_id else None,
+            "depth": folder.depth,
+            "ai_summary": folder.ai_summary,
+            "ai_tags": folder.ai_tags,
+            "note_count": notes.get(folder.id, 0),
+            "document_count": document_count,
+            "total_size": total_size,
+            "children": []
+        }
+
+    # Path order puts every parent before its children; walk it backwards to roll totals up
+    roots = []
+    for folder in reversed(folders):
+        node = nodes[folder.id]
+        parent = nodes.get(folder.parent_id)
+        if parent is None:
+            roots.append(node)
+            continue
+        parent["children"].append(node)
+        for field in ("note_count", "document_count", "total_size"):
+            parent[field] += node[field]
+    for node in nodes.values():
+        node["children"].sort(key=_by_name)
+    return sorted(roots, key=_by_name)
+
+def _by_name(node: Dict[str, Any]):
+    return node["name"].lower()
+
+def rebuild_paths() -> int:
+    """Recompute path and depth for every folder from parent_id"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(Folder.id, Folder.parent_id)).all()
+        children: Dict[Any, List] = {}
+        for folder_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(folder_id)
+        known = {folder_id for folder_id, _ in rows}
+
+        # Folders whose parent is gone are treated as roots
+        pending = [(folder_id, "/", 0) for folder_id, parent_id in rows if parent_id not in known]
+        updates = []
+        while pending:
+            folder_id, prefix, depth = pending.pop()
+            path = f"{prefix}{folder_id}/"
+            updates.append({"id": folder_id, "path": path, "depth": depth})
+            pending.extend((child, path, depth + 1) for child in children.get(folder_id, []))
+
+        for start in range(0, len(updates), 1000):
+            db.execute(update(Folder), updates[start:start + 1000])
+        db.commit()
+        return len(updates)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m app.services.folders rebuild")
+        sys.exit(2)
+    print(f"Rebuilt paths for {rebuild_paths()} folders")
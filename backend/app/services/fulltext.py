@@ -0,0 +1,241 @@
+"""
+Full-text keyword search over notes and documents
+
+SQLite uses an FTS5 table; PostgreSQL uses a generated tsvector column with a
+GIN index. Both hang off a search_items table keyed by (kind, item_id) and
+are kept in sync with the Note and Document models through ORM events.
+
+Rebuild the index for existing data with:
+    cd backend && python -m app.services.fulltext rebuild
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+import re
+import sys
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import undefer
+
+from ..models.database import SessionLocal, Blob, Document, Note, engine
+
+SQLITE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_items (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        owner_id TEXT,
+        UNIQUE (kind, item_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_search_items_owner ON search_items (owner_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, body, tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS search_items (
+        id SERIAL PRIMARY KEY,
+        kind TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        owner_id TEXT,
+        title TEXT,
+        body TEXT,
+        tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(body, '')), 'B')
+        ) STORED,
+        UNIQUE (kind, item_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_search_items_owner ON search_items (owner_id)",
+    "CREATE INDEX IF NOT EXISTS ix_search_items_tsv ON search_items USING GIN (tsv)",
+]
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+def _is_postgres(connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+def create_fulltext_index(bind=engine):
+    """Create the search tables for the current dialect (idempotent)"""
+    with bind.begin() as connection:
+        for statement in POSTGRES_DDL if _is_postgres(connection) else SQLITE_DDL:
+            connection.execute(text(statement))
+
+def _upsert(connection, kind: str, item_id, owner_id, title: str, body: str):
+    params = {
+        "kind": kind,
+        "item_id": str(item_id),
+        "owner_id": str(owner_id) if owner_id else None,
+        "title": title or "",
+        "body": body or ""
+    }
+    if _is_postgres(connection):
+        connection.execute(text("""
+            INSERT INTO search_items (kind, item_id, owner_id, title, body)
+            VALUES (:kind, :item_id, :owner_id, :title, :body)
+            ON CONFLICT (kind, item_id) DO UPDATE
+            SET owner_id = excluded.owner_id, title = excluded.title, body = excluded.body
+        """), params)
+        return
+
+    row_id = connection.execute(text("""
+        INSERT INTO search_items (kind, item_id, owner_id) VALUES (:kind, :item_id, :owner_id)
+        ON CONFLICT (kind, item_id) DO UPDATE SET owner_id = excluded.owner_id
+        RETURNING id
+    """), params).scalar_one()
+    connection.execute(text("DELETE FROM search_fts WHERE rowid = :id"), {"id": row_id})
+    connection.execute(
+        text("INSERT INTO search_fts (rowid, title, body) VALUES (:id, :title, :body)"),
+        {"id": row_id, **params}
+    )
+
+def _remove(connection, kind: str, item_id):
+    params = {"kind": kind, "item_id": str(item_id)}
+    if not _is_postgres(connection):
+        connection.execute(text("""
+            DELETE FROM search_fts WHERE rowid IN (
+                SELECT id FROM search_items WHERE kind = :kind AND item_id = :item_id
+            )
+        """), params)
+    connection.execute(text("DELETE FROM search_items WHERE kind = :kind AND item_id = :item_id"), params)
+
+def index_notes(connection, notes: Iterable[Dict[str, Any]]):
+    """Index notes written with a bulk INSERT, which bypasses the ORM events below"""
+    for note in notes:
+        _upsert(connection, "note", note["id"], note["owner_id"], note["title"], note["content"])
+
+def _changed(target, *attributes: str) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in attributes)
+
+def _document_text(connection, document: Document) -> str:
+    # A typed select so the stored text is decompressed
+    return connection.execute(
+        select(Blob.extracted_text).where(Blob.sha256 == document.content_hash)
+    ).scalar() or ""
+
+# ORM events keep the index in step with every flush
+
+@event.listens_for(Note, "after_insert")
+def _note_inserted(mapper, connection, note: Note):
+    _upsert(connection, "note", note.id, note.owner_id, note.title, note.content)
+
+@event.listens_for(Note, "after_update")
+def _note_updated(mapper, connection, note: Note):
+    if _changed(note, "title", "content", "owner_id"):
+        _upsert(connection, "note", note.id, note.owner_id, note.title, note.content)
+
+@event.listens_for(Note, "after_delete")
+def _note_deleted(mapper, connection, note: Note):
+    _remove(connection, "note", note.id)
+
+@event.listens_for(Document, "after_insert")
+@event.listens_for(Document, "after_update")
+def _document_saved(mapper, connection, document: Document):
+    # Documents become searchable once ingestion has produced their text
+    if document.status == "ready" and _changed(document, "status", "original_filename", "owner_id"):
+        _upsert(
+            connection, "document", document.id, document.owner_id,
+            document.original_filename, _document_text(connection, document)
+        )
+
+@event.listens_for(Document, "after_delete")
+def _document_deleted(mapper, connection, document: Document):
+    _remove(connection, "document", document.id)
+
+def _fts5_query(query: str) -> str:
+    """Turn user input into a safe FTS5 query: quoted phrases kept, every other term quoted"""
+    terms = []
+    for match in re.finditer(r'"([^"]+)"|(\S+)', query):
+        term = (match.group(1) or match.group(2)).replace('"', "")
+        if term.strip():
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+async def search(db, owner_id: str, query: str, page: int, page_size: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """Ranked, highlighted keyword search; returns (total matches, page of results)"""
+    connection = await db.connection()
+    offset = (page - 1) * page_size
+
+    if _is_postgres(connection):
+        params = {"owner_id": str(owner_id), "q": query, "limit": page_size, "offset": offset}
+        where = "owner_id = :owner_id AND tsv @@ websearch_to_tsquery('english', :q)"
+        total = (await connection.execute(text(f"SELECT count(*) FROM search_items WHERE {where}"), params)).scalar()
+        rows = (await connection.execute(text(f"""
+            SELECT kind, item_id,
+                   ts_rank_cd(tsv, websearch_to_tsquery('english', :q)) AS rank,
+                   ts_headline('english', title, websearch_to_tsquery('english', :q),
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, HighlightAll=true') AS title,
+                   ts_headline('english', body, websearch_to_tsquery('english', :q),
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=32, MinWords=12') AS snippet
+            FROM search_items
+            WHERE {where}
+            ORDER BY rank DESC
+            LIMIT :limit OFFSET :offset
+        """), params)).all()
+    else:
+        match = _fts5_query(query)
+        if not match:
+            return 0, []
+        params = {"owner_id": str(owner_id), "q": match, "limit": page_size, "offset": offset}
+        where = "search_fts MATCH :q AND i.owner_id = :owner_id"
+        total = (await connection.execute(text(f"""
+            SELECT count(*) FROM search_fts JOIN search_items i ON i.id = search_fts.rowid WHERE {where}
+        """), params)).scalar()
+        # Title matches weigh 10x body matches; bm25() is lower-is-better
+        rows = (await connection.execute(text(f"""
+            SELECT i.kind, i.item_id,
+                   -bm25(search_fts, 10.0, 1.0) AS rank,
+                   highlight(search_fts, 0, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}') AS title,
+                   snippet(search_fts, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', 24) AS snippet
+            FROM search_fts JOIN search_items i ON i.id = search_fts.rowid
+            WHERE {where}
+            ORDER BY bm25(search_fts, 10.0, 1.0)
+            LIMIT :limit OFFSET :offset
+        """), params)).all()
+
+    return total, [
+        {"kind": kind, "id": item_id, "rank": float(rank), "title": title, "snippet": snippet}
+        for kind, item_id, rank, title, snippet in rows
+    ]
+
+def rebuild_index(batch_size: int = 500) -> Dict[str, int]:
+    """Re-index every note and ready document from scratch"""
+    create_fulltext_index()
+    db = SessionLocal()
+    counts = {"notes": 0, "documents": 0}
+    try:
+        connection = db.connection()
+        if not _is_postgres(connection):
+            connection.execute(text("DELETE FROM search_fts"))
+        connection.execute(text("DELETE FROM search_items"))
+
+        for note in db.query(Note).options(undefer(Note.content)).yield_per(batch_size):
+            _upsert(connection, "note", note.id, note.owner_id, note.title, note.content)
+            counts["notes"] += 1
+
+        rows = db.query(Document.id, Document.owner_id, Document.original_filename, Blob.extracted_text).join(
+            Blob, Blob.sha256 == Document.content_hash
+        ).filter(Document.status == "ready").yield_per(batch_size)
+        for document_id, owner_id, filename, extracted_text in rows:
+            _upsert(connection, "document", document_id, owner_id, filename, extracted_text)
+            counts["documents"] += 1
+
+        db.commit()
+    finally:
+        db.close()
+    return counts
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("usage: python -m app.services.fulltext rebuild")
+        sys.exit(2)
+    counts = rebuild_index()
+    print(f"Indexed {counts['notes']} notes and {counts['documents']} documents")
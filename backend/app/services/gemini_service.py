@@ -1,16 +1,251 @@
-import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 import json
 import asyncio
+import logging
 from ..core.config import settings
+from .cache import ResponseCache, SingleFlight
+from .llm import LLMProvider, create_provider
+from .prompt_budget import TokenUsage, estimate_tokens, fit_to_budget, tokens_to_chars
+from .resilience import AIBadResponse, AIUnavailable, CircuitBreaker, ResilientCaller, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_LEVELS = ("easy", "medium", "hard")
+
+def _strip_code_fence(text: str) -> str:
+    """Remove a ```json fence the model sometimes wraps structured output in"""
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+def _enrichment(data: Any) -> Dict[str, Any]:
+    """Validate and normalise one enrichment object from the model"""
+    if not isinstance(data, dict) or not isinstance(data.get("summary"), str):
+        raise AIBadResponse("Malformed enrichment response")
+    difficulty = data.get("difficulty")
+    return {
+        "summary": data["summary"].strip(),
+        "tags": [str(t) for t in data.get("tags") or []],
+        "key_concepts": [str(c) for c in data.get("key_concepts") or []],
+        "difficulty": difficulty if difficulty in DIFFICULTY_LEVELS else None
+    }
+
+def _enrichments(count: int) -> Callable[[Any], List[Dict[str, Any]]]:
+    """Validator for a batch of count enrichment objects"""
+    def validate(data: Any) -> List[Dict[str, Any]]:
+        if not isinstance(data, list) or len(data) != count:
+            raise AIBadResponse("Batch enrichment returned the wrong number of results")
+        return [_enrichment(item) for item in data]
+    return validate
+
+def _folder_summary(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict) or not isinstance(data.get("summary"), str):
+        raise AIBadResponse("Malformed folder summary response")
+    return {
+        "summary": data["summary"].strip(),
+        "tags": [str(t) for t in data.get("tags") or []]
+    }
+
+def _key_concepts(data: Any) -> List[str]:
+    if not isinstance(data, list):
+        raise AIBadResponse("Malformed key concepts response")
+    return data
+
+def _flashcards(data: Any) -> List[Dict[str, str]]:
+    if not isinstance(data, list):
+        raise AIBadResponse("Malformed flashcards response")
+    return data
+
+def _quiz(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict) or not isinstance(data.get("questions"), list):
+        raise AIBadResponse("Malformed quiz response")
+    return data
+
+def _mindmap(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        raise AIBadResponse("Malformed mind map response")
+    return data
 
 class GeminiService:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    """Study-task generation (summaries, flashcards, chat...) over the configured LLM provider"""
     
-    async def generate_summary(self, text: str, max_length: int = 200) -> str:
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        self.provider = provider or create_provider()
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        self.cache = ResponseCache(
+            max_entries=settings.AI_CACHE_MAX_ENTRIES,
+            ttl=settings.AI_CACHE_TTL,
+            redis_url=settings.REDIS_URL if settings.AI_CACHE_USE_REDIS else None
+        )
+        self.usage = TokenUsage()
+        self.single_flight = SingleFlight()
+        self.upstream = ResilientCaller(
+            TokenBucket(settings.AI_RATE_LIMIT_RPM / 60, settings.AI_RATE_LIMIT_BURST),
+            CircuitBreaker(settings.AI_BREAKER_FAILURES, settings.AI_BREAKER_RESET),
+            attempts=settings.AI_RETRY_ATTEMPTS,
+            base_delay=settings.AI_RETRY_BASE_DELAY,
+            max_delay=settings.AI_RETRY_MAX_DELAY,
+            max_wait=settings.AI_RATE_LIMIT_MAX_WAIT
+        )
+    
+    @property
+    def model_name(self) -> str:
+        return self.provider.model
+    
+    def model_for(self, method: str) -> str:
+        return self.provider.model_for(method)
+    
+    async def _call_model(self, method: str, prompt: str) -> str:
+        """Run a model call on the provider; raises AIError subclasses instead of returning error text"""
+        async def attempt():
+            async with self._semaphore:
+                return await asyncio.wait_for(
+                    self.provider.generate(prompt, method),
+                    timeout=settings.AI_REQUEST_TIMEOUT
+                )
+        
+        # Quota waits and retry backoff happen outside the concurrency slot
+        response = await self.upstream.call(attempt)
+        # Prefer the count the provider reports over the estimate
+        self.usage.record(method, response.prompt_tokens or estimate_tokens(prompt))
+        return response.text
+    
+    async def _generate(
+        self,
+        method: str,
+        prompt: str,
+        text: str,
+        params: Optional[Dict[str, Any]] = None,
+        parse_json: bool = False,
+        bypass_cache: bool = False,
+        validate: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """Answer from the response cache, or call the model and cache the parsed result
+
+        validate checks (and may normalise) the parsed result, raising AIBadResponse
+        if it has the wrong shape; only results it accepts are cached.
+        """
+        use_cache = settings.AI_CACHE_ENABLED
+        key = ResponseCache.make_key(method, self.model_for(method), params or {}, text)
+        
+        if use_cache and not bypass_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                try:
+                    # Validators are idempotent; this only rejects entries cached before they existed
+                    return validate(cached) if validate else cached
+                except AIBadResponse:
+                    logger.warning("Discarding a malformed cached %s response", method)
+        
+        async def call():
+            result = await self._call_model(method, prompt)
+            if parse_json:
+                try:
+                    result = json.loads(_strip_code_fence(result))
+                except ValueError as e:
+                    raise AIBadResponse("AI returned malformed JSON") from e
+            if validate:
+                result = validate(result)
+            
+            # Only parsed and validated results reach the cache (and single-flight waiters); failures raise above
+            if use_cache:
+                await self.cache.set(key, result)
+            return result
+        
+        if not settings.AI_SINGLE_FLIGHT:
+            return await call()
+        # Identical requests arriving while this one is with the model wait for its answer
+        return await self.single_flight.do(key, call)
+    
+    async def _stream(
+        self,
+        method: str,
+        prompt: str,
+        text: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Yield the response text as the model produces it; shares cache entries with _generate"""
+        use_cache = settings.AI_CACHE_ENABLED
+        key = ResponseCache.make_key(method, self.model_for(method), params or {}, text)
+        
+        if use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        async def attempt():
+            # Each attempt takes a concurrency slot; a failed one gives it back before any backoff
+            await self._semaphore.acquire()
+            try:
+                return await asyncio.wait_for(
+                    self.provider.stream(prompt, method),
+                    timeout=settings.AI_REQUEST_TIMEOUT
+                )
+            except BaseException:
+                self._semaphore.release()
+                raise
+        
+        # Only opening the stream is retried; text already sent cannot be taken back. Quota waits
+        # and retry backoff happen outside the slot, which the opened stream then holds to its end.
+        stream = await self.upstream.call(attempt)
+        parts = []
+        try:
+            self.usage.record(method, estimate_tokens(prompt))
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=settings.AI_REQUEST_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError as e:
+                    raise AIUnavailable("AI service stopped responding") from e
+                parts.append(chunk)
+                yield chunk
+        finally:
+            try:
+                # Close the provider's iterator now rather than at garbage collection, so an
+                # abandoned response stops streaming from the model before the slot is reused
+                aclose = getattr(stream, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            finally:
+                # Released when the stream ends, fails or the caller closes it
+                self._semaphore.release()
+        
+        if use_cache:
+            await self.cache.set(key, "".join(parts).strip())
+    
+    async def _condense(self, text: str) -> str:
+        """Map step for long inputs: shrink one piece to dense study notes"""
+        words = tokens_to_chars(settings.AI_MAP_SUMMARY_TOKENS) // 6
+        prompt = f"""
+        Condense this section of study material into dense notes of at most {words} words.
+        Keep every definition, key term, formula, date and named concept; drop examples and repetition.
+        Return only the notes:
+        
+        {text}
+        """
+        
+        try:
+            return await self._generate(
+                "condense", prompt, text, {"max_tokens": settings.AI_MAP_SUMMARY_TOKENS}
+            )
+        except AIBadResponse as e:
+            # Upstream failures propagate; only a piece the model would not condense keeps its opening
+            logger.warning("Condensing a %d token piece failed, keeping its opening: %s", estimate_tokens(text), e)
+            return text[:tokens_to_chars(settings.AI_MAP_SUMMARY_TOKENS)]
+    
+    async def _fit(self, text: str) -> str:
+        """Bring text within AI_INPUT_TOKEN_BUDGET, map-reducing it if it is longer"""
+        # Condensed pieces are cached, so every method working on the same text reuses one map pass
+        return await fit_to_budget(text, self._condense)
+    
+    async def generate_summary(self, text: str, max_length: int = 200, bypass_cache: bool = False) -> str:
         """Generate AI summary of text content"""
+        text = await self._fit(text)
         prompt = f"""
         Summarize the following text in {max_length} characters or less. 
         Make it clear, concise, and student-friendly:
@@ -18,14 +253,91 @@ class GeminiService:
         {text}
         """
         
+        return await self._generate(
+            "generate_summary", prompt, text, {"max_length": max_length},
+            bypass_cache=bypass_cache
+        )
+    
+    async def enrich(self, text: str, bypass_cache: bool = False) -> Dict[str, Any]:
+        """Generate summary, tags, key concepts and difficulty in a single model call"""
+        text = await self._fit(text)
+        prompt = f"""
+        Analyze the following study material. Return only JSON, no other text, with structure:
+        {{
+            "summary": "Clear, concise, student-friendly summary in 200 characters or less",
+            "tags": ["up to 5 short topic tags"],
+            "key_concepts": ["top 10 key concepts"],
+            "difficulty": "easy" | "medium" | "hard"
+        }}
+        
+        {text}
+        """
+        
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            return f"Summary generation failed: {str(e)}"
+            return await self._generate(
+                "enrich", prompt, text,
+                parse_json=True, bypass_cache=bypass_cache, validate=_enrichment
+            )
+        except AIBadResponse:
+            # Fall back to the separate summary and concept calls
+            summary, concepts = await asyncio.gather(
+                self.generate_summary(text, bypass_cache=bypass_cache),
+                self.extract_key_concepts(text, bypass_cache=bypass_cache)
+            )
+            return {
+                "summary": summary,
+                "tags": concepts,
+                "key_concepts": concepts,
+                "difficulty": None
+            }
     
-    async def extract_key_concepts(self, text: str) -> List[str]:
+    async def enrich_batch(self, texts: List[str], bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """enrich() for several short texts packed into one prompt, results in the same order
+
+        The texts must already fit the input budget together; raises AIBadResponse
+        unless the model returns exactly one valid object per text.
+        """
+        text = "\n\n".join(f"=== Note {i} ===\n{t}" for i, t in enumerate(texts, 1))
+        prompt = f"""
+        Analyze each of the following {len(texts)} study notes separately. Return only a JSON array,
+        no other text, with one object per note in the same order, each with structure:
+        {{
+            "summary": "Clear, concise, student-friendly summary in 200 characters or less",
+            "tags": ["up to 5 short topic tags"],
+            "key_concepts": ["top 10 key concepts"],
+            "difficulty": "easy" | "medium" | "hard"
+        }}
+        
+        {text}
+        """
+        
+        return await self._generate(
+            "enrich_batch", prompt, text,
+            parse_json=True, bypass_cache=bypass_cache, validate=_enrichments(len(texts))
+        )
+    
+    async def summarize_folder(self, name: str, children: List[str], bypass_cache: bool = False) -> Dict[str, Any]:
+        """Summary and tags for a folder from one-line descriptions of its contents, not their full text"""
+        text = await self._fit("\n".join(children))
+        prompt = f"""
+        These are the notes, documents and subfolders in the study folder "{name}", each with its own summary.
+        Describe the folder as a whole. Return only JSON, no other text, with structure:
+        {{
+            "summary": "What the folder covers, in 300 characters or less",
+            "tags": ["up to 8 short topic tags"]
+        }}
+        
+        {text}
+        """
+        
+        return await self._generate(
+            "summarize_folder", prompt, text, {"name": name},
+            parse_json=True, bypass_cache=bypass_cache, validate=_folder_summary
+        )
+    
+    async def extract_key_concepts(self, text: str, bypass_cache: bool = False) -> List[str]:
         """Extract key concepts from text"""
+        text = await self._fit(text)
         prompt = f"""
         Extract the top 10 key concepts from this text. 
         Return only a JSON array of strings, no other text:
@@ -33,15 +345,14 @@ class GeminiService:
         {text}
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            concepts = json.loads(response.text.strip())
-            return concepts if isinstance(concepts, list) else []
-        except:
-            return []
+        return await self._generate(
+            "extract_key_concepts", prompt, text,
+            parse_json=True, bypass_cache=bypass_cache, validate=_key_concepts
+        )
     
-    async def generate_flashcards(self, text: str, count: int = 10) -> List[Dict[str, str]]:
+    async def generate_flashcards(self, text: str, count: int = 10, bypass_cache: bool = False) -> List[Dict[str, str]]:
         """Generate flashcards from content"""
+        text = await self._fit(text)
         prompt = f"""
         Create {count} flashcards from this content. 
         Return as JSON array with objects having 'question' and 'answer' fields:
@@ -49,15 +360,20 @@ class GeminiService:
         {text}
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            flashcards = json.loads(response.text.strip())
-            return flashcards if isinstance(flashcards, list) else []
-        except:
-            return []
+        return await self._generate(
+            "generate_flashcards", prompt, text, {"count": count},
+            parse_json=True, bypass_cache=bypass_cache, validate=_flashcards
+        )
     
-    async def generate_quiz(self, text: str, difficulty: str = "medium", count: int = 5) -> Dict[str, Any]:
+    async def generate_quiz(
+        self,
+        text: str,
+        difficulty: str = "medium",
+        count: int = 5,
+        bypass_cache: bool = False
+    ) -> Dict[str, Any]:
         """Generate quiz questions from content"""
+        text = await self._fit(text)
         prompt = f"""
         Create a {difficulty} difficulty quiz with {count} multiple choice questions from this content.
         Return as JSON with structure:
@@ -75,33 +391,41 @@ class GeminiService:
         Content: {text}
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            quiz = json.loads(response.text.strip())
-            return quiz
-        except:
-            return {"questions": []}
-    
-    async def chat_with_document(self, document_text: str, question: str) -> str:
-        """Chat with document content"""
+        return await self._generate(
+            "generate_quiz", prompt, text, {"difficulty": difficulty, "count": count},
+            parse_json=True, bypass_cache=bypass_cache, validate=_quiz
+        )
+    
+    def _chat_prompt(self, excerpts: List[str], question: str) -> Tuple[str, str]:
+        numbered = "\n\n".join(f"[{i}] {excerpt}" for i, excerpt in enumerate(excerpts, start=1))
         prompt = f"""
-        Based on this document content, answer the following question in a helpful, student-friendly way:
+        Based on these numbered excerpts from a document, answer the following question in a helpful, student-friendly way.
+        Cite the excerpts you used by number, like [1] or [2][3]. If the excerpts don't contain the answer, say so.
         
-        Document: {document_text}
+        Excerpts:
+        {numbered}
         
         Question: {question}
         
         Answer:
         """
+        return numbered, prompt
+    
+    async def chat_with_document(self, excerpts: List[str], question: str, bypass_cache: bool = False) -> str:
+        """Answer a question from retrieved document excerpts, citing them by number"""
+        numbered, prompt = self._chat_prompt(excerpts, question)
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            return f"I couldn't process that question. Error: {str(e)}"
+        return await self._generate(
+            "chat_with_document", prompt, numbered, {"question": question},
+            bypass_cache=bypass_cache
+        )
     
-    async def explain_concept(self, concept: str, level: str = "intermediate") -> str:
-        """Explain concept at different levels"""
+    def stream_chat_with_document(self, excerpts: List[str], question: str) -> AsyncIterator[str]:
+        """chat_with_document, streamed as the model writes it"""
+        numbered, prompt = self._chat_prompt(excerpts, question)
+        return self._stream("chat_with_document", prompt, numbered, {"question": question})
+    
+    def _explain_prompt(self, concept: str, level: str) -> str:
         level_prompts = {
             "beginner": "Explain like I'm 5 years old",
             "intermediate": "Explain like I'm a college student", 
@@ -113,15 +437,24 @@ class GeminiService:
         
         Make it engaging and easy to understand with examples.
         """
+        return prompt
+    
+    async def explain_concept(self, concept: str, level: str = "intermediate", bypass_cache: bool = False) -> str:
+        """Explain concept at different levels"""
+        prompt = self._explain_prompt(concept, level)
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            return f"Explanation failed: {str(e)}"
+        return await self._generate(
+            "explain_concept", prompt, concept, {"level": level},
+            bypass_cache=bypass_cache
+        )
     
-    async def generate_mindmap_data(self, text: str) -> Dict[str, Any]:
+    def stream_explain_concept(self, concept: str, level: str = "intermediate") -> AsyncIterator[str]:
+        """explain_concept, streamed as the model writes it"""
+        return self._stream("explain_concept", self._explain_prompt(concept, level), concept, {"level": level})
+    
+    async def generate_mindmap_data(self, text: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """Generate mind map structure from content"""
+        text = await self._fit(text)
         prompt = f"""
         Create a mind map structure from this content. Return as JSON:
         {{
@@ -140,12 +473,10 @@ class GeminiService:
         Content: {text}
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            mindmap = json.loads(response.text.strip())
-            return mindmap
-        except:
-            return {"central_topic": "Content", "branches": []}
+        return await self._generate(
+            "generate_mindmap_data", prompt, text,
+            parse_json=True, bypass_cache=bypass_cache, validate=_mindmap
+        )
 
 # Global instance
 gemini_service = GeminiService()
\ No newline at end of file
@@ -0,0 +1,268 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal, Blob, Document, IngestionJob
+from .extraction import extract_text_from_file, UnsupportedFormat
+from .folders import mark_dirty
+from .gemini_service import gemini_service
+from .resilience import AIError, AIRateLimited, AIUnavailable
+from .retrieval import chunk_texts, index_chunks
+from .study_sets import pregenerate
+from .vector_index import vector_store
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 10 * 60  # seconds
+
+async def complete_document(db, document: Document, blob: Blob):
+    """Mark a document ready using its blob's AI artifacts and add it to semantic search"""
+    document.ai_summary = blob.ai_summary
+    document.ai_tags = blob.ai_tags
+    document.ai_key_concepts = blob.ai_key_concepts
+    document.status = "ready"
+    document.progress = 100
+    document.error = None
+    await mark_dirty(db, document.folder_id)
+    await vector_store.index_document(document, await chunk_texts(db, blob.sha256))
+
+class IngestionQueue:
+    """Database-backed job queue that runs document ingestion on asyncio workers"""
+
+    def __init__(self):
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(self, db, document: Document) -> IngestionJob:
+        """Add an ingestion job for a document; the caller commits, then calls notify()"""
+        job = IngestionJob(document=document)
+        db.add(job)
+        return job
+
+    def notify(self):
+        """Wake idle workers so a freshly committed job starts without waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self, workers: int):
+        """Recover abandoned jobs and start the worker tasks"""
+        if workers <= 0 or self._workers:
+            return
+        self._wakeup = asyncio.Event()
+        await self._recover_abandoned_jobs()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(), name=f"ingestion-worker-{i}")
+            for i in range(workers)
+        ]
+        logger.info("Started %d ingestion workers", workers)
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self):
+        """Wait for the workers to exit (used by the standalone worker process)"""
+        await asyncio.gather(*self._workers)
+
+    async def _worker_loop(self):
+        while True:
+            self._wakeup.clear()
+            job_id = await self._claim_next_job()
+            if job_id is None:
+                await self._recover_abandoned_jobs()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.INGESTION_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ingestion worker crashed on job %s", job_id)
+
+    async def _claim_next_job(self) -> Optional[uuid.UUID]:
+        """Atomically move one due job from pending to running"""
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+            candidates = (await db.execute(
+                select(IngestionJob.id).where(
+                    IngestionJob.status == "pending",
+                    IngestionJob.run_after <= now
+                ).order_by(IngestionJob.run_after).limit(5)
+            )).scalars().all()
+
+            for job_id in candidates:
+                # The status guard makes the claim safe across workers and processes
+                claimed = (await db.execute(
+                    update(IngestionJob).where(
+                        IngestionJob.id == job_id,
+                        IngestionJob.status == "pending"
+                    ).values(
+                        status="running",
+                        locked_at=now,
+                        attempts=IngestionJob.attempts + 1
+                    ).execution_options(synchronize_session=False)
+                )).rowcount
+                await db.commit()
+                if claimed:
+                    return job_id
+            return None
+
+    async def _recover_abandoned_jobs(self):
+        """Return jobs whose worker died mid-run (lease expired) to the queue"""
+        async with AsyncSessionLocal() as db:
+            cutoff = datetime.utcnow() - timedelta(seconds=settings.INGESTION_JOB_LEASE)
+            recovered = (await db.execute(
+                update(IngestionJob).where(
+                    IngestionJob.status == "running",
+                    IngestionJob.locked_at < cutoff
+                ).values(status="pending", locked_at=None).execution_options(synchronize_session=False)
+            )).rowcount
+            await db.commit()
+            if recovered:
+                logger.warning("Recovered %d abandoned ingestion jobs", recovered)
+
+    async def _process(self, job_id: uuid.UUID):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(
+                IngestionJob, job_id,
+                options=[selectinload(IngestionJob.document).selectinload(Document.blob)]
+            )
+            document = job.document
+            try:
+                deferred = await self._ingest(db, document)
+            except Exception as e:
+                logger.warning("Ingestion of document %s failed: %s", document.id, e)
+                await db.rollback()
+                # Rollback expires loaded state; reload it rather than lazy-loading under asyncio
+                await db.refresh(job)
+                await db.refresh(document)
+                await self._record_failure(db, job, document, e)
+            else:
+                if deferred is not None:
+                    await self._defer_enrichment(db, job, deferred)
+                    return
+                job.status = "done"
+                job.locked_at = None
+                job.last_error = None
+                await db.commit()
+                if settings.PREGENERATE_STUDY_SETS:
+                    # After the commit, so the document is already usable while these build
+                    await pregenerate(db, document.blob)
+
+    async def _ingest(self, db, document: Document) -> Optional[AIError]:
+        """Run extraction → enrichment → persistence for one document
+
+        When the model is rate limited or down the document is completed without
+        AI fields and the upstream error is returned, so the job can be re-run to
+        add them later.
+        """
+        blob = document.blob
+        deferred = None
+
+        # Another upload of the same bytes may have finished while this job waited
+        if blob.status != "ready":
+            # Progress commits end each transaction, so none stays open across extraction or AI calls
+            await self._set_progress(db, document, 10)
+            extracted_text = await extract_text_from_file(blob.file_path, blob.file_type)
+
+            await self._set_progress(db, document, 40)
+            enrichment, deferred = await self._enrich(extracted_text)
+
+            blob.extracted_text = extracted_text
+            await index_chunks(db, blob)
+            if enrichment:
+                blob.ai_summary = enrichment["summary"]
+                blob.ai_tags = enrichment["tags"]
+                blob.ai_key_concepts = enrichment["key_concepts"]
+            blob.status = "ready"
+            await db.flush()  # chunks must be visible to complete_document's query
+        elif blob.ai_summary is None:
+            # An earlier run completed the blob while enrichment was deferred
+            extracted_text = (await db.execute(
+                select(Blob.extracted_text).where(Blob.sha256 == blob.sha256)
+            )).scalar()
+            await db.commit()
+            enrichment, deferred = await self._enrich(extracted_text)
+            if enrichment:
+                blob.ai_summary = enrichment["summary"]
+                blob.ai_tags = enrichment["tags"]
+                blob.ai_key_concepts = enrichment["key_concepts"]
+                # Other documents completed from this blob in the meantime get it too
+                await db.execute(
+                    update(Document).where(Document.content_hash == blob.sha256).values(
+                        ai_summary=blob.ai_summary,
+                        ai_tags=blob.ai_tags,
+                        ai_key_concepts=blob.ai_key_concepts
+                    ).execution_options(synchronize_session=False)
+                )
+                await mark_dirty(db, *(await db.execute(
+                    select(Document.folder_id).where(Document.content_hash == blob.sha256)
+                )).scalars())
+
+        await complete_document(db, document, blob)
+        await db.commit()
+        return deferred
+
+    async def _enrich(self, text: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[AIError]]:
+        """Enrichment for extracted text, and the upstream error when it has to wait"""
+        if not text:
+            return None, None
+        try:
+            return await gemini_service.enrich(text), None
+        except (AIRateLimited, AIUnavailable) as e:
+            return None, e
+        except AIError as e:
+            # The model cannot handle this text; trying again later will not change that
+            logger.warning("Enrichment failed, completing without AI fields: %s", e)
+            return None, None
+
+    async def _set_progress(self, db, document: Document, progress: int):
+        document.status = "processing"
+        document.progress = progress
+        await db.commit()
+
+    async def _defer_enrichment(self, db, job: IngestionJob, error: AIError):
+        """Re-queue a completed document's job for when the model is expected back"""
+        delay = min(max(error.retry_after or 0.0, settings.INGESTION_RETRY_BACKOFF), MAX_RETRY_DELAY)
+        job.status = "pending"
+        job.locked_at = None
+        # Waiting out an outage does not use up the job's attempts
+        job.attempts -= 1
+        job.last_error = f"Enrichment deferred: {error}"
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay * random.uniform(1.0, 1.2))
+        await db.commit()
+
+    async def _record_failure(self, db, job: IngestionJob, document: Document, error: Exception):
+        job.last_error = str(error)
+        job.locked_at = None
+
+        if job.attempts >= settings.INGESTION_MAX_ATTEMPTS or isinstance(error, UnsupportedFormat):
+            job.status = "failed"
+            document.status = "failed"
+            document.error = str(error)
+        else:
+            # Exponential backoff with jitter so retries of a shared failure spread out
+            delay = min(settings.INGESTION_RETRY_BACKOFF * 2 ** (job.attempts - 1), MAX_RETRY_DELAY)
+            delay *= random.uniform(0.8, 1.2)
+            job.status = "pending"
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            document.status = "pending"
+            document.error = f"Attempt {job.attempts} failed, retrying: {error}"
+
+        await db.commit()
+
+# Global instance
+ingestion_queue = IngestionQueue()
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from ...core.config import settings
+from .base import LLMProvider, LLMResponse
+from .stub import StubProvider
+
+PROVIDERS = ("gemini", "stub")
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    """Build the provider named by LLM_PROVIDER"""
+    name = name or settings.LLM_PROVIDER
+    if name == "gemini":
+        # Imported here so the stub runs without the Google SDK
+        from .gemini import GeminiProvider
+        return GeminiProvider(settings.GEMINI_API_KEY, settings.GEMINI_MODEL, settings.LLM_TASK_MODELS)
+    if name == "stub":
+        return StubProvider(
+            task_models=settings.LLM_TASK_MODELS,
+            latency=settings.LLM_STUB_LATENCY,
+            tokens_per_second=settings.LLM_STUB_TOKENS_PER_SECOND
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER {name!r}, expected one of {', '.join(PROVIDERS)}")
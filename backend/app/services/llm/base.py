@@ -0,0 +1,35 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: Optional[int] = None    # as counted by the provider, when it reports it
+
+class LLMProvider(ABC):
+    """A text generation backend
+
+    GeminiService adds caching, prompt budgeting, coalescing and resilience on
+    top; providers only turn a prompt into text. `task` is the GeminiService
+    method asking, which lets a provider route tasks to different models.
+    Upstream errors should carry their HTTP status as `.code` so retries and
+    the circuit breaker can tell transient failures from bad requests.
+    """
+
+    name: str
+
+    def __init__(self, model: str, task_models: Optional[Dict[str, str]] = None):
+        self.model = model
+        self.task_models = task_models or {}
+
+    def model_for(self, task: str) -> str:
+        return self.task_models.get(task, self.model)
+
+    @abstractmethod
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        """Return the complete response"""
+
+    @abstractmethod
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        """Start a generation and return an iterator over its text as it is produced"""
@@ -0,0 +1,47 @@
+from typing import AsyncIterator, Dict, Optional
+
+import google.generativeai as genai
+
+from ..resilience import AIBadResponse
+from .base import LLMProvider, LLMResponse
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the google-generativeai async client"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str, task_models: Optional[Dict[str, str]] = None):
+        super().__init__(model, task_models)
+        genai.configure(api_key=api_key)
+        self._clients: Dict[str, genai.GenerativeModel] = {}
+
+    def _client(self, task: str) -> genai.GenerativeModel:
+        name = self.model_for(task)
+        client = self._clients.get(name)
+        if client is None:
+            client = self._clients[name] = genai.GenerativeModel(name)
+        return client
+
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        response = await self._client(task).generate_content_async(prompt)
+        try:
+            text = response.text
+        except ValueError as e:
+            # e.g. the response was blocked and has no text part
+            raise AIBadResponse(f"AI returned no usable text: {e}") from e
+        metadata = getattr(response, "usage_metadata", None)
+        return LLMResponse(text.strip(), getattr(metadata, "prompt_token_count", None))
+
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        response = await self._client(task).generate_content_async(prompt, stream=True)
+        return self._chunks(response)
+
+    async def _chunks(self, response) -> AsyncIterator[str]:
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError as e:
+                # A blocked or empty candidate mid-stream, as in generate()
+                raise AIBadResponse(f"AI returned no usable text: {e}") from e
+            if text:
+                yield text
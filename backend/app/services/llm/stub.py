@@ -0,0 +1,140 @@
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import re
+
+from ..prompt_budget import estimate_tokens
+from .base import LLMProvider, LLMResponse
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z-]{4,}")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_NOTE_SECTION_RE = re.compile(r"=== Note \d+ ===")
+# Words from the prompt templates (and the stub's own answers, which get summarized again),
+# which would otherwise top every count
+_TEMPLATE_WORDS = frozenset(
+    "analyze answer array based branch branches central characters children cite clear college concept concepts "
+    "condense content correct covers create definition dense describe difficulty document documents easy engaging "
+    "examples excerpts explain explanation extract fields flashcards folder following format formula friendly "
+    "graduate helpful intermediate json concise medium multiple notes number numbered objects options other question questions quiz "
+    "material relates repetition return section short should student student-friendly students study structure "
+    "sub-concept subfolders summarize summary tags text their these thing topic understand whole which years".split()
+)
+
+class StubProvider(LLMProvider):
+    """Offline provider for load tests, benchmarks and CI
+
+    Answers are built from the most frequent words of the prompt's longest
+    paragraph outside the JSON examples (the study material in every
+    template), so the same prompt
+    always gets the same answer, and JSON tasks get valid JSON of the size the
+    prompt asks for. `latency` is the delay before the answer (or its first
+    chunk); `tokens_per_second`, when set, paces the output after that.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        model: str = "stub",
+        task_models: Optional[Dict[str, str]] = None,
+        latency: float = 0.05,
+        tokens_per_second: float = 0.0
+    ):
+        super().__init__(model, task_models)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = self.answer(prompt, task)
+        if self.tokens_per_second:
+            await asyncio.sleep(estimate_tokens(text) / self.tokens_per_second)
+        return LLMResponse(text, estimate_tokens(prompt))
+
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._chunks(self.answer(prompt, task))
+
+    async def _chunks(self, text: str) -> AsyncIterator[str]:
+        words = text.split(" ")
+        for start in range(0, len(words), 8):
+            chunk = " ".join(words[start:start + 8]) + (" " if start + 8 < len(words) else "")
+            if start and self.tokens_per_second:
+                await asyncio.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+            yield chunk
+
+    def answer(self, prompt: str, task: str) -> str:
+        paragraphs = [p for p in _PARAGRAPH_RE.split(prompt) if "{" not in p] or [prompt]
+        topics = self._topics(max(paragraphs, key=len))
+        seed = int(hashlib.sha256(prompt.encode()).hexdigest()[:8], 16)
+
+        if task == "enrich":
+            return json.dumps(self._enrichment(topics, seed))
+        if task == "enrich_batch":
+            notes = _NOTE_SECTION_RE.split(prompt)[1:]
+            return json.dumps([self._enrichment(self._topics(note), seed + i) for i, note in enumerate(notes)])
+        if task == "summarize_folder":
+            return json.dumps({"summary": self._prose(topics, 3)[:300], "tags": topics[:8]})
+        if task == "extract_key_concepts":
+            return json.dumps(topics[:10])
+        if task == "generate_flashcards":
+            count = self._requested(prompt, r"Create (\d+) flashcards", 10)
+            return json.dumps([
+                {"question": f"What is {topic}?", "answer": f"{topic.capitalize()} is a key idea in this material."}
+                for topic in self._cycle(topics, count)
+            ])
+        if task == "generate_quiz":
+            count = self._requested(prompt, r"with (\d+) multiple choice", 5)
+            questions = []
+            for i, topic in enumerate(self._cycle(topics, count)):
+                options = self._cycle(topics[i % len(topics):] + topics, 4)
+                questions.append({
+                    "question": f"Which term best matches {topic}?",
+                    "options": options,
+                    "correct_answer": options.index(topic),
+                    "explanation": f"The material introduces {topic} directly."
+                })
+            return json.dumps({"questions": questions})
+        if task == "generate_mindmap_data":
+            return json.dumps({
+                "central_topic": topics[0],
+                "branches": [
+                    {"name": branch, "children": [{"name": child} for child in topics[5 + i * 2:7 + i * 2]]}
+                    for i, branch in enumerate(topics[1:5])
+                ]
+            })
+        if task == "condense":
+            return self._prose(topics, 4)
+        return self._prose(topics, 6)
+
+    def _topics(self, material: str) -> List[str]:
+        counts = Counter(
+            word for word in (w.lower() for w in _WORD_RE.findall(material)) if word not in _TEMPLATE_WORDS
+        )
+        return [word for word, _ in counts.most_common(12)] or ["material"]
+
+    def _enrichment(self, topics: List[str], seed: int) -> Dict[str, Any]:
+        return {
+            "summary": self._prose(topics, 2)[:200],
+            "tags": topics[:5],
+            "key_concepts": topics[:10],
+            "difficulty": ("easy", "medium", "hard")[seed % 3]
+        }
+
+    def _prose(self, topics: List[str], sentences: int) -> str:
+        return " ".join(
+            f"{topic.capitalize()} relates to {self._cycle(topics, i + 2)[-1]} in this material."
+            for i, topic in enumerate(self._cycle(topics, sentences))
+        )
+
+    def _cycle(self, items: List[str], count: int) -> List[str]:
+        return [items[i % len(items)] for i in range(count)]
+
+    def _requested(self, prompt: str, pattern: str, default: int) -> int:
+        match = re.search(pattern, prompt)
+        return int(match.group(1)) if match else default
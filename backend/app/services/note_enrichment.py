@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import uuid
+import zlib
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal, Note
+from .folders import mark_dirty
+from .gemini_service import gemini_service
+from .resilience import AIError
+from .retrieval import tokenize
+from .write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+# Universal hashing a * x + b mod p over 32-bit shingle hashes; p is prime and above 2**32
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(1, 2**32, size=settings.NOTE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=settings.NOTE_MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+def content_signature(text: str) -> List[int]:
+    """MinHash of the note's three-word shingles; equal positions estimate their Jaccard overlap"""
+    tokens = tokenize(text or "")
+    shingles = {" ".join(tokens[i:i + 3]) for i in range(max(len(tokens) - 2, 1))} if tokens else set()
+    if not shingles:
+        return []
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0).tolist()
+
+def similarity(a: Optional[List[int]], b: Optional[List[int]]) -> float:
+    if a is None or b is None or len(a) != len(b):
+        return 0.0
+    if not a:
+        return 1.0
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+def needs_enrichment(signature: Optional[List[int]], content: str) -> bool:
+    """Whether content has drifted far enough from the enriched text to refresh the AI fields
+
+    Measured against the text the fields were generated from, so many small
+    edits add up until they cross the threshold.
+    """
+    return similarity(signature, content_signature(content)) < settings.NOTE_REENRICH_SIMILARITY
+
+class NoteEnricher:
+    """Background task that refreshes the AI fields of edited notes
+
+    PUT /api/notes/{id} only flags the note (ai_dirty_at) when the edit moved
+    the content far enough from its enriched text, and every save of a flagged
+    note pushes ai_dirty_at forward. A note is enriched once it has gone
+    NOTE_REENRICH_DEBOUNCE seconds without a save, so a burst of autosaves costs
+    one model call, and edits that were typed and then undone cost none.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.enriched = 0
+        self.skipped = 0
+        self.failed = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="note-enricher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Keep going while full batches come back; otherwise wait for the next poll
+                while await self.run_once() >= settings.NOTE_REENRICH_BATCH:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Note enrichment pass crashed")
+            await asyncio.sleep(settings.NOTE_REENRICH_POLL_INTERVAL)
+
+    async def run_once(self) -> int:
+        """Enrich one batch of notes whose debounce window has passed; returns how many were due"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.NOTE_REENRICH_DEBOUNCE)
+        async with AsyncSessionLocal() as db:
+            due = (await db.execute(
+                select(Note.id, Note.ai_dirty_at).where(
+                    Note.ai_dirty_at.is_not(None),
+                    Note.ai_dirty_at <= cutoff
+                ).order_by(Note.ai_dirty_at).limit(settings.NOTE_REENRICH_BATCH)
+            )).all()
+        await asyncio.gather(*[self._enrich(note_id, dirty_at) for note_id, dirty_at in due])
+        return len(due)
+
+    async def _enrich(self, note_id: uuid.UUID, dirty_at: datetime):
+        async with AsyncSessionLocal() as db:
+            note = await db.get(Note, note_id, options=[undefer(Note.content)])
+            if note is None or note.ai_dirty_at != dirty_at:
+                return
+            # No connection is held while the model runs
+            await db.commit()
+
+        signature = content_signature(note.content)
+        enrichment = None
+        if similarity(note.ai_signature, signature) < settings.NOTE_REENRICH_SIMILARITY:
+            try:
+                enrichment = await gemini_service.enrich(note.content) if note.content else None
+            except AIError as e:
+                # Keep the flag, moved on so the retry waits out another debounce window
+                logger.warning("Note %s re-enrichment deferred: %s", note_id, e)
+                self.failed += 1
+                values = {"ai_dirty_at": datetime.utcnow()}
+            else:
+                values = {"ai_dirty_at": None, "ai_signature": signature}
+                if enrichment:
+                    values.update(
+                        ai_summary=enrichment["summary"],
+                        ai_tags=enrichment["tags"],
+                        ai_difficulty=enrichment["difficulty"]
+                    )
+        else:
+            # The edits since the last enrichment came to less than the threshold after all
+            self.skipped += 1
+            values = {"ai_dirty_at": None}
+
+        async def apply(writer) -> bool:
+            # Background bookkeeping, so updated_at (the list order) is left alone. An edit
+            # made while the model ran has moved ai_dirty_at on; its content wins then.
+            applied = (await writer.execute(
+                update(Note).where(Note.id == note_id, Note.ai_dirty_at == dirty_at).values(
+                    **values, updated_at=Note.updated_at
+                ).execution_options(synchronize_session=False)
+            )).rowcount
+            if applied and enrichment:
+                await mark_dirty(writer, note.folder_id)
+            return bool(applied)
+
+        if await write_queue.submit(apply) and enrichment:
+            self.enriched += 1
+
+# Global instance
+note_enricher = NoteEnricher()
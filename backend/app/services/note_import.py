@@ -0,0 +1,439 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import posixpath
+import re
+import tempfile
+import time
+import uuid
+import zipfile
+
+from sqlalchemy import insert, select, update
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal, Folder, Note
+from .folders import create_folder, mark_dirty
+from .fulltext import index_notes
+from .gemini_service import gemini_service
+from .note_enrichment import content_signature
+from .prompt_budget import estimate_tokens
+from .resilience import AIError
+from .vector_index import vector_store
+from .write_queue import write_queue
+
+logger = logging.getLogger(__name__)
+
+NOTE_EXTENSIONS = (".md", ".markdown", ".txt")
+MAX_REPORTED_ERRORS = 50
+_HEADING_RE = re.compile(r"^\s*#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+class ImportTooLarge(Exception):
+    """Raised when an import body, or the files in an import zip, exceed the NOTE_IMPORT_MAX_* limits"""
+
+@dataclass
+class ImportProgress:
+    id: str
+    owner_id: str
+    status: str = "importing"        # importing, enriching, done
+    imported: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+    enriched: int = 0
+    deferred: int = 0                # left to the background note enricher after a model failure
+    pending: int = 0                 # waiting for enrichment
+    model_calls: int = 0
+    started: float = field(default_factory=time.monotonic)
+    imported_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def error(self, message: str):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        insert_seconds = (self.imported_at or now) - self.started
+        enrich_seconds = (self.finished_at or now) - (self.imported_at or now)
+        return {
+            "import_id": self.id,
+            "status": self.status,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "enriched": self.enriched,
+            "enrichment_deferred": self.deferred,
+            "pending_enrichment": self.pending,
+            "model_calls": self.model_calls,
+            "seconds": round((self.finished_at or now) - self.started, 3),
+            "notes_per_second": round(self.imported / insert_seconds, 1) if insert_seconds > 0 else None,
+            "enriched_per_second": round(self.enriched / enrich_seconds, 1) if enrich_seconds > 0 else None
+        }
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Stored naive in UTC, like every other timestamp
+    return parsed.replace(tzinfo=None) - parsed.utcoffset() if parsed.tzinfo else parsed
+
+def _title_of(content: str, fallback: str) -> str:
+    match = _HEADING_RE.search(content[:2000])
+    return match.group(1) if match else fallback
+
+async def ndjson_records(chunks: AsyncIterator[bytes], progress: ImportProgress) -> AsyncIterator[Dict[str, Any]]:
+    """One note per line: {"title", "content", optional "folder_id", "created_at", "updated_at"}"""
+    buffer = b""
+    line_number = 0
+    size = 0
+
+    def parse(line: bytes) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+        except ValueError:
+            progress.error(f"line {line_number}: not valid JSON")
+            return None
+        if not isinstance(record, dict) or not isinstance(record.get("content", ""), str):
+            progress.error(f"line {line_number}: expected an object with a string content")
+            return None
+        content = record.get("content") or ""
+        title = record.get("title")
+        return {
+            "title": title if isinstance(title, str) and title else _title_of(content, f"Imported note {line_number}"),
+            "content": content,
+            "folder_id": record.get("folder_id"),
+            "created_at": _parse_time(record.get("created_at")),
+            "updated_at": _parse_time(record.get("updated_at"))
+        }
+
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > settings.NOTE_IMPORT_MAX_BYTES:
+            raise ImportTooLarge(f"Import exceeds {settings.NOTE_IMPORT_MAX_BYTES} bytes")
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            record = parse(line)
+            if record is not None:
+                yield record
+    line_number += 1
+    record = parse(buffer)
+    if record is not None:
+        yield record
+
+async def spool(chunks: AsyncIterator[bytes]) -> str:
+    """Write a streamed body to a temp file (zip needs random access) and return its path"""
+    fd, path = tempfile.mkstemp(prefix=".import-", suffix=".zip")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.NOTE_IMPORT_MAX_BYTES:
+                    raise ImportTooLarge(f"Import exceeds {settings.NOTE_IMPORT_MAX_BYTES} bytes")
+                await asyncio.to_thread(buffer.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+async def zip_records(path: str, progress: ImportProgress) -> AsyncIterator[Dict[str, Any]]:
+    """One note per markdown or text file; the directories inside the zip become folders"""
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        progress.error("not a valid zip file")
+        return
+    with archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        # The upload limit only bounds the compressed size; check what it unpacks to before reading
+        if len(members) > settings.NOTE_IMPORT_MAX_FILES:
+            raise ImportTooLarge(f"Zip holds more than {settings.NOTE_IMPORT_MAX_FILES} files")
+        if sum(info.file_size for info in members) > settings.NOTE_IMPORT_MAX_BYTES:
+            raise ImportTooLarge(f"Zip unpacks to more than {settings.NOTE_IMPORT_MAX_BYTES} bytes")
+
+        def read(info: zipfile.ZipInfo) -> bytes:
+            # Bounded, since the sizes in the zip's directory need not match its data
+            with archive.open(info) as member:
+                return member.read(settings.NOTE_IMPORT_MAX_FILE_BYTES + 1)
+
+        unpacked = 0
+        for info in members:
+            name = info.filename
+            parts = name.split("/")
+            if any(part.startswith((".", "__MACOSX")) for part in parts):
+                continue
+            if not name.lower().endswith(NOTE_EXTENSIONS):
+                progress.error(f"{name}: not a markdown or text file")
+                continue
+            if info.file_size > settings.NOTE_IMPORT_MAX_FILE_BYTES:
+                progress.error(f"{name}: larger than {settings.NOTE_IMPORT_MAX_FILE_BYTES} bytes")
+                continue
+            try:
+                data = await asyncio.to_thread(read, info)
+            except (zipfile.BadZipFile, OSError) as e:
+                progress.error(f"{name}: {e}")
+                continue
+            if len(data) > settings.NOTE_IMPORT_MAX_FILE_BYTES:
+                progress.error(f"{name}: larger than {settings.NOTE_IMPORT_MAX_FILE_BYTES} bytes")
+                continue
+            unpacked += len(data)
+            if unpacked > settings.NOTE_IMPORT_MAX_BYTES:
+                raise ImportTooLarge(f"Zip unpacks to more than {settings.NOTE_IMPORT_MAX_BYTES} bytes")
+            content = data.decode("utf-8", errors="replace")
+            modified = datetime(*info.date_time)
+            yield {
+                "title": _title_of(content, posixpath.splitext(parts[-1])[0]),
+                "content": content,
+                "folder_path": tuple(parts[:-1]),
+                "created_at": modified,
+                "updated_at": modified
+            }
+
+class NoteImporter:
+    """Bulk note import: batched inserts, then packed AI enrichment in the background
+
+    Notes are inserted NOTE_IMPORT_BATCH at a time, each batch one multi-row
+    INSERT through the write queue, and indexed for search as they land. Once
+    all rows are in, short notes are enriched NOTE_IMPORT_PACK_NOTES to a
+    prompt with at most NOTE_IMPORT_CONCURRENCY calls in flight. Packs the model
+    cannot answer (outage, malformed output) are flagged for the background note
+    enricher instead, which handles them one note at a time.
+    """
+
+    def __init__(self, max_tracked: int = 100):
+        self.max_tracked = max_tracked
+        self._imports: "OrderedDict[str, ImportProgress]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get(self, import_id: str, owner_id) -> Optional[ImportProgress]:
+        progress = self._imports.get(import_id)
+        return progress if progress is not None and progress.owner_id == str(owner_id) else None
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def run(
+        self,
+        records: AsyncIterator[Dict[str, Any]],
+        progress: ImportProgress,
+        folder_id: Optional[uuid.UUID] = None,
+        enrich: bool = True
+    ) -> ImportProgress:
+        """Insert every record, then start enrichment in the background; returns once rows are in"""
+        self._imports[progress.id] = progress
+        while len(self._imports) > self.max_tracked:
+            self._imports.popitem(last=False)
+
+        base = await self._owned_folder(progress.owner_id, folder_id) if folder_id else None
+        folders: Dict[Tuple[str, ...], Folder] = {}
+        known_folders: Set[uuid.UUID] = set()
+        to_enrich: List[Tuple[uuid.UUID, int]] = []
+        batch: List[Dict[str, Any]] = []
+
+        async for record in records:
+            if "folder_path" in record:
+                target = await self._folder_for(progress.owner_id, base, record.pop("folder_path"), folders)
+                record["folder_id"] = target.id if target else None
+            elif record["folder_id"] or base:
+                record["folder_id"] = await self._checked_folder(
+                    progress, record["folder_id"] or base.id, known_folders
+                )
+                if record["folder_id"] is False:
+                    continue
+
+            now = datetime.utcnow()
+            note_id = uuid.uuid4()
+            created_at = record["created_at"] or record["updated_at"] or now
+            batch.append({
+                "id": note_id,
+                "title": record["title"][:500],
+                "content": record["content"],
+                "folder_id": record["folder_id"],
+                "owner_id": progress.owner_id,
+                "created_at": created_at,
+                "updated_at": record["updated_at"] or created_at
+            })
+            if enrich and record["content"].strip():
+                to_enrich.append((note_id, estimate_tokens(record["content"])))
+            if len(batch) >= settings.NOTE_IMPORT_BATCH:
+                await self._insert(batch, progress)
+                batch = []
+        if batch:
+            await self._insert(batch, progress)
+
+        progress.imported_at = time.monotonic()
+        progress.pending = len(to_enrich)
+        if to_enrich:
+            progress.status = "enriching"
+            task = asyncio.create_task(self._enrich_all(progress, to_enrich), name=f"note-import-{progress.id}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            progress.status = "done"
+            progress.finished_at = progress.imported_at
+        logger.info(
+            "Imported %d notes (%d skipped) in %.1fs", progress.imported, progress.skipped,
+            progress.imported_at - progress.started
+        )
+        return progress
+
+    async def _owned_folder(self, owner_id: str, folder_id: uuid.UUID) -> Folder:
+        async with AsyncSessionLocal() as db:
+            folder = (await db.execute(
+                select(Folder).where(Folder.id == folder_id, Folder.owner_id == owner_id)
+            )).scalar_one_or_none()
+        if folder is None:
+            raise LookupError("Folder not found")
+        return folder
+
+    async def _checked_folder(self, progress: ImportProgress, folder_id: Any, known: Set[uuid.UUID]):
+        """The folder id when the user owns it; False (record skipped) otherwise"""
+        try:
+            folder_id = uuid.UUID(str(folder_id))
+            if folder_id not in known:
+                await self._owned_folder(progress.owner_id, folder_id)
+        except (LookupError, ValueError):
+            progress.error(f"unknown folder {folder_id}")
+            return False
+        known.add(folder_id)
+        return folder_id
+
+    async def _folder_for(
+        self,
+        owner_id: str,
+        base: Optional[Folder],
+        path: Tuple[str, ...],
+        folders: Dict[Tuple[str, ...], Folder]
+    ) -> Optional[Folder]:
+        """The folder for a directory inside a zip, created (with its parents) on first use"""
+        if not path:
+            return base
+        if path not in folders:
+            parent = await self._folder_for(owner_id, base, path[:-1], folders)
+
+            async def create(writer):
+                return await create_folder(writer, owner_id, path[-1], parent=parent)
+
+            folders[path] = await write_queue.submit(create)
+        return folders[path]
+
+    async def _insert(self, rows: List[Dict[str, Any]], progress: ImportProgress):
+        async def write(writer):
+            # One executemany INSERT; bulk inserts skip the ORM events, so index here
+            await writer.execute(insert(Note), rows)
+            await writer.run_sync(lambda session: index_notes(session.connection(), rows))
+            await mark_dirty(writer, *{row["folder_id"] for row in rows})
+
+        await write_queue.submit(write)
+        # The whole batch is embedded and appended in one write, in a worker thread
+        await vector_store.index_notes(progress.owner_id, rows)
+        progress.imported += len(rows)
+        logger.debug("Import %s: %d notes inserted", progress.id, progress.imported)
+
+    def _packs(self, notes: List[Tuple[uuid.UUID, int]]) -> List[List[uuid.UUID]]:
+        """Group short notes in import order; a note over half the pack budget goes alone"""
+        packs, current, tokens = [], [], 0
+        for note_id, size in notes:
+            if size > settings.NOTE_IMPORT_PACK_TOKENS // 2:
+                packs.append([note_id])
+                continue
+            if current and (len(current) >= settings.NOTE_IMPORT_PACK_NOTES
+                            or tokens + size > settings.NOTE_IMPORT_PACK_TOKENS):
+                packs.append(current)
+                current, tokens = [], 0
+            current.append(note_id)
+            tokens += size
+        if current:
+            packs.append(current)
+        return packs
+
+    async def _enrich_all(self, progress: ImportProgress, notes: List[Tuple[uuid.UUID, int]]):
+        remaining = {note_id for note_id, _ in notes}
+        semaphore = asyncio.Semaphore(settings.NOTE_IMPORT_CONCURRENCY)
+
+        async def enrich_pack(pack: List[uuid.UUID]):
+            async with semaphore:
+                await self._enrich_pack(progress, pack)
+                remaining.difference_update(pack)
+                progress.pending = len(remaining)
+
+        try:
+            await asyncio.gather(*[enrich_pack(pack) for pack in self._packs(notes)])
+        except asyncio.CancelledError:
+            # Shutting down: hand whatever is left to the note enricher after restart
+            await self._flag(list(remaining))
+            raise
+        except Exception:
+            logger.exception("Import %s enrichment crashed", progress.id)
+            await self._flag(list(remaining))
+            progress.deferred += len(remaining)
+        finally:
+            progress.status = "done"
+            progress.finished_at = time.monotonic()
+
+    async def _enrich_pack(self, progress: ImportProgress, pack: List[uuid.UUID]):
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Note.id, Note.content, Note.folder_id, Note.updated_at).where(Note.id.in_(pack))
+            )).all()
+        rows = sorted(rows, key=lambda row: pack.index(row.id))
+        if not rows:
+            return
+        try:
+            progress.model_calls += 1
+            if len(rows) == 1:
+                results = [await gemini_service.enrich(rows[0].content)]
+            else:
+                results = await gemini_service.enrich_batch([row.content for row in rows])
+        except AIError as e:
+            logger.warning("Import %s: deferring enrichment of %d notes: %s", progress.id, len(rows), e)
+            await self._flag([row.id for row in rows])
+            progress.deferred += len(rows)
+            return
+
+        async def write(writer):
+            # ORM bulk UPDATE by primary key; updated_at is carried over so imported dates stay put
+            await writer.execute(update(Note), [
+                {
+                    "id": row.id,
+                    "ai_summary": result["summary"],
+                    "ai_tags": result["tags"],
+                    "ai_difficulty": result["difficulty"],
+                    "ai_signature": content_signature(row.content),
+                    "updated_at": row.updated_at
+                }
+                for row, result in zip(rows, results)
+            ])
+            await mark_dirty(writer, *{row.folder_id for row in rows})
+
+        await write_queue.submit(write)
+        progress.enriched += len(rows)
+
+    async def _flag(self, note_ids: List[uuid.UUID]):
+        """Queue notes for the background note enricher"""
+        if not note_ids:
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Note).where(Note.id.in_(note_ids)).values(
+                    ai_dirty_at=datetime.utcnow(), updated_at=Note.updated_at
+                ).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+# Global instance
+note_importer = NoteImporter()
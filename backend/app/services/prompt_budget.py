@@ -0,0 +1,72 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import math
+
+from ..core.config import settings
+from .chunking import split_text
+
+logger = logging.getLogger(__name__)
+
+Condense = Callable[[str], Awaitable[str]]
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count; cheap enough to run on every prompt"""
+    return math.ceil(len(text) / settings.AI_CHARS_PER_TOKEN) if text else 0
+
+def tokens_to_chars(tokens: int) -> int:
+    return int(tokens * settings.AI_CHARS_PER_TOKEN)
+
+async def fit_to_budget(text: str, condense: Condense, budget: Optional[int] = None) -> str:
+    """Map-reduce text until it fits the input token budget
+
+    The text is split into AI_MAP_CHUNK_TOKENS pieces that are condensed in
+    parallel and joined in order; if the joined result is still over budget the
+    same step runs on it again. Text already within budget is returned as is.
+    """
+    budget = budget or settings.AI_INPUT_TOKEN_BUDGET
+    level = 0
+    while estimate_tokens(text) > budget:
+        pieces = split_text(text, tokens_to_chars(settings.AI_MAP_CHUNK_TOKENS))
+        condensed = await asyncio.gather(*[condense(piece) for piece in pieces])
+        reduced = "\n\n".join(part.strip() for part in condensed if part and part.strip())
+        level += 1
+        logger.debug(
+            "Map-reduce level %d: %d pieces, %d -> %d tokens",
+            level, len(pieces), estimate_tokens(text), estimate_tokens(reduced)
+        )
+        if len(reduced) >= len(text):
+            # The model is not shrinking it; cut rather than loop
+            return reduced[:tokens_to_chars(budget)]
+        text = reduced
+    return text
+
+class TokenUsage:
+    """Model calls and prompt tokens sent, per GeminiService method"""
+
+    def __init__(self):
+        self.methods: Dict[str, Dict[str, int]] = {}
+
+    def record(self, method: str, tokens: int):
+        entry = self.methods.setdefault(method, {"calls": 0, "tokens_sent": 0, "max_tokens": 0})
+        entry["calls"] += 1
+        entry["tokens_sent"] += tokens
+        entry["max_tokens"] = max(entry["max_tokens"], tokens)
+        logger.debug("%s sent %d prompt tokens", method, tokens)
+
+    def reset(self):
+        self.methods.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = sum(entry["calls"] for entry in self.methods.values())
+        tokens = sum(entry["tokens_sent"] for entry in self.methods.values())
+        return {
+            "calls": calls,
+            "tokens_sent": tokens,
+            "avg_tokens_per_call": round(tokens / calls, 1) if calls else 0.0,
+            "input_token_budget": settings.AI_INPUT_TOKEN_BUDGET,
+            "methods": {
+                method: {**entry, "avg_tokens_per_call": round(entry["tokens_sent"] / entry["calls"], 1)}
+                for method, entry in sorted(self.methods.items())
+            }
+        }
@@ -0,0 +1,200 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: quota (429) and transient upstream failures
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class AIError(Exception):
+    """A model call failed; the message is safe to show to users"""
+
+    status_code = 502
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AIRateLimited(AIError):
+    """Our quota is used up, locally (token bucket) or upstream (429)"""
+
+    status_code = 503
+
+class AIUnavailable(AIError):
+    """Upstream is failing or timing out, or the circuit breaker is open"""
+
+    status_code = 503
+
+class AIBadResponse(AIError):
+    """The model answered, but not with something usable (e.g. malformed JSON)"""
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of an upstream error; google.api_core errors carry it as .code"""
+    if isinstance(error, asyncio.TimeoutError):
+        return 504
+    if isinstance(error, ConnectionError):
+        return 503
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, max_wait: float):
+        """Take a token, waiting for one if needed; AIRateLimited if that would take over max_wait"""
+        # Waiters queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            self._refill()
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if wait > max_wait:
+                raise AIRateLimited("AI request quota exhausted, try again shortly", retry_after=wait)
+            if wait:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+class CircuitBreaker:
+    """Fails fast after `threshold` consecutive upstream failures
+
+    Closed: calls go through. Open: calls fail immediately until `reset_timeout`
+    has passed. Half-open: one probe call goes through; its success closes the
+    circuit and its failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._probing):
+            retry_after = max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+            raise AIUnavailable("AI service is temporarily unavailable", retry_after=retry_after or self.reset_timeout)
+        if state == "half_open":
+            self._probing = True
+
+    def release(self):
+        """The call was abandoned before reaching upstream; let another one probe"""
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+                logger.warning("AI circuit breaker opened after %d consecutive failures", self.failures)
+            self.opened_at = time.monotonic()
+
+class ResilientCaller:
+    """Rate limit, retry with jittered backoff and circuit-break calls to one upstream"""
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        breaker: CircuitBreaker,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        max_wait: float
+    ):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.calls = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter: spread retries of a shared failure instead of syncing them up
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn(), retrying retryable upstream errors; raises a typed AIError on failure"""
+        for attempt in range(self.attempts):
+            try:
+                self.breaker.before_call()
+            except AIError:
+                self.rejected += 1
+                raise
+            try:
+                await self.bucket.acquire(self.max_wait)
+            except BaseException:
+                self.breaker.release()
+                self.rejected += 1
+                raise
+
+            self.calls += 1
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except AIError:
+                # Raised by the provider about the answer itself; upstream responded
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                status = error_status(e)
+                if status not in RETRYABLE_STATUSES:
+                    # The request itself was bad; upstream is healthy, so the breaker does not count it
+                    self.breaker.record_success()
+                    raise AIError(f"AI request failed: {e}") from e
+
+                self.breaker.record_failure()
+                error_type = AIRateLimited if status == 429 else AIUnavailable
+                if attempt == self.attempts - 1 or self.breaker.state != "closed":
+                    raise error_type(f"AI service is unavailable: {e}", retry_after=self.breaker.reset_timeout) from e
+                self.retries += 1
+                delay = self.backoff(attempt)
+                logger.info("AI call failed with %s, retry %d in %.1fs", status, attempt + 1, delay)
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.failures,
+            "rate_tokens": round(min(self.bucket.capacity, self.bucket.tokens), 2)
+        }
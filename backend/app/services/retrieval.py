@@ -0,0 +1,123 @@
+from collections import Counter
+from typing import Dict, List, Tuple
+import math
+import re
+
+from sqlalchemy import delete, select
+
+from ..core.config import settings
+from ..models.database import Blob, TextChunk
+from .cache import LRUCache
+from .chunking import split_text
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the "
+    "this to was were what when where which who why will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 over a blob's chunks, built from their stored term frequencies"""
+
+    def __init__(self, chunks: List[Tuple[int, int, Dict[str, int]]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks = chunks
+        self.avg_length = sum(length for _, length, _ in chunks) / len(chunks) if chunks else 0.0
+        doc_freq = Counter()
+        for _, _, term_freqs in chunks:
+            doc_freq.update(term_freqs.keys())
+        n = len(chunks)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Return (chunk ordinal, score) for the k best-matching chunks"""
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        if not terms:
+            return []
+        
+        scores = []
+        for ordinal, length, term_freqs in self.chunks:
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            for term in terms:
+                tf = term_freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((ordinal, score))
+        
+        scores.sort(key=lambda hit: hit[1], reverse=True)
+        return scores[:k]
+
+# Blobs are immutable, so a built index never goes stale
+_indexes = LRUCache(max_entries=64, ttl=3600)
+
+async def index_chunks(db, blob: Blob) -> List[TextChunk]:
+    """Split a blob's extracted text into overlapping chunks and store their term statistics"""
+    await db.execute(delete(TextChunk).where(TextChunk.blob_sha256 == blob.sha256))
+    chunks = []
+    for ordinal, text in enumerate(
+        split_text(blob.extracted_text or "", settings.RAG_CHUNK_SIZE, settings.RAG_CHUNK_OVERLAP)
+    ):
+        terms = tokenize(text)
+        chunks.append(TextChunk(
+            blob_sha256=blob.sha256,
+            ordinal=ordinal,
+            text=text,
+            length=len(terms),
+            term_freqs=dict(Counter(terms))
+        ))
+    db.add_all(chunks)
+    _indexes.delete(blob.sha256)
+    return chunks
+
+async def chunk_texts(db, blob_sha256: str) -> List[str]:
+    """A blob's chunk texts in order"""
+    return list((await db.execute(
+        select(TextChunk.text).where(TextChunk.blob_sha256 == blob_sha256).order_by(TextChunk.ordinal)
+    )).scalars())
+
+async def get_index(db, blob: Blob) -> BM25Index:
+    index = _indexes.get(blob.sha256)
+    if index is None:
+        rows = (await db.execute(
+            select(TextChunk.ordinal, TextChunk.length, TextChunk.term_freqs).where(
+                TextChunk.blob_sha256 == blob.sha256
+            )
+        )).all()
+        index = BM25Index([(ordinal, length, term_freqs) for ordinal, length, term_freqs in rows])
+        _indexes.set(blob.sha256, index)
+    return index
+
+async def retrieve(db, blob: Blob, question: str, k: int) -> List[Tuple[TextChunk, float]]:
+    """Return the k chunks of a blob most relevant to a question, best first"""
+    has_chunks = (await db.execute(
+        select(TextChunk.id).where(TextChunk.blob_sha256 == blob.sha256).limit(1)
+    )).first()
+    if not has_chunks:
+        # Blob ingested before chunking existed
+        await db.refresh(blob, ["extracted_text"])
+        await index_chunks(db, blob)
+        await db.commit()
+    
+    hits = (await get_index(db, blob)).search(question, k)
+    if not hits:
+        # Nothing matched lexically; fall back to the opening of the document
+        hits = [(ordinal, 0.0) for ordinal in range(k)]
+    
+    scores = dict(hits)
+    chunks = list((await db.execute(
+        select(TextChunk).where(
+            TextChunk.blob_sha256 == blob.sha256,
+            TextChunk.ordinal.in_(list(scores))
+        )
+    )).scalars())
+    chunks.sort(key=lambda chunk: scores[chunk.ordinal], reverse=True)
+    return [(chunk, scores[chunk.ordinal]) for chunk in chunks]
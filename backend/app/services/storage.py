@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+from fastapi import UploadFile
+import asyncio
+import hashlib
+import os
+import tempfile
+
+from ..core.config import settings
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_FILE_SIZE"""
+
+@dataclass
+class StoredFile:
+    path: str
+    size: int
+    sha256: str
+
+async def spool_upload(upload: UploadFile, dest_dir: str) -> StoredFile:
+    """Stream an upload to a temp file in dest_dir in fixed-size chunks, hashing as it goes
+
+    The returned path is the temp file: keep_upload() moves it into place and
+    discard_upload() removes it, e.g. when the hash shows the bytes are already stored.
+    """
+    max_size = settings.MAX_FILE_SIZE
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLarge(f"File exceeds {max_size} bytes")
+    
+    os.makedirs(dest_dir, exist_ok=True)
+    # Temp file lives in the destination directory so the final rename is atomic
+    fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"File exceeds {max_size} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(buffer.write, chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    return StoredFile(path=temp_path, size=size, sha256=digest.hexdigest())
+
+def keep_upload(stored: StoredFile, filename: str) -> StoredFile:
+    """Move a spooled upload to filename next to it"""
+    file_path = os.path.join(os.path.dirname(stored.path), filename)
+    os.replace(stored.path, file_path)
+    return StoredFile(path=file_path, size=stored.size, sha256=stored.sha256)
+
+def discard_upload(stored: StoredFile):
+    if os.path.exists(stored.path):
+        os.remove(stored.path)
+
+async def save_upload(upload: UploadFile, dest_dir: str, filename: str) -> StoredFile:
+    """Stream an upload to disk in fixed-size chunks, hashing as it goes"""
+    stored = await spool_upload(upload, dest_dir)
+    try:
+        return keep_upload(stored, filename)
+    except BaseException:
+        discard_upload(stored)
+        raise
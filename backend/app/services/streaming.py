@@ -0,0 +1,118 @@
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import asyncio
+import json
+import logging
+import time
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+class StreamStats:
+    """Streamed responses by outcome, and time to first token"""
+
+    def __init__(self, samples: int = 1000):
+        self.ttft_ms = deque(maxlen=samples)
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _percentile(self, pct: float) -> float:
+        ordered = sorted(self.ttft_ms)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1) if ordered else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "ttft_ms_p50": self._percentile(50),
+            "ttft_ms_p95": self._percentile(95),
+            "ttft_samples": len(self.ttft_ms)
+        }
+
+stream_stats = StreamStats()
+
+def sse_event(event: str, data: Any) -> str:
+    # JSON keeps newlines in the text from ending the event early
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def sse_events(
+    request: Request,
+    chunks: AsyncIterator[str],
+    started: float,
+    done: Optional[Callable[[str], Dict[str, Any]]] = None
+) -> AsyncIterator[str]:
+    """Forward model text chunks as SSE "token" events, ending with "done" or "error"
+
+    The model is read by a separate task into a bounded buffer, so a slow client
+    stops it being read further (backpressure) and the heartbeat keeps the
+    disconnect check running while the model is silent. When the client goes
+    away the reader is cancelled and the model stream closed, so no further
+    tokens are paid for. `started` is when the request arrived, so time to first
+    token includes any retrieval done before the model call.
+    """
+    stream_stats.started += 1
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=settings.AI_STREAM_BUFFER)
+
+    async def read_model():
+        try:
+            async with aclosing(chunks) as stream:
+                async for chunk in stream:
+                    await buffer.put(chunk)
+        except Exception as e:
+            await buffer.put(e)
+        else:
+            await buffer.put(_END)
+
+    reader = asyncio.create_task(read_model())
+    parts = []
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(buffer.get(), timeout=settings.AI_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                item = None
+            if await request.is_disconnected():
+                stream_stats.cancelled += 1
+                return
+            if item is None:
+                yield ": ping\n\n"
+            elif item is _END:
+                stream_stats.completed += 1
+                text = "".join(parts)
+                yield sse_event("done", done(text) if done else {})
+                return
+            elif isinstance(item, Exception):
+                stream_stats.failed += 1
+                logger.warning("Model stream failed: %s", item)
+                yield sse_event("error", {"detail": f"Generation failed: {item}"})
+                return
+            else:
+                if not parts:
+                    stream_stats.ttft_ms.append((time.perf_counter() - started) * 1000)
+                parts.append(item)
+                yield sse_event("token", {"text": item})
+    except (asyncio.CancelledError, GeneratorExit):
+        # Starlette cancelled the response or a write failed: the client saw the disconnect first
+        stream_stats.cancelled += 1
+        raise
+    finally:
+        reader.cancel()
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
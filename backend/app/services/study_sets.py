@@ -0,0 +1,114 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import weakref
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from ..models.database import Blob, StudyArtifact
+from .gemini_service import gemini_service
+
+logger = logging.getLogger(__name__)
+
+# What the flashcard and quiz endpoints ask for by default; built ahead of time at ingest
+DEFAULT_VARIANTS = [
+    ("flashcards", {"count": 10}),
+    ("quiz", {"difficulty": "medium", "count": 5}),
+]
+
+# One generation per (blob, kind, params) at a time; concurrent requests wait for it
+_locks: "weakref.WeakValueDictionary[Tuple[str, str, str], asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+async def latest_artifact(db, blob_sha256: str, kind: str, params: Dict[str, Any]) -> Optional[StudyArtifact]:
+    return (await db.execute(
+        select(StudyArtifact).where(
+            StudyArtifact.blob_sha256 == blob_sha256,
+            StudyArtifact.kind == kind,
+            StudyArtifact.params == params_key(params)
+        ).order_by(StudyArtifact.version.desc()).limit(1)
+    )).scalar()
+
+# GeminiService method generating each kind
+_METHODS = {"flashcards": "generate_flashcards", "quiz": "generate_quiz"}
+
+async def _generate(kind: str, text: str, params: Dict[str, Any], bypass_cache: bool):
+    if kind == "flashcards":
+        return await gemini_service.generate_flashcards(text, params["count"], bypass_cache=bypass_cache)
+    return await gemini_service.generate_quiz(
+        text, params["difficulty"], params["count"], bypass_cache=bypass_cache
+    )
+
+def _is_empty(kind: str, payload) -> bool:
+    return not (payload.get("questions") if kind == "quiz" else payload)
+
+async def get_or_generate(
+    db,
+    blob: Blob,
+    kind: str,
+    params: Dict[str, Any],
+    regenerate: bool = False
+) -> Optional[StudyArtifact]:
+    """Serve the latest stored set, generating a new version when there is none or regenerate is set
+
+    Returns None when the model produced nothing usable; empty sets are never stored.
+    """
+    if not regenerate:
+        artifact = await latest_artifact(db, blob.sha256, kind, params)
+        if artifact is not None:
+            return artifact
+
+    # Release the connection; requests may queue on the lock for the length of a model call
+    await db.commit()
+    key = (blob.sha256, kind, params_key(params))
+    lock = _locks.get(key)
+    if lock is None:
+        lock = _locks[key] = asyncio.Lock()
+
+    async with lock:
+        if not regenerate:
+            # Whoever held the lock may have just stored it
+            artifact = await latest_artifact(db, blob.sha256, kind, params)
+            if artifact is not None:
+                await db.commit()
+                return artifact
+
+        text = (await db.execute(select(Blob.extracted_text).where(Blob.sha256 == blob.sha256))).scalar()
+        await db.commit()
+        if not text:
+            return None
+
+        # A regeneration must not be answered from the response cache
+        payload = await _generate(kind, text, params, bypass_cache=regenerate)
+        if _is_empty(kind, payload):
+            return None
+
+        latest = await latest_artifact(db, blob.sha256, kind, params)
+        artifact = StudyArtifact(
+            blob_sha256=blob.sha256,
+            kind=kind,
+            params=params_key(params),
+            version=latest.version + 1 if latest else 1,
+            model=gemini_service.model_for(_METHODS[kind]),
+            payload=payload
+        )
+        db.add(artifact)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Another process stored this version first; serve theirs
+            await db.rollback()
+            return await latest_artifact(db, blob.sha256, kind, params)
+        return artifact
+
+async def pregenerate(db, blob: Blob):
+    """Build the default flashcard set and quiz so the first request is served from storage"""
+    for kind, params in DEFAULT_VARIANTS:
+        try:
+            await get_or_generate(db, blob, kind, params)
+        except Exception as e:
+            logger.warning("Pre-generating %s for blob %s failed: %s", kind, blob.sha256, e)
@@ -0,0 +1,289 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from ..core.config import settings
+from .chunking import split_text
+from .retrieval import tokenize
+
+class HashingEmbedder:
+    """Offline embedding: signed feature hashing of unigrams and bigrams, L2-normalised"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        tokens = tokenize(text)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _hamming(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distance from every packed code to the query code"""
+    diff = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count") and diff.shape[1] % 8 == 0:
+        # NumPy 2 popcount over 64-bit words is several times faster than the table
+        return np.bitwise_count(diff.view(np.uint64)).sum(axis=1, dtype=np.uint16)
+    return _POPCOUNT[diff].sum(axis=1, dtype=np.uint16)
+
+class VectorIndex:
+    """Per-user memory-mapped vector index with SimHash candidate search and exact re-ranking
+
+    Files in the index directory, all append-only between compactions:
+      vectors.f16    float16 embeddings, one row per chunk
+      codes.u8       sign bits of a random projection, used for Hamming-distance ANN
+      entries.jsonl  [kind, item_id, chunk] for each row
+      deleted.log    row numbers that have been tombstoned
+
+    The API server and ingestion worker processes share these files. Every
+    operation holds an flock on index.lock (exclusive to write, shared to
+    search) and first reloads if another process has changed the files, so new
+    rows are always numbered from the files, never from a stale in-memory count.
+    """
+
+    def __init__(self, path: str, embedder: HashingEmbedder, code_bits: int):
+        self.path = path
+        self.embedder = embedder
+        self.code_bytes = code_bits // 8
+        rng = np.random.default_rng(0)  # fixed so codes stay comparable across restarts
+        self.projection = rng.standard_normal((embedder.dim, code_bits)).astype(np.float32)
+        os.makedirs(path, exist_ok=True)
+        # flock excludes other processes; threads of this one also share the in-memory state
+        self._mutex = threading.RLock()
+        self._loaded: Optional[Tuple] = None
+        with self._locked(exclusive=False):
+            pass
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _stamp(self) -> Tuple:
+        """Identity and size of the files other processes append to or replace"""
+        stamp = []
+        for name in ("entries.jsonl", "deleted.log"):
+            try:
+                stat = os.stat(self._file(name))
+            except FileNotFoundError:
+                stamp.append(None)
+            else:
+                stamp.append((stat.st_ino, stat.st_size))
+        return tuple(stamp)
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._mutex, open(self._file("index.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if self._stamp() != self._loaded:
+                    self._load()
+                yield
+                if exclusive:
+                    # Our own writes are already reflected in memory
+                    self._loaded = self._stamp()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self):
+        self._loaded = self._stamp()
+        self.entries: List[Tuple[str, str, int]] = []
+        self.deleted = set()
+        if os.path.exists(self._file("entries.jsonl")):
+            with open(self._file("entries.jsonl")) as f:
+                self.entries = [tuple(json.loads(line)) for line in f if line.strip()]
+        if os.path.exists(self._file("deleted.log")):
+            with open(self._file("deleted.log")) as f:
+                self.deleted = {int(line) for line in f if line.strip()}
+
+        self._live = np.ones(len(self.entries), dtype=bool)
+        if self.deleted:
+            self._live[list(self.deleted)] = False
+        self._rows_by_item: Dict[Tuple[str, str], List[int]] = {}
+        for row, (kind, item_id, _) in enumerate(self.entries):
+            if row not in self.deleted:
+                self._rows_by_item.setdefault((kind, item_id), []).append(row)
+        self._map()
+
+    def _map(self):
+        count = len(self.entries)
+        if count:
+            self.vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode="r", shape=(count, self.embedder.dim))
+            self.codes = np.memmap(self._file("codes.u8"), dtype=np.uint8, mode="r", shape=(count, self.code_bytes))
+        else:
+            self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float16)
+            self.codes = np.zeros((0, self.code_bytes), dtype=np.uint8)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors @ self.projection > 0, axis=1)
+
+    def add(self, kind: str, item_id: str, texts: List[str]):
+        """Append one row per chunk of an item"""
+        self.replace_many(kind, [(item_id, texts)], delete=False)
+
+    def replace_many(self, kind: str, items: List[Tuple[str, List[str]]], delete: bool = True):
+        """Tombstone the current rows of each item, then append their new chunks in one write"""
+        texts = [text for _, chunks in items for text in chunks]
+        # Embedding is the slow part and needs no lock
+        vectors = self.embedder.embed_many(texts)
+        codes = self._encode(vectors)
+        with self._locked(exclusive=True):
+            if delete:
+                self._delete(kind, [item_id for item_id, _ in items])
+            if not texts:
+                return
+            first_row = len(self.entries)
+            with open(self._file("vectors.f16"), "ab") as f:
+                f.write(vectors.astype(np.float16).tobytes())
+            with open(self._file("codes.u8"), "ab") as f:
+                f.write(codes.tobytes())
+            new_entries = [(kind, item_id, chunk) for item_id, chunks in items for chunk in range(len(chunks))]
+            # Written last: a row counts once its entry line exists
+            with open(self._file("entries.jsonl"), "a") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in new_entries)
+
+            self.entries.extend(new_entries)
+            self._live = np.concatenate([self._live, np.ones(len(new_entries), dtype=bool)])
+            for row, (_, item_id, _) in enumerate(new_entries, first_row):
+                self._rows_by_item.setdefault((kind, item_id), []).append(row)
+            self._map()
+
+    def delete(self, kind: str, item_id: str):
+        """Tombstone every row of an item; compacts once a quarter of rows are dead"""
+        with self._locked(exclusive=True):
+            self._delete(kind, [item_id])
+
+    def _delete(self, kind: str, item_ids: Iterable[str]):
+        rows = [row for item_id in item_ids for row in self._rows_by_item.pop((kind, item_id), [])]
+        if not rows:
+            return
+        with open(self._file("deleted.log"), "a") as f:
+            f.writelines(f"{row}\n" for row in rows)
+        self.deleted.update(rows)
+        self._live[rows] = False
+        if len(self.deleted) > len(self.entries) // 4:
+            self._compact()
+
+    def compact(self):
+        """Rewrite the files without deleted rows"""
+        with self._locked(exclusive=True):
+            self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._live)
+        vectors = np.array(self.vectors[keep])
+        codes = np.array(self.codes[keep])
+        entries = [self.entries[i] for i in keep]
+        self.vectors = self.codes = None  # release the maps before rewriting
+        for name, data in (("vectors.f16", vectors.tobytes()), ("codes.u8", codes.tobytes())):
+            temp_path = self._file(name + ".tmp")
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._file(name))
+        temp_path = self._file("entries.jsonl.tmp")
+        with open(temp_path, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        os.replace(temp_path, self._file("entries.jsonl"))
+        if os.path.exists(self._file("deleted.log")):
+            os.remove(self._file("deleted.log"))
+        self._load()
+
+    def search(self, query: str, k: int, candidates: int) -> List[Tuple[str, str, int, float]]:
+        """Return (kind, item_id, chunk, cosine score) for the best k live rows"""
+        query_vector = self.embedder.embed(query)
+        if not query_vector.any():
+            return []
+        query_code = self._encode(query_vector[None, :])[0]
+
+        with self._locked(exclusive=False):
+            if not self.entries:
+                return []
+            # Hamming distance between SimHash codes approximates angular distance
+            distances = _hamming(self.codes, query_code)
+            distances[~self._live] = np.iinfo(np.uint16).max
+            pool = min(candidates, len(distances))
+            shortlist = np.argpartition(distances, pool - 1)[:pool]
+            shortlist = shortlist[self._live[shortlist]]
+
+            # Exact cosine re-ranking of the shortlist
+            scores = self.vectors[shortlist].astype(np.float32) @ query_vector
+            order = np.argsort(-scores)[:k]
+            return [
+                (*self.entries[shortlist[i]], float(scores[i]))
+                for i in order
+                if scores[i] > 0
+            ]
+
+    def __len__(self) -> int:
+        return len(self.entries) - len(self.deleted)
+
+class VectorStore:
+    """Opens and caches one VectorIndex per user; the async methods run index work in a thread"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.embedder = HashingEmbedder(settings.EMBEDDING_DIM)
+        self._indexes: Dict[str, VectorIndex] = {}
+        self._open_lock = threading.Lock()
+
+    def for_user(self, user_id: str) -> VectorIndex:
+        user_id = str(user_id)
+        with self._open_lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                index = VectorIndex(os.path.join(self.root, user_id), self.embedder, settings.VECTOR_CODE_BITS)
+                self._indexes[user_id] = index
+        return index
+
+    async def index_note(self, note):
+        """(Re)index a note's title and content chunks"""
+        await self.index_notes(note.owner_id, [{"id": note.id, "title": note.title, "content": note.content}])
+
+    async def index_notes(self, owner_id, notes: Iterable[Dict[str, Any]]):
+        """(Re)index many notes of one user, given as dicts with id, title and content, in one write"""
+        notes = [(str(note["id"]), note["title"], note["content"]) for note in notes]
+
+        def work():
+            items = [(note_id, note_chunks(title, content)) for note_id, title, content in notes]
+            self.for_user(owner_id).replace_many("note", items)
+
+        await asyncio.to_thread(work)
+
+    async def index_document(self, document, chunk_texts: List[str]):
+        """(Re)index a document under its blob's retrieval chunks"""
+        owner_id, document_id = document.owner_id, str(document.id)
+        await asyncio.to_thread(
+            lambda: self.for_user(owner_id).replace_many("document", [(document_id, chunk_texts)])
+        )
+
+    async def remove(self, user_id: str, kind: str, item_id: str):
+        await asyncio.to_thread(lambda: self.for_user(user_id).delete(kind, str(item_id)))
+
+    async def search(self, user_id: str, query: str, k: int) -> List[Tuple[str, str, int, float]]:
+        return await asyncio.to_thread(
+            lambda: self.for_user(user_id).search(query, k, settings.VECTOR_RERANK_CANDIDATES)
+        )
+
+def note_chunks(title: str, content: Optional[str]) -> List[str]:
+    """Chunks a note is indexed under; the title leads the first one"""
+    text = f"{title}\n\n{content or ''}"
+    return split_text(text, settings.RAG_CHUNK_SIZE, settings.RAG_CHUNK_OVERLAP)
+
+# Global instance
+vector_store = VectorStore(settings.VECTOR_INDEX_DIR)
@@ -0,0 +1,116 @@
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..models.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+WriteFn = Callable[[Any], Awaitable[Any]]
+
+class WriteQueue:
+    """Single writer that runs queued write functions and commits them in groups
+
+    While one group is committing, new writes pile up in the queue and the next
+    group takes all of them, so N concurrent saves cost one commit (one fsync and
+    one hold of SQLite's write lock) instead of N. Each write runs in its own
+    SAVEPOINT, so a failing write is rolled back without taking its group with it.
+    """
+
+    def __init__(self, session_factory, max_batch: int, enabled: bool = True):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.enabled = enabled
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.commits = 0
+        self.writes = 0
+
+    async def submit(self, write: WriteFn) -> Any:
+        """Run write(session) in the next group commit and return its result once committed"""
+        if not self.enabled:
+            async with self.session_factory() as db:
+                result = await write(db)
+                await db.commit()
+                return result
+
+        self._ensure_writer()
+        future = self._loop.create_future()
+        self._queue.put_nowait((write, future))
+        return await future
+
+    def _ensure_writer(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._writer is None or self._writer.done():
+            # (Re)start on first use in this event loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._writer = loop.create_task(self._run(), name="db-group-writer")
+
+    async def stop(self):
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit(batch)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.cancel()
+                raise
+            except Exception as e:
+                # e.g. the write lock could not be taken; fail the whole group
+                logger.exception("Group commit of %d writes crashed", len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _commit(self, batch: List[Tuple[WriteFn, asyncio.Future]]):
+        outcomes = []
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "sqlite":
+                # pysqlite only begins a transaction at the first DML, so releasing the first
+                # SAVEPOINT would commit it on its own; take the write lock explicitly instead
+                await db.execute(text("BEGIN IMMEDIATE"))
+            for write, future in batch:
+                if future.done():  # caller gave up (request cancelled)
+                    continue
+                try:
+                    async with db.begin_nested():
+                        result = await write(db)
+                except Exception as e:
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+
+            try:
+                await db.commit()
+            except Exception as e:
+                for future, _, _ in outcomes:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        self.commits += 1
+        self.writes += len(outcomes)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+# Global instance
+write_queue = WriteQueue(AsyncSessionLocal, settings.DB_GROUP_COMMIT_MAX, settings.DB_GROUP_COMMIT)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Bulk note import: one POST per note vs POST /api/notes/bulk
+
+Imports --notes generated notes of about --words words each, against the offline
+stub provider (--latency seconds per call), two ways:
+
+  per-note  POST /api/notes/ for each note, --concurrency requests in flight;
+            every create waits for its own enrich call
+  bulk      one streamed NDJSON POST /api/notes/bulk: rows go in with batched
+            multi-row INSERTs, then short notes are enriched several to a prompt
+            in the background (polled through GET /api/notes/bulk/{id})
+
+and reports the time until the notes are stored, the time until they are all
+enriched, notes per second, model calls and prompt tokens sent.
+
+    cd backend && python benchmarks/bench_bulk_import.py
+    cd backend && python benchmarks/bench_bulk_import.py --notes 5000 --words 80
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["derivative", "integral", "limit", "series", "vector", "matrix", "eigenvalue", "gradient",
+         "theorem", "proof", "function", "continuity", "convergence", "tangent", "area", "volume"]
+
+
+def make_notes(count: int, words: int):
+    rng = random.Random(3)
+    return [
+        {"title": f"Flashcard {i}", "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(words // 2, words * 3 // 2)))}
+        for i in range(count)
+    ]
+
+
+async def per_note(client: httpx.AsyncClient, notes, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(note):
+        async with semaphore:
+            (await client.post("/api/notes/", json=note)).raise_for_status()
+
+    await asyncio.gather(*[create(note) for note in notes])
+    # Every note is enriched by the time its POST returns
+    return None
+
+
+async def bulk(client: httpx.AsyncClient, notes):
+    async def body():
+        for start in range(0, len(notes), 100):
+            yield "".join(json.dumps(note) + "\n" for note in notes[start:start + 100]).encode()
+
+    response = await client.post("/api/notes/bulk", content=body(), headers={"Content-Type": "application/x-ndjson"})
+    response.raise_for_status()
+    stored = time.perf_counter()
+    progress = response.json()
+    while progress["status"] != "done":
+        await asyncio.sleep(0.05)
+        progress = (await client.get(f"/api/notes/bulk/{progress['import_id']}")).json()
+    return stored
+
+
+async def run(client: httpx.AsyncClient, label: str, notes, work):
+    from app.services.gemini_service import gemini_service
+
+    gemini_service.usage.reset()
+    start = time.perf_counter()
+    stored = await work
+    done = time.perf_counter()
+    stored = stored or done
+    stats = gemini_service.usage.stats()
+    print(f"{label:<9} {stored - start:>9.2f} {done - start:>10.2f} {len(notes) / (stored - start):>9.0f} "
+          f"{stats['calls']:>7} {stats['tokens_sent']:>12}")
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine, init_db
+    from app.services.gemini_service import gemini_service
+    from app.services.llm import StubProvider
+
+    init_db()
+    gemini_service.provider = StubProvider(latency=args.latency)
+    notes = make_notes(args.notes, args.words)
+    print(f"{args.notes} notes of ~{args.words} words, model latency {args.latency:.2f}s")
+    print(f"{'mode':<9} {'stored s':>9} {'enriched s':>10} {'notes/s':>9} {'calls':>7} {'tokens sent':>12}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await run(client, "per-note", notes, per_note(client, notes, args.concurrency))
+        await run(client, "bulk", notes, bulk(client, notes))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=60, help="average words per note")
+    parser.add_argument("--concurrency", type=int, default=8, help="per-note requests in flight")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stubbed model call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        os.environ["AI_CACHE_ENABLED"] = "false"
+        asyncio.run(main(args))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Event loop responsiveness under AI load
+
+Measures /health latency while 50 AI calls are in flight against the offline
+stub provider, so no Gemini key or network is needed.
+
+    cd backend && python benchmarks/bench_event_loop.py
+    cd backend && python benchmarks/bench_event_loop.py --blocking   # old sync behaviour
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.services.gemini_service import gemini_service
+from app.services.llm import LLMResponse, StubProvider
+
+
+class BlockingStubProvider(StubProvider):
+    """Stub that sleeps on the event loop thread, like the old synchronous SDK call"""
+
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        return LLMResponse(self.answer(prompt, task))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def sample_health(client: httpx.AsyncClient, count: int, interval: float):
+    # Latency is measured from when the probe was due, so time spent waiting
+    # for a blocked event loop to wake the prober counts against it
+    latencies = []
+    for _ in range(count):
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await client.get("/health")
+        latencies.append((time.perf_counter() - due) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    print(
+        f"{label:<22} p50={statistics.median(latencies):7.2f} ms  "
+        f"p99={percentile(latencies, 99):7.2f} ms  max={max(latencies):7.2f} ms"
+    )
+
+
+async def main(args):
+    provider = BlockingStubProvider if args.blocking else StubProvider
+    gemini_service.provider = provider(latency=args.latency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.get("/health")  # warm up routing
+        idle = await sample_health(client, args.samples, 0.01)
+
+        start = time.perf_counter()
+        ai_task = asyncio.gather(*[
+            client.post("/api/ai/explain", json={"concept": f"concept {i}"})
+            for i in range(args.calls)
+        ])
+        loaded, _ = await asyncio.gather(sample_health(client, args.samples, 0.01), ai_task)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.calls} AI calls, stub latency {args.latency}s, blocking={args.blocking}")
+    report("/health idle", idle)
+    report("/health under AI load", loaded)
+    print(f"All AI calls completed in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--blocking", action="store_true", help="simulate the old synchronous model call")
+    asyncio.run(main(parser.parse_args()))
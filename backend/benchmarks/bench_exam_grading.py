@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Exam engine: question bank reuse, grading and analytics cost
+
+Seeds a folder with --notes notes and one ready document, then against the
+offline stub provider (--latency seconds per call):
+
+  generate   two --questions question exams from the folder; the second is
+             drawn from the question banks the first one built, so it should
+             cost no model calls
+  submit     POST /api/exams/{id}/submit end to end (grade and store the
+             attempt), --submissions times
+  analytics  per-question statistics over every stored attempt, as a Python
+             loop over attempts and questions vs question_stats() on the
+             (attempts x questions) matrix, and GET /api/exams/{id}/analytics
+             end to end
+
+    cd backend && python benchmarks/bench_exam_grading.py
+    cd backend && python benchmarks/bench_exam_grading.py --questions 100 --submissions 1000
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["mitochondria", "ribosome", "membrane", "protein", "enzyme", "nucleus", "chloroplast", "osmosis",
+         "diffusion", "glucose", "respiration", "photosynthesis", "gradient", "synthesis", "transport"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(notes: int):
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.models.database import Blob, Document, Folder, Note, engine, init_db
+
+    init_db()
+    rng = random.Random(11)
+    now = datetime.utcnow()
+    folder_id = uuid.uuid4()
+    # A vocabulary per source, so the stub's questions differ between sources
+    text = " ".join(rng.choice(WORDS) + "x" for _ in range(3000))
+    sha256 = hashlib.sha256(text.encode()).hexdigest()
+    with engine.begin() as connection:
+        connection.execute(insert(Folder), [{
+            "id": folder_id, "name": "Biology", "owner_id": settings.DEMO_USER_ID, "path": f"/{folder_id}/",
+            "depth": 0, "created_at": now, "updated_at": now,
+        }])
+        # Core inserts skip the ORM search-index hooks, which this benchmark does not exercise
+        connection.execute(insert(Note), [{
+            "id": uuid.uuid4(), "title": f"Lecture {i}",
+            "content": " ".join(rng.choice(WORDS) + chr(97 + i % 23) for _ in range(400)),
+            "owner_id": settings.DEMO_USER_ID, "folder_id": folder_id, "created_at": now, "updated_at": now,
+        } for i in range(notes)])
+        connection.execute(insert(Blob), [{
+            "sha256": sha256, "file_path": f"uploads/{sha256}.txt", "file_type": "text/plain",
+            "size": len(text), "status": "ready", "created_at": now, "extracted_text": text,
+        }])
+        connection.execute(insert(Document), [{
+            "id": uuid.uuid4(), "filename": f"{sha256}.txt", "original_filename": "textbook.txt",
+            "file_path": f"uploads/{sha256}.txt", "file_type": "text/plain", "file_size": len(text),
+            "content_hash": sha256, "owner_id": settings.DEMO_USER_ID, "folder_id": folder_id, "status": "ready",
+            "progress": 100, "created_at": now, "updated_at": now,
+        }])
+    return folder_id
+
+
+def loop_stats(questions, attempts):
+    """Accuracy and answer counts per question, one attempt and question at a time"""
+    stats = []
+    for i, question in enumerate(questions):
+        right, picks = 0, [0] * len(question["options"])
+        for responses in attempts:
+            choice = responses[i]
+            if 0 <= choice < len(picks):
+                picks[choice] += 1
+            right += choice == question["correct_answer"]
+        stats.append((right / len(attempts), picks))
+    return stats
+
+
+def per_call_ms(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+async def main(args):
+    from app.main import app
+    from sqlalchemy import select
+    from app.models.database import AsyncSessionLocal, Exam, ExamAttempt, async_engine
+    from app.services.exams import question_stats
+    from app.services.gemini_service import gemini_service
+    from app.services.llm import StubProvider
+    import numpy as np
+
+    folder_id = seed(args.notes)
+    gemini_service.provider = StubProvider(latency=args.latency)
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{args.notes} notes and 1 document, {args.questions} questions, model latency {args.latency:.2f}s")
+        print(f"{'generate':<10} {'questions':>9} {'calls':>6} {'wall s':>8}")
+        exams = []
+        for label in ("first", "second"):
+            gemini_service.usage.reset()
+            start = time.perf_counter()
+            response = await client.post("/api/exams/generate", json={
+                "subject": "Biology", "folder_id": str(folder_id), "question_count": args.questions
+            })
+            response.raise_for_status()
+            exams.append(response.json())
+            print(f"{label:<10} {exams[-1]['question_count']:>9} {gemini_service.usage.stats()['calls']:>6} "
+                  f"{time.perf_counter() - start:>8.2f}")
+
+        exam = exams[0]
+        async with AsyncSessionLocal() as db:
+            stored = await db.get(Exam, uuid.UUID(exam["id"]))
+        questions = [{**q, "correct_answer": a} for q, a in zip(stored.questions, stored.answers)]
+
+        def submission():
+            return {str(q["id"]): rng.randrange(len(q["options"])) for q in exam["questions"] if rng.random() > 0.05}
+
+        latencies = []
+        for _ in range(args.submissions):
+            body = {"answers": submission(), "duration_seconds": rng.uniform(600, 1800)}
+            start = time.perf_counter()
+            response = await client.post(f"/api/exams/{exam['id']}/submit", json=body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+        print(f"\n{'submit':<10} {'p50 ms':>8} {'p99 ms':>8}")
+        print(f"{'':<10} {statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f}")
+
+        async with AsyncSessionLocal() as db:
+            attempts = list((await db.execute(
+                select(ExamAttempt.responses).where(ExamAttempt.exam_id == stored.id)
+            )).scalars())
+        key = np.asarray(stored.answers, dtype=np.int16)
+        option_counts = np.asarray([len(q["options"]) for q in questions], dtype=np.int16)
+        loop_ms = per_call_ms(lambda: loop_stats(questions, attempts), args.repeats)
+        numpy_ms = per_call_ms(
+            lambda: question_stats(key, option_counts, np.asarray(attempts, dtype=np.int16)), args.repeats
+        )
+        start = time.perf_counter()
+        (await client.get(f"/api/exams/{exam['id']}/analytics")).raise_for_status()
+        print(f"\n{'analytics':<10} {'ms':>8}   ({len(attempts)} attempts)")
+        print(f"{'loop':<10} {loop_ms:>8.2f}")
+        print(f"{'numpy':<10} {numpy_ms:>8.2f}")
+        print(f"{'endpoint':<10} {(time.perf_counter() - start) * 1000:>8.2f}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=9)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--submissions", type=int, default=300)
+    parser.add_argument("--repeats", type=int, default=20, help="analytics repetitions timed")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stubbed model call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        asyncio.run(main(args))
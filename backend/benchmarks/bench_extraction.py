@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Text extraction throughput
+
+Builds a synthetic corpus (multi-page PDF, PPTX deck, DOCX and plain text)
+and reports pages per second through the extraction worker processes.
+
+    cd backend && python benchmarks/bench_extraction.py
+    cd backend && python benchmarks/bench_extraction.py --pages 500 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services import extraction
+
+PDF = "application/pdf"
+PPTX = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TXT = "text/plain"
+
+LINE = "Photosynthesis converts light energy into chemical energy stored in glucose."
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40):
+    """Write a minimal text PDF by hand so the corpus needs no PDF writer library"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = " ".join(
+            f"({LINE} p{page} l{line}) Tj T*" for line in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+def write_pptx(path: str, slides: int):
+    from pptx import Presentation
+    deck = Presentation()
+    for i in range(slides):
+        slide = deck.slides.add_slide(deck.slide_layouts[1])
+        slide.shapes.title.text = f"Lecture slide {i}"
+        slide.placeholders[1].text = "\n".join([LINE] * 5)
+    deck.save(path)
+
+
+def write_docx(path: str, paragraphs: int):
+    import docx
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(LINE)
+    document.save(path)
+
+
+def write_txt(path: str, lines: int):
+    with open(path, "w") as f:
+        f.write("\n".join([LINE] * lines))
+
+
+async def measure(path: str, content_type: str):
+    start = time.perf_counter()
+    pages = 0
+    chars = 0
+    async for page in extraction.iter_pages(path, content_type):
+        pages += 1
+        chars += len(page)
+    return pages, chars, time.perf_counter() - start
+
+
+async def main(args):
+    settings.EXTRACTION_WORKERS = args.workers
+    with tempfile.TemporaryDirectory() as corpus:
+        files = [
+            ("pdf", PDF, lambda p: write_pdf(p, args.pages)),
+            ("pptx", PPTX, lambda p: write_pptx(p, args.pages // 5)),
+            ("docx", DOCX, lambda p: write_docx(p, args.pages * 20)),
+            ("txt", TXT, lambda p: write_txt(p, args.pages * 40)),
+        ]
+        print(f"{'file':<6} {'pages':>6} {'chars':>10} {'seconds':>8} {'pages/s':>9}")
+        for name, content_type, build in files:
+            path = os.path.join(corpus, f"corpus.{name}")
+            build(path)
+            pages, chars, elapsed = await measure(path, content_type)
+            print(f"{name:<6} {pages:>6} {chars:>10} {elapsed:>8.2f} {pages / elapsed:>9.1f}")
+
+        # Several PDFs at once show the workers parallelising across files
+        paths = []
+        for i in range(args.workers * 2):
+            path = os.path.join(corpus, f"parallel-{i}.pdf")
+            write_pdf(path, args.pages // 4)
+            paths.append(path)
+        start = time.perf_counter()
+        results = await asyncio.gather(*[measure(p, PDF) for p in paths])
+        elapsed = time.perf_counter() - start
+        total = sum(pages for pages, _, _ in results)
+        print(f"{len(paths)} PDFs concurrently: {total} pages in {elapsed:.2f}s = {total / elapsed:.1f} pages/s")
+
+    extraction.shutdown_extraction_workers()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
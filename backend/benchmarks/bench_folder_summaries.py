@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Folder summaries: naive re-summarization vs incremental rollups
+
+Seeds a --fanout-ary folder tree --depth levels deep with --notes-per-folder
+enriched notes in each leaf, then edits --edits random notes and brings every
+affected folder summary up to date two ways, against the offline stub provider:
+
+  naive        per edit, re-summarize each ancestor folder from the full text of
+               every note below it
+  incremental  the edits flag their folders dirty, then one debounced pass
+               rebuilds each dirty folder once, deepest first, from its
+               children's summaries
+
+and reports model calls, prompt tokens sent and wall time.
+
+    cd backend && python benchmarks/bench_folder_summaries.py
+    cd backend && python benchmarks/bench_folder_summaries.py --fanout 4 --depth 4 --edits 100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["cell", "membrane", "protein", "enzyme", "mitochondria", "gradient", "transport", "glucose",
+         "respiration", "ribosome", "nucleus", "synthesis", "photosynthesis", "chloroplast", "osmosis"]
+
+
+def seed(fanout: int, depth: int, per_folder: int, note_chars: int):
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.models.database import Folder, Note, engine, init_db
+
+    init_db()
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    folders, level = [], [None]
+    for d in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                folder_id = uuid.uuid4()
+                folders.append({
+                    "id": folder_id, "name": f"Unit {len(folders)}", "owner_id": settings.DEMO_USER_ID,
+                    "parent_id": parent["id"] if parent else None,
+                    "path": f"{parent['path'] if parent else '/'}{folder_id}/", "depth": d,
+                    "created_at": now, "updated_at": now,
+                })
+                next_level.append(folders[-1])
+        level = next_level
+
+    notes = []
+    for leaf in level:
+        for i in range(per_folder):
+            words = [rng.choice(WORDS) for _ in range(note_chars // 8)]
+            notes.append({
+                "id": uuid.uuid4(), "title": f"Note {len(notes)}", "content": " ".join(words),
+                "owner_id": settings.DEMO_USER_ID, "folder_id": leaf["id"], "created_at": now, "updated_at": now,
+                "ai_summary": f"Covers {words[0]}, {words[1]} and {words[2]}.", "ai_tags": words[:3],
+            })
+    with engine.begin() as connection:
+        connection.execute(insert(Folder), folders)
+        # Core inserts skip the ORM search-index hooks, which this benchmark does not exercise
+        connection.execute(insert(Note), notes)
+    return folders, notes
+
+
+async def naive(folders, notes, edited):
+    from app.services.gemini_service import gemini_service
+
+    by_id = {folder["id"]: folder for folder in folders}
+
+    async def resummarize(folder):
+        text = "\n\n".join(note["content"] for note in notes if by_id[note["folder_id"]]["path"].startswith(folder["path"]))
+        await gemini_service.generate_summary(text)
+
+    for note in edited:
+        chain = by_id[note["folder_id"]]["path"].strip("/").split("/")
+        await asyncio.gather(*[resummarize(by_id[uuid.UUID(folder_id)]) for folder_id in chain])
+
+
+async def incremental(edited):
+    from app.core.config import settings
+    from app.models.database import AsyncSessionLocal
+    from app.services.folder_summaries import folder_summarizer
+    from app.services.folders import mark_dirty
+
+    async with AsyncSessionLocal() as db:
+        for note in edited:
+            await mark_dirty(db, note["folder_id"])
+        await db.commit()
+    settings.FOLDER_SUMMARY_DEBOUNCE = 0
+    while await folder_summarizer.run_once():
+        pass
+
+
+async def run(label: str, work):
+    from app.services.gemini_service import gemini_service
+
+    gemini_service.cache.clear()
+    gemini_service.usage.reset()
+    start = time.perf_counter()
+    await work
+    elapsed = time.perf_counter() - start
+    stats = gemini_service.usage.stats()
+    print(f"{label:<12} {stats['calls']:>7} {stats['tokens_sent']:>12} {elapsed:>8.2f}")
+
+
+async def main(args):
+    from app.models.database import async_engine
+    from app.services.gemini_service import gemini_service
+    from app.services.llm import StubProvider
+
+    folders, notes = seed(args.fanout, args.depth, args.notes_per_folder, args.note_chars)
+    gemini_service.provider = StubProvider(latency=args.latency)
+    edited = random.Random(9).sample(notes, args.edits)
+    print(f"{len(folders)} folders, {len(notes)} notes of ~{args.note_chars} chars, {args.edits} edited")
+    print(f"{'mode':<12} {'calls':>7} {'tokens sent':>12} {'wall s':>8}")
+    await run("naive", naive(folders, notes, edited))
+    await run("incremental", incremental(edited))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fanout", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--notes-per-folder", type=int, default=10)
+    parser.add_argument("--note-chars", type=int, default=1000)
+    parser.add_argument("--edits", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per stubbed model call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        os.environ["AI_CACHE_ENABLED"] = "false"
+        asyncio.run(main(args))
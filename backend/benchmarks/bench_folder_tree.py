@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Folder tree loading, subtree listing and moves on a large hierarchy
+
+Seeds one user with a --fanout-ary tree of --folders folders holding notes and
+documents, then compares
+
+  adjacency  walking parent/children relationships from the roots, counting
+             each folder's notes along the way (one lazy load per folder)
+  paths      GET /api/folders/tree: the nested tree with rollups in one request
+
+and times listing every note under a top-level folder and moving a top-level
+subtree versus a single leaf. Queries are counted on the engine.
+
+    cd backend && python benchmarks/bench_folder_tree.py
+    cd backend && python benchmarks/bench_folder_tree.py --folders 50000 --fanout 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def seed(folders: int, fanout: int, notes: int, documents: int):
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.models.database import Document, Folder, Note, engine, init_db
+
+    init_db()
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(folders):
+        folder_id = uuid.uuid4()
+        # Breadth-first numbering: folder i's parent is (i - fanout) // fanout, the first `fanout` are roots
+        parent = rows[(i - fanout) // fanout] if i >= fanout else None
+        rows.append({
+            "id": folder_id, "name": f"Folder {i}", "owner_id": settings.DEMO_USER_ID,
+            "parent_id": parent["id"] if parent else None,
+            "path": f"{parent['path'] if parent else '/'}{folder_id}/",
+            "depth": parent["depth"] + 1 if parent else 0,
+            "created_at": now, "updated_at": now,
+        })
+    with engine.begin() as connection:
+        connection.execute(insert(Folder), rows)
+        # Core inserts skip the ORM search-index hooks, which this benchmark does not exercise
+        connection.execute(insert(Note), [
+            {"id": uuid.uuid4(), "title": f"Note {i}", "content": "Short note.", "owner_id": settings.DEMO_USER_ID,
+             "folder_id": rng.choice(rows)["id"], "created_at": now, "updated_at": now}
+            for i in range(notes)
+        ])
+        connection.execute(insert(Document), [
+            {"id": uuid.uuid4(), "filename": f"d{i}.txt", "original_filename": f"d{i}.txt",
+             "file_path": f"uploads/d{i}.txt", "file_type": "text/plain", "file_size": rng.randint(1000, 100000),
+             "owner_id": settings.DEMO_USER_ID, "folder_id": rng.choice(rows)["id"], "status": "ready",
+             "created_at": now, "updated_at": now}
+            for i in range(documents)
+        ])
+    return rows
+
+
+def adjacency_walk(counter: QueryCounter):
+    from app.core.config import settings
+    from app.models.database import Folder, SessionLocal
+
+    def visit(folder):
+        return {"name": folder.name, "note_count": len(folder.notes), "children": [visit(c) for c in folder.children]}
+
+    db = SessionLocal()
+    try:
+        before = counter.count
+        start = time.perf_counter()
+        roots = db.query(Folder).filter(Folder.owner_id == settings.DEMO_USER_ID, Folder.parent_id.is_(None)).all()
+        tree = [visit(root) for root in roots]
+        return (time.perf_counter() - start) * 1000, counter.count - before, tree
+    finally:
+        db.close()
+
+
+async def timed(client: httpx.AsyncClient, counter: QueryCounter, method: str, url: str, **kwargs):
+    before = counter.count
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000, counter.count - before, response.json()
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine, engine
+
+    start = time.perf_counter()
+    rows = seed(args.folders, args.fanout, args.notes, args.documents)
+    print(f"Seeded {args.folders} folders (fanout {args.fanout}, depth {rows[-1]['depth'] + 1}), "
+          f"{args.notes} notes, {args.documents} documents in {time.perf_counter() - start:.1f}s")
+
+    sync_counter = QueryCounter(engine)
+    async_counter = QueryCounter(async_engine.sync_engine)
+    print(f"{'tree load':<10} {'queries':>8} {'ms':>9}")
+    # Once only: at 10k folders a single walk takes tens of seconds
+    elapsed, queries, _ = adjacency_walk(sync_counter)
+    print(f"{'adjacency':<10} {queries:>8} {elapsed:>9.1f}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        loads = [await timed(client, async_counter, "GET", "/api/folders/tree") for _ in range(args.repeat)]
+        print(f"{'paths':<10} {loads[0][1]:>8} {statistics.median(l[0] for l in loads):>9.1f}  (p50 of {args.repeat})")
+        tree = loads[0][2]["folders"]
+        assert sum(node["note_count"] for node in tree) == args.notes
+
+        top, other = rows[0], rows[1]
+        elapsed, queries, page = await timed(
+            client, async_counter, "GET", "/api/notes/",
+            params={"folder_id": str(top["id"]), "include_subfolders": "true", "limit": 200}
+        )
+        print(f"Notes under a top-level folder (first page of {len(page['notes'])}): "
+              f"{elapsed:.1f} ms, {queries} queries")
+
+        subtree = sum(1 for row in rows if row["path"].startswith(top["path"]))
+        print(f"{'move':<24} {'folders':>8} {'queries':>8} {'ms':>8}")
+        for label, folder, size in (("top-level subtree", top, subtree), ("leaf", rows[-1], 1)):
+            elapsed, queries, _ = await timed(
+                client, async_counter, "POST", f"/api/folders/{folder['id']}/move", json={"parent_id": str(other["id"])}
+            )
+            print(f"{label:<24} {size:>8} {queries:>8} {elapsed:>8.1f}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folders", type=int, default=10000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        asyncio.run(main(args))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Note list latency with keyset pagination
+
+Seeds one user with many notes (large bodies, spread over a few folders),
+then times GET /api/notes/ for the first page, a whole cursor walk and a
+folder-filtered first page, and prints the SQLite query plan so index use
+can be checked.
+
+    cd backend && python benchmarks/bench_list_pagination.py
+    cd backend && python benchmarks/bench_list_pagination.py --notes 100000 --limit 100
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed(count: int, folders: int, body_size: int):
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.models.database import Folder, Note, engine, init_db
+
+    init_db()
+    folder_ids = [uuid.uuid4() for _ in range(folders)]
+    body = "Spaced repetition beats massed practice for long-term retention. " * (body_size // 64)
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as connection:
+        connection.execute(insert(Folder), [
+            {"id": folder_id, "name": f"Course {i}", "owner_id": settings.DEMO_USER_ID}
+            for i, folder_id in enumerate(folder_ids)
+        ])
+        # Core inserts skip the ORM search-index hooks, which this benchmark does not exercise
+        for offset in range(0, count, 5000):
+            connection.execute(insert(Note), [
+                {
+                    "id": uuid.uuid4(),
+                    "title": f"Lecture note {i}",
+                    "content": body,
+                    "folder_id": folder_ids[i % folders],
+                    "owner_id": settings.DEMO_USER_ID,
+                    "created_at": start + timedelta(minutes=i),
+                    "updated_at": start + timedelta(minutes=i),
+                    "ai_summary": f"Summary of lecture {i}",
+                    "ai_tags": ["memory", "learning"],
+                }
+                for i in range(offset, min(offset + 5000, count))
+            ])
+    return folder_ids
+
+
+def print_plan():
+    from sqlalchemy import select, text
+    from sqlalchemy.orm import load_only
+    from app.api.notes import NOTE_LIST_COLUMNS
+    from app.api.pagination import keyset_page
+    from app.core.config import settings
+    from app.models.database import Note, engine
+
+    query = keyset_page(
+        select(Note).options(load_only(*NOTE_LIST_COLUMNS)).where(Note.owner_id == settings.DEMO_USER_ID),
+        Note, None, 50
+    )
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+            print(f"  plan: {row[-1]}")
+
+
+async def timed_get(client: httpx.AsyncClient, params: dict):
+    start = time.perf_counter()
+    response = await client.get("/api/notes/", params=params)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000, response.json()
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine
+
+    start = time.perf_counter()
+    folder_ids = seed(args.notes, args.folders, args.body_size)
+    print(f"Seeded {args.notes} notes ({args.body_size} byte bodies) in {time.perf_counter() - start:.1f}s")
+    print_plan()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await timed_get(client, {"limit": args.limit})  # warm the pool and caches
+
+        first = [(await timed_get(client, {"limit": args.limit}))[0] for _ in range(args.repeat)]
+        print(f"First page ({args.limit} notes): p50={statistics.median(first):.2f} ms  "
+              f"p99={percentile(first, 99):.2f} ms")
+
+        folder = [
+            (await timed_get(client, {"limit": args.limit, "folder_id": str(folder_ids[0])}))[0]
+            for _ in range(args.repeat)
+        ]
+        print(f"First folder page: p50={statistics.median(folder):.2f} ms  p99={percentile(folder, 99):.2f} ms")
+
+        walk = []
+        seen = 0
+        cursor = None
+        while True:
+            params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+            elapsed, page = await timed_get(client, params)
+            walk.append(elapsed)
+            seen += len(page["notes"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        print(f"Cursor walk: {seen} notes in {len(walk)} pages, p50={statistics.median(walk):.2f} ms  "
+              f"p99={percentile(walk, 99):.2f} ms  last page={walk[-1]:.2f} ms")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20000)
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--body-size", type=int, default=8192)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        asyncio.run(main(args))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Autosave traffic: inline re-enrichment vs debounced, diff-aware re-enrichment
+
+--users students each type into their own note, autosaving every --interval
+seconds for --duration seconds and adding --words words per save. Against the
+offline stub provider (--latency seconds per call), two ways:
+
+  inline     the previous PUT /api/notes/{id}: every content save waits for a
+             fresh enrichment of the whole note (emulated here as the PUT plus
+             one enrich call)
+  debounced  PUT only flags notes that drifted past NOTE_REENRICH_SIMILARITY;
+             the background enricher runs once a note has been quiet for
+             NOTE_REENRICH_DEBOUNCE seconds
+
+and reports saves, model calls and PUT latency.
+
+    cd backend && python benchmarks/bench_note_autosave.py
+    cd backend && python benchmarks/bench_note_autosave.py --users 100 --words 40
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ["glycolysis", "pyruvate", "citrate", "oxaloacetate", "NADH", "electron", "gradient", "ATP",
+         "synthase", "membrane", "matrix", "cristae", "oxygen", "water", "proton", "enzyme"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def typist(client: httpx.AsyncClient, args, user: int, inline: bool, latencies: list):
+    from app.services.gemini_service import gemini_service
+
+    rng = random.Random(user)
+    words = [rng.choice(WORDS) for _ in range(args.initial_words)]
+    note = (await client.post("/api/notes/", json={"title": f"Lecture {user}", "content": " ".join(words)})).json()
+    deadline = time.perf_counter() + args.duration
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(args.interval * rng.uniform(0.8, 1.2))
+        words += [rng.choice(WORDS) for _ in range(args.words)]
+        start = time.perf_counter()
+        response = await client.put(f"/api/notes/{note['id']}", json={"content": " ".join(words)})
+        response.raise_for_status()
+        if inline:
+            await gemini_service.enrich(" ".join(words))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run(client: httpx.AsyncClient, args, inline: bool):
+    from app.core.config import settings
+    from app.services.llm import StubProvider
+    from app.services.gemini_service import gemini_service
+    from app.services.note_enrichment import note_enricher
+
+    gemini_service.provider = model = StubProvider(latency=args.latency)
+    latencies = []
+    if not inline:
+        await note_enricher.start()
+    await asyncio.gather(*[typist(client, args, user, inline, latencies) for user in range(args.users)])
+    if not inline:
+        # Let the last edits settle and be enriched
+        await asyncio.sleep(settings.NOTE_REENRICH_DEBOUNCE + 2 * settings.NOTE_REENRICH_POLL_INTERVAL + args.latency)
+        await note_enricher.stop()
+    # Creating each note costs one call in both modes; count the calls edits caused
+    calls = model.calls - args.users
+    label = "inline" if inline else "debounced"
+    print(f"{label:<10} {len(latencies):>6} {calls:>7} {statistics.median(latencies):>9.1f} "
+          f"{percentile(latencies, 99):>9.1f}")
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine, init_db
+
+    init_db()
+    print(f"{args.users} users saving every {args.interval:.1f}s for {args.duration:.0f}s, "
+          f"model latency {args.latency:.1f}s")
+    print(f"{'mode':<10} {'saves':>6} {'calls':>7} {'PUT p50':>9} {'PUT p99':>9}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for inline in (True, False):
+            await run(client, args, inline)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between autosaves")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds each user types")
+    parser.add_argument("--initial-words", type=int, default=300)
+    parser.add_argument("--words", type=int, default=8, help="words typed between saves")
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per stubbed model call")
+    parser.add_argument("--debounce", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        os.environ["AI_CACHE_ENABLED"] = "false"
+        os.environ["NOTE_REENRICH_DEBOUNCE"] = str(args.debounce)
+        os.environ["NOTE_REENRICH_POLL_INTERVAL"] = "0.5"
+        asyncio.run(main(args))
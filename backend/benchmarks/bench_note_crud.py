@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Note CRUD throughput: sync sessions vs the shared async session
+
+Runs the same create → read → update → delete cycle from many concurrent
+clients against two routers: the notes API as shipped (AsyncSession, pooled
+async engine) and a copy of the previous handlers that used a blocking
+SessionLocal inside async endpoints. AI enrichment hits the offline stub
+provider with a fixed latency, so no Gemini key or network is needed.
+
+The old update handler kept its connection checked out across the model call
+and blocked the event loop waiting for a free one, so with a default-sized
+pool it deadlocks once concurrent updates exceed the pool; the baseline gets
+one connection per client so it can finish at all.
+
+    cd backend && python benchmarks/bench_note_crud.py
+    cd backend && python benchmarks/bench_note_crud.py --clients 100 --cycles 20
+    cd backend && python benchmarks/bench_note_crud.py --database-url postgresql://localhost/afternote_bench
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_sync_app(pool_size: int):
+    """The notes endpoints as they were before the async session layer"""
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.api.notes import NoteCreate, NoteUpdate
+    from app.models.database import Note
+    from app.services.gemini_service import gemini_service
+    from app.services.vector_index import vector_store
+    from app.core.config import settings
+
+    engine = create_engine(
+        settings.DATABASE_URL,
+        pool_size=pool_size,
+        connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    )
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def owned(db, note_id):
+        note = db.query(Note).filter(Note.id == note_id, Note.owner_id == settings.DEMO_USER_ID).first()
+        if not note:
+            raise HTTPException(status_code=404, detail="Note not found")
+        return note
+
+    app = FastAPI()
+
+    @app.post("/api/notes/")
+    async def create_note(note: NoteCreate, db=Depends(get_db)):
+        db_note = Note(title=note.title, content=note.content, owner_id=settings.DEMO_USER_ID)
+        enrichment = await gemini_service.enrich(note.content)
+        db_note.ai_summary = enrichment["summary"]
+        db_note.ai_tags = enrichment["tags"]
+        db.add(db_note)
+        db.commit()
+        db.refresh(db_note)
+        await vector_store.index_note(db_note)
+        return {"id": str(db_note.id)}
+
+    @app.get("/api/notes/{note_id}")
+    async def get_note(note_id: str, db=Depends(get_db)):
+        note = owned(db, note_id)
+        return {"id": str(note.id), "title": note.title}
+
+    @app.put("/api/notes/{note_id}")
+    async def update_note(note_id: str, note_update: NoteUpdate, db=Depends(get_db)):
+        # The old handler held its transaction open across the model call
+        note = owned(db, note_id)
+        note.content = note_update.content
+        enrichment = await gemini_service.enrich(note_update.content)
+        note.ai_summary = enrichment["summary"]
+        db.commit()
+        db.refresh(note)
+        await vector_store.index_note(note)
+        return {"id": str(note.id)}
+
+    @app.delete("/api/notes/{note_id}")
+    async def delete_note(note_id: str, db=Depends(get_db)):
+        note = owned(db, note_id)
+        db.delete(note)
+        db.commit()
+        await vector_store.remove(settings.DEMO_USER_ID, "note", note_id)
+        return {"message": "Note deleted successfully"}
+
+    return app
+
+
+async def client_loop(client: httpx.AsyncClient, client_id: int, cycles: int, counter: list):
+    for cycle in range(cycles):
+        content = f"Client {client_id} cycle {cycle}: the Krebs cycle oxidises acetyl-CoA."
+        response = await client.post("/api/notes/", json={"title": f"Note {client_id}-{cycle}", "content": content})
+        response.raise_for_status()
+        note_id = response.json()["id"]
+        for request in (
+            client.get(f"/api/notes/{note_id}"),
+            client.get(f"/api/notes/{note_id}"),
+            client.put(f"/api/notes/{note_id}", json={"content": content + " Updated."}),
+            client.delete(f"/api/notes/{note_id}"),
+        ):
+            (await request).raise_for_status()
+        counter[0] += 5
+
+
+async def run(app, label: str, args):
+    transport = httpx.ASGITransport(app=app)
+    counter = [0]
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[client_loop(client, i, args.cycles, counter) for i in range(args.clients)])
+        elapsed = time.perf_counter() - start
+    print(f"{label:<6} {counter[0]:>7} requests in {elapsed:6.2f}s = {counter[0] / elapsed:8.1f} req/s")
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine, init_db
+    from app.services.gemini_service import gemini_service
+    from app.services.llm import StubProvider
+
+    init_db()
+    gemini_service.provider = StubProvider(latency=args.ai_latency)
+
+    print(f"{args.clients} clients x {args.cycles} cycles, stub AI latency {args.ai_latency * 1000:.0f} ms")
+    await run(build_sync_app(args.clients), "sync", args)
+    await run(app, "async", args)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument("--ai-latency", type=float, default=0.05, help="seconds per stub model call")
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        os.environ["AI_CACHE_ENABLED"] = "false"  # every enrichment pays the model latency
+        asyncio.run(main(args))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Prompt tokens sent for a long document, with and without the input budget
+
+Runs generate_summary, extract_key_concepts, generate_mindmap_data and
+generate_quiz over one long text against the offline stub provider (a fixed
+delay per call plus a per-token cost) in two configurations:
+
+  unbounded  AI_INPUT_TOKEN_BUDGET effectively off, the raw text in every prompt
+  budgeted   the default budget, long text map-reduced once and the condensed
+             pieces reused from the response cache by the later methods
+
+and reports model calls, prompt tokens sent, the largest single prompt and
+wall time.
+
+    cd backend && python benchmarks/bench_prompt_budget.py
+    cd backend && python benchmarks/bench_prompt_budget.py --tokens 1000000 --budget 16000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.gemini_service import gemini_service
+from app.services.llm import LLMResponse, StubProvider
+from app.services.prompt_budget import estimate_tokens
+
+
+class PrefillStubProvider(StubProvider):
+    """Stub whose latency also grows with prompt length, as a real model's does"""
+
+    def __init__(self, latency: float, per_million: float):
+        super().__init__(latency=latency)
+        self.per_million = per_million
+
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        await asyncio.sleep(estimate_tokens(prompt) * self.per_million / 1e6)
+        return await super().generate(prompt, task)
+
+
+def make_text(tokens: int) -> str:
+    rng = random.Random(3)
+    vocabulary = ["cell", "membrane", "protein", "enzyme", "mitochondria", "ATP", "gradient",
+                  "transport", "glucose", "respiration", "ribosome", "nucleus"]
+    sentences = []
+    length = 0
+    while length < tokens * settings.AI_CHARS_PER_TOKEN:
+        sentence = " ".join(rng.choice(vocabulary) for _ in range(14)).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+async def run(label: str, text: str, budget: int):
+    settings.AI_INPUT_TOKEN_BUDGET = budget
+    gemini_service.cache.clear()
+    gemini_service.usage.reset()
+    start = time.perf_counter()
+    await gemini_service.generate_summary(text)
+    await gemini_service.extract_key_concepts(text)
+    await gemini_service.generate_mindmap_data(text)
+    await gemini_service.generate_quiz(text)
+    elapsed = time.perf_counter() - start
+    stats = gemini_service.usage.stats()
+    largest = max(entry["max_tokens"] for entry in stats["methods"].values())
+    print(f"{label:<10} {stats['calls']:>6} {stats['tokens_sent']:>12} {largest:>10} {elapsed:>7.2f}")
+
+
+async def main(args):
+    text = make_text(args.tokens)
+    gemini_service.provider = PrefillStubProvider(args.latency, args.seconds_per_million)
+    print(f"~{estimate_tokens(text)} token document, budget {args.budget}, "
+          f"map pieces of {settings.AI_MAP_CHUNK_TOKENS} tokens")
+    print(f"{'mode':<10} {'calls':>6} {'tokens sent':>12} {'largest':>10} {'wall s':>7}")
+    await run("unbounded", text, 10**9)
+    await run("budgeted", text, args.budget)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400000, help="approximate document length in tokens")
+    parser.add_argument("--budget", type=int, default=settings.AI_INPUT_TOKEN_BUDGET)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds of fixed latency per stubbed call")
+    parser.add_argument("--seconds-per-million", type=float, default=10.0, help="stubbed cost of prompt tokens")
+    asyncio.run(main(parser.parse_args()))
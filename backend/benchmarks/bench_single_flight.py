@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Class-wide burst of identical mind map requests, with and without single-flight
+
+Sends --students concurrent POST /api/mindmaps/generate requests for the same
+content against the offline stub provider (--latency seconds per call, at most
+AI_MAX_CONCURRENCY calls in flight), starting from an empty response cache,
+once with AI_SINGLE_FLIGHT off and once on. Reports model calls, coalesced
+requests and request latency.
+
+    cd backend && python benchmarks/bench_single_flight.py
+    cd backend && python benchmarks/bench_single_flight.py --students 500 --latency 2
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.main import app
+from app.services.gemini_service import gemini_service
+from app.services.llm import StubProvider
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def burst(client: httpx.AsyncClient, students: int):
+    body = {"title": "Week 3", "content": "Glycolysis splits glucose into pyruvate, netting two ATP. " * 50}
+
+    async def request():
+        start = time.perf_counter()
+        response = await client.post("/api/mindmaps/generate", json=body)
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*[request() for _ in range(students)])
+
+
+async def main(args):
+    model = StubProvider(latency=args.latency)
+    gemini_service.provider = model
+    print(f"{args.students} students, model latency {args.latency:.1f}s, "
+          f"AI_MAX_CONCURRENCY={settings.AI_MAX_CONCURRENCY}")
+    print(f"{'single-flight':<14} {'calls':>6} {'coalesced':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for enabled in (False, True):
+            settings.AI_SINGLE_FLIGHT = enabled
+            gemini_service.cache.clear()
+            calls = model.calls
+            coalesced = gemini_service.single_flight.coalesced
+            samples = await burst(client, args.students)
+            print(f"{'on' if enabled else 'off':<14} {model.calls - calls:>6} "
+                  f"{gemini_service.single_flight.coalesced - coalesced:>10} "
+                  f"{statistics.median(samples):>9.1f} {percentile(samples, 99):>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds per stubbed model call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Concurrent SQLite writers: default pragmas vs production profile vs group commit
+
+Many coroutines save notes at once against a fresh database file in three
+configurations:
+
+  default  rollback journal, synchronous=FULL, one commit per save
+  tuned    WAL + the SQLITE_* pragmas from Settings, one commit per save
+  group    tuned pragmas, saves funnelled through the WriteQueue group committer
+
+Reports saves per second, commit latency percentiles and "database is locked"
+failures.
+
+    cd backend && python benchmarks/bench_sqlite_writers.py
+    cd backend && python benchmarks/bench_sqlite_writers.py --writers 200 --saves 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.models.database import Base, Note, apply_sqlite_pragmas
+from app.services.fulltext import create_fulltext_index
+from app.services.write_queue import WriteQueue
+
+MODES = ("default", "tuned", "group")
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def make_note(writer: int, save: int) -> Note:
+    return Note(
+        title=f"Lecture {writer}.{save}",
+        content=f"Writer {writer} save {save}: enzymes lower the activation energy of reactions. " * 8,
+        owner_id=settings.DEMO_USER_ID
+    )
+
+
+async def run_mode(mode: str, path: str, args):
+    tuned = mode != "default"
+    schema_engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        apply_sqlite_pragmas(schema_engine)
+    Base.metadata.create_all(schema_engine)
+    create_fulltext_index(schema_engine)
+    schema_engine.dispose()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=args.writers, max_overflow=0)
+    if tuned:
+        apply_sqlite_pragmas(engine.sync_engine)
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    queue = WriteQueue(sessions, settings.DB_GROUP_COMMIT_MAX, enabled=mode == "group")
+
+    latencies = []
+    failures = 0
+
+    async def writer(writer_id: int):
+        nonlocal failures
+        for save in range(args.saves):
+            note = make_note(writer_id, save)
+
+            async def insert(db):
+                db.add(note)
+
+            start = time.perf_counter()
+            try:
+                await queue.submit(insert)
+            except OperationalError:
+                failures += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[writer(i) for i in range(args.writers)])
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+
+    async with sessions() as db:
+        rows = (await db.execute(select(func.count(Note.id)))).scalar()
+    await engine.dispose()
+
+    commits = f"{queue.commits:>7}" if mode == "group" else f"{rows:>7}"
+    print(f"{mode:<8} {rows:>6} {rows / elapsed:>9.1f} {commits} "
+          f"{percentile(latencies, 50):>8.1f} {percentile(latencies, 99):>8.1f} {failures:>7}")
+
+
+async def main(args):
+    print(f"{args.writers} writers x {args.saves} saves")
+    print(f"{'mode':<8} {'saved':>6} {'saves/s':>9} {'commits':>7} {'p50 ms':>8} {'p99 ms':>8} {'locked':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes:
+            await run_mode(mode, os.path.join(workdir, f"{mode}.db"), args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=100)
+    parser.add_argument("--saves", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Time to first byte: buffered vs Server-Sent Events explanations
+
+Switches GeminiService to the offline stub provider, which takes
+--first-token seconds to start and then writes --tokens-per-second, and
+calls the ASGI app directly (httpx's ASGI transport buffers whole bodies) to
+time the first response body byte and the last one for
+
+  buffered  POST /api/ai/explain
+  streamed  POST /api/ai/explain/stream
+
+then reads the server-side time to first token from /api/ai/stream/stats.
+
+    cd backend && python benchmarks/bench_streaming.py
+    cd backend && python benchmarks/bench_streaming.py --requests 50 --tokens-per-second 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["AI_CACHE_ENABLED"] = "false"
+
+from app.main import app
+from app.services.gemini_service import gemini_service
+from app.services.llm import StubProvider
+from app.services.streaming import stream_stats
+
+
+async def call(path: str, body: dict):
+    """POST through the ASGI interface; returns (first body byte ms, complete ms)"""
+    payload = json.dumps(body).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json"), (b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    received = []
+    disconnect = asyncio.Event()
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    first = None
+    start = time.perf_counter()
+
+    async def send(message):
+        nonlocal first
+        if message["type"] == "http.response.body" and message.get("body") and first is None:
+            first = (time.perf_counter() - start) * 1000
+
+    await app(scope, receive, send)
+    disconnect.set()
+    return first, (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    gemini_service.provider = StubProvider(latency=args.first_token, tokens_per_second=args.tokens_per_second)
+    print(f"{args.requests} concurrent requests, first token after {args.first_token:.1f}s, "
+          f"{args.tokens_per_second:.0f} tokens/s after that")
+    print(f"{'mode':<9} {'first byte p50 ms':>18} {'complete p50 ms':>16}")
+    for label, path in (("buffered", "/api/ai/explain"), ("streamed", "/api/ai/explain/stream")):
+        results = await asyncio.gather(*[
+            call(path, {"concept": f"ATP synthase {i}"}) for i in range(args.requests)
+        ])
+        print(f"{label:<9} {statistics.median(r[0] for r in results):>18.1f} "
+              f"{statistics.median(r[1] for r in results):>16.1f}")
+    stats = stream_stats.stats()
+    print(f"server TTFT p50={stats['ttft_ms_p50']} ms p95={stats['ttft_ms_p95']} ms "
+          f"({stats['completed']} completed, {stats['cancelled']} cancelled)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--first-token", type=float, default=0.8, help="seconds before the stub's first chunk")
+    parser.add_argument("--tokens-per-second", type=float, default=25.0, help="stub output speed")
+    asyncio.run(main(parser.parse_args()))
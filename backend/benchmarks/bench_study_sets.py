@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Flashcard requests for one shared deck: model calls and latency
+
+Seeds one ready document, switches GeminiService to the offline stub
+provider answering after --model-latency, then sends a burst of concurrent
+POST /flashcards requests (a class opening the same deck at once) followed by
+a second burst once the set is stored. Before versioned study sets every request was its own
+generation; now the first burst should cost one model call and the second none.
+
+    cd backend && python benchmarks/bench_study_sets.py
+    cd backend && python benchmarks/bench_study_sets.py --students 500 --model-latency 3
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def seed() -> uuid.UUID:
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.models.database import Blob, Document, engine, init_db
+
+    init_db()
+    text = "Mitochondria produce ATP through oxidative phosphorylation. " * 400
+    sha256 = hashlib.sha256(text.encode()).hexdigest()
+    document_id = uuid.uuid4()
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Blob), [{
+            "sha256": sha256, "file_path": f"uploads/{sha256}.txt", "file_type": "text/plain",
+            "size": len(text), "status": "ready", "created_at": now, "extracted_text": text,
+        }])
+        connection.execute(insert(Document), [{
+            "id": document_id, "filename": f"{sha256}.txt", "original_filename": "lecture.txt",
+            "file_path": f"uploads/{sha256}.txt", "file_type": "text/plain", "file_size": len(text),
+            "content_hash": sha256, "owner_id": settings.DEMO_USER_ID, "status": "ready", "progress": 100,
+            "created_at": now, "updated_at": now,
+        }])
+    return document_id
+
+
+async def burst(client: httpx.AsyncClient, document_id: uuid.UUID, students: int):
+    async def request():
+        start = time.perf_counter()
+        response = await client.post(f"/api/documents/{document_id}/flashcards")
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000, response.json()["version"]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[request() for _ in range(students)])
+    return time.perf_counter() - start, [ms for ms, _ in results], {version for _, version in results}
+
+
+async def main(args):
+    from app.main import app
+    from app.models.database import async_engine
+    from app.services.gemini_service import gemini_service
+    from app.services.llm import StubProvider
+
+    document_id = seed()
+    model = StubProvider(latency=args.model_latency)
+    gemini_service.provider = model
+
+    print(f"{args.students} students, model latency {args.model_latency:.1f}s")
+    print(f"{'burst':<8} {'calls':>6} {'wall s':>7} {'p50 ms':>8} {'p99 ms':>8} {'versions':>9}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label in ("cold", "stored"):
+            calls = model.calls
+            elapsed, samples, versions = await burst(client, document_id, args.students)
+            print(f"{label:<8} {model.calls - calls:>6} {elapsed:>7.2f} {statistics.median(samples):>8.1f} "
+                  f"{percentile(samples, 99):>8.1f} {','.join(map(str, sorted(versions))):>9}")
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--model-latency", type=float, default=1.0, help="seconds per stubbed generation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Settings are read at import time, so point them at scratch storage first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+        os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+        os.environ["INGESTION_WORKERS"] = "0"
+        os.environ["AI_CACHE_ENABLED"] = "false"
+        asyncio.run(main(args))
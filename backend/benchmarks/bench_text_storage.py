@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Row size and query latency: inline document text vs deferred compressed blob text
+
+Builds two SQLite databases with the same documents:
+
+  before  the original layout, extracted_text stored inline on each documents row
+  after   the current models, metadata-only documents rows and the text compressed
+          (TEXT_COMPRESSION) at the end of the blobs row
+
+and reports average row size, file size and latency for a metadata lookup by
+id, a metadata scan of every row, and a full-text load as the quiz and
+flashcard endpoints do it.
+
+    cd backend && python benchmarks/bench_text_storage.py
+    cd backend && python benchmarks/bench_text_storage.py --documents 10000 --text-size 32768
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import (
+    Column, DateTime, Integer, JSON, MetaData, String, Table, Text, create_engine, func, insert, select
+)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.models.database import GUID, Base, Blob, Document, apply_sqlite_pragmas
+
+# The documents table as it was before text moved off the row
+legacy_metadata = MetaData()
+legacy_documents = Table(
+    "documents", legacy_metadata,
+    Column("id", GUID(), primary_key=True),
+    Column("filename", String, nullable=False),
+    Column("original_filename", String, nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("file_type", String, nullable=False),
+    Column("file_size", Integer),
+    Column("owner_id", GUID()),
+    Column("folder_id", GUID()),
+    Column("created_at", DateTime),
+    Column("extracted_text", Text),
+    Column("ai_summary", Text),
+    Column("ai_tags", JSON),
+    Column("ai_key_concepts", JSON),
+)
+
+
+def make_texts(count: int, size: int, rng: random.Random):
+    # Zipf-skewed vocabulary so the text compresses roughly like real prose
+    vocabulary = [
+        "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        for _ in range(5000)
+    ]
+    texts = []
+    for _ in range(count):
+        words = []
+        length = 0
+        while length < size:
+            word = vocabulary[min(int(rng.paretovariate(1.0)) - 1, len(vocabulary) - 1)]
+            words.append(word)
+            length += len(word) + 1
+        texts.append(" ".join(words)[:size])
+    return texts
+
+
+def seed(engine, layout: str, args):
+    rng = random.Random(7)
+    texts = make_texts(200, args.text_size, rng)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        for offset in range(0, args.documents, 1000):
+            documents = []
+            blobs = []
+            for i in range(offset, min(offset + 1000, args.documents)):
+                text = f"Document {i}. " + texts[i % len(texts)]
+                sha256 = hashlib.sha256(text.encode()).hexdigest()
+                row = {
+                    "id": uuid.UUID(int=i + 1),
+                    "filename": f"{sha256}.pdf",
+                    "original_filename": f"lecture-{i}.pdf",
+                    "file_path": f"uploads/{sha256}.pdf",
+                    "file_type": "application/pdf",
+                    "file_size": len(text) * 3,
+                    "owner_id": settings.DEMO_USER_ID,
+                    "created_at": now,
+                    "ai_summary": f"Summary of lecture {i} covering the main results.",
+                    "ai_tags": ["biology", "cells"],
+                    "ai_key_concepts": ["mitochondria", "ATP"],
+                }
+                if layout == "before":
+                    documents.append({**row, "extracted_text": text})
+                else:
+                    documents.append({**row, "content_hash": sha256, "updated_at": now, "status": "ready", "progress": 100})
+                    blobs.append({
+                        "sha256": sha256, "file_path": row["file_path"], "file_type": row["file_type"],
+                        "size": row["file_size"], "status": "ready", "created_at": now, "extracted_text": text,
+                        "ai_summary": row["ai_summary"], "ai_tags": row["ai_tags"], "ai_key_concepts": row["ai_key_concepts"],
+                    })
+            if blobs:
+                connection.execute(insert(Blob.__table__), blobs)
+            connection.execute(insert(legacy_documents if layout == "before" else Document.__table__), documents)
+
+
+def time_ms(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(engine, layout: str, args):
+    table = legacy_documents if layout == "before" else Document.__table__
+    rng = random.Random(1)
+    with engine.connect() as connection:
+        row_bytes = connection.execute(
+            select(func.avg(sum((func.coalesce(func.length(c), 0) for c in table.c), 0)))
+        ).scalar()
+        text_bytes = connection.execute(
+            select(func.avg(func.length(
+                table.c.extracted_text if layout == "before" else Blob.__table__.c.extracted_text
+            )))
+        ).scalar()
+
+        def lookup():
+            connection.execute(select(table).where(table.c.id == uuid.UUID(int=rng.randrange(args.documents) + 1))).one()
+
+        def scan():
+            connection.execute(select(table.c.original_filename, table.c.ai_summary)).all()
+
+        def load_text():
+            document_id = uuid.UUID(int=rng.randrange(args.documents) + 1)
+            if layout == "before":
+                query = select(table.c.extracted_text).where(table.c.id == document_id)
+            else:
+                query = select(Blob.extracted_text).join(Document, Document.content_hash == Blob.sha256).where(Document.id == document_id)
+            connection.execute(query).scalar_one()
+
+        lookup_ms = time_ms(lookup, 2000)
+        scan_ms = time_ms(scan, 20)
+        text_ms = time_ms(load_text, 2000)
+    file_mb = os.path.getsize(engine.url.database) / 2**20
+    print(f"{layout:<7} {row_bytes:>10.0f} {text_bytes:>10.0f} {file_mb:>8.1f} "
+          f"{lookup_ms:>10.3f} {scan_ms:>9.2f} {text_ms:>10.3f}")
+
+
+def main(args):
+    print(f"{args.documents} documents, ~{args.text_size} bytes of text each, compression={settings.TEXT_COMPRESSION}")
+    print(f"{'layout':<7} {'row bytes':>10} {'text bytes':>10} {'file MB':>8} "
+          f"{'lookup ms':>10} {'scan ms':>9} {'text ms':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for layout in ("before", "after"):
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, layout + '.db')}")
+            apply_sqlite_pragmas(engine)
+            (legacy_metadata if layout == "before" else Base.metadata).create_all(engine)
+            seed(engine, layout, args)
+            with engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            measure(engine, layout, args)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--text-size", type=int, default=16384, help="characters of extracted text per document")
+    main(parser.parse_args())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Peak memory of saving an upload
+
+Compares the streaming save_upload path with the old `await file.read()`
+approach across upload sizes. Peak is measured with tracemalloc, so it counts
+Python allocations made while saving, not the multipart parser's spool file.
+
+    cd backend && python benchmarks/bench_upload_memory.py
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from starlette.datastructures import UploadFile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.storage import save_upload
+
+
+async def save_in_memory(upload: UploadFile, dest_dir: str, filename: str):
+    with open(os.path.join(dest_dir, filename), "wb") as buffer:
+        content = await upload.read()
+        buffer.write(content)
+
+
+async def measure(save, source_path: str, dest_dir: str) -> int:
+    with open(source_path, "rb") as source:
+        upload = UploadFile(file=source, filename="upload.bin")
+        tracemalloc.start()
+        await save(upload, dest_dir, "upload.bin")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+async def main(sizes_mb):
+    settings.MAX_FILE_SIZE = max(sizes_mb) * 1024 * 1024
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'size':>8}  {'streaming peak':>15}  {'read() peak':>12}")
+        for size_mb in sizes_mb:
+            source_path = os.path.join(workdir, f"source-{size_mb}")
+            with open(source_path, "wb") as f:
+                for _ in range(size_mb):
+                    f.write(os.urandom(1024 * 1024))
+
+            streaming = await measure(save_upload, source_path, workdir)
+            in_memory = await measure(save_in_memory, source_path, workdir)
+            print(f"{size_mb:>6}MB  {streaming / 2**20:>13.2f}MB  {in_memory / 2**20:>10.2f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200], help="upload sizes in MB")
+    asyncio.run(main(parser.parse_args().sizes))
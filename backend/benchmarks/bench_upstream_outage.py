@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Model calls during an upstream outage: bare client vs rate limit, retry and breaker
+
+--clients coroutines each ask GeminiService for explanations in a loop for
+--duration seconds against the stub provider answering in --latency seconds,
+except during an outage window (--outage-start to --outage-end seconds)
+when every call fails with 503. Two configurations:
+
+  bare       one attempt per request, breaker effectively disabled (the old client)
+  resilient  the Settings defaults: token bucket, jittered retries, circuit breaker
+
+Reports upstream calls made during the outage, requests answered and failed,
+and how long after the outage ended the first request succeeded again.
+
+    cd backend && python benchmarks/bench_upstream_outage.py
+    cd backend && python benchmarks/bench_upstream_outage.py --clients 50 --duration 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["AI_CACHE_ENABLED"] = "false"
+
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings
+from app.services.gemini_service import gemini_service
+from app.services.llm import LLMResponse, StubProvider
+from app.services.resilience import AIError, CircuitBreaker, ResilientCaller, TokenBucket
+
+
+class OutageStubProvider(StubProvider):
+    """Stub that fails every call with 503 during the outage window"""
+
+    def __init__(self, args):
+        super().__init__(latency=args.latency)
+        self.args = args
+        self.started = time.monotonic()
+        self.outage_calls = 0
+
+    def down(self) -> bool:
+        elapsed = time.monotonic() - self.started
+        return self.args.outage_start <= elapsed < self.args.outage_end
+
+    async def generate(self, prompt: str, task: str) -> LLMResponse:
+        if self.down():
+            self.outage_calls += 1
+            await asyncio.sleep(self.args.latency / 4)
+            raise google_exceptions.ServiceUnavailable("model overloaded")
+        return await super().generate(prompt, task)
+
+
+def make_caller(mode: str) -> ResilientCaller:
+    if mode == "bare":
+        return ResilientCaller(
+            TokenBucket(rate=1e9, capacity=10**9), CircuitBreaker(threshold=10**9, reset_timeout=0),
+            attempts=1, base_delay=0, max_delay=0, max_wait=0
+        )
+    return ResilientCaller(
+        TokenBucket(settings.AI_RATE_LIMIT_RPM / 60, settings.AI_RATE_LIMIT_BURST),
+        CircuitBreaker(settings.AI_BREAKER_FAILURES, settings.AI_BREAKER_RESET),
+        attempts=settings.AI_RETRY_ATTEMPTS,
+        base_delay=settings.AI_RETRY_BASE_DELAY,
+        max_delay=settings.AI_RETRY_MAX_DELAY,
+        max_wait=settings.AI_RATE_LIMIT_MAX_WAIT
+    )
+
+
+async def run(mode: str, args):
+    model = OutageStubProvider(args)
+    gemini_service.provider = model
+    gemini_service.upstream = make_caller(mode)
+    answered = failed = 0
+    recovered_at = None
+    deadline = time.monotonic() + args.duration
+
+    async def client(i: int):
+        nonlocal answered, failed, recovered_at
+        n = 0
+        while time.monotonic() < deadline:
+            n += 1
+            try:
+                await gemini_service.explain_concept(f"concept {i}.{n}")
+            except AIError:
+                failed += 1
+                # A real client backs off briefly before asking again
+                await asyncio.sleep(args.think_time)
+                continue
+            answered += 1
+            elapsed = time.monotonic() - model.started
+            if recovered_at is None and elapsed >= args.outage_end:
+                recovered_at = elapsed - args.outage_end
+            await asyncio.sleep(args.think_time)
+
+    await asyncio.gather(*[client(i) for i in range(args.clients)])
+    recovery = f"{recovered_at:.2f}" if recovered_at is not None else "never"
+    print(f"{mode:<10} {model.outage_calls:>13} {answered:>9} {failed:>7} {recovery:>11}")
+
+
+async def main(args):
+    print(f"{args.clients} clients for {args.duration:.0f}s, upstream down from "
+          f"{args.outage_start:.0f}s to {args.outage_end:.0f}s, breaker resets after {settings.AI_BREAKER_RESET:.0f}s")
+    print(f"{'mode':<10} {'outage calls':>13} {'answered':>9} {'failed':>7} {'recovery s':>11}")
+    for mode in ("bare", "resilient"):
+        await run(mode, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=12.0)
+    parser.add_argument("--outage-start", type=float, default=2.0)
+    parser.add_argument("--outage-end", type=float, default=7.0)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per successful stubbed call")
+    parser.add_argument("--think-time", type=float, default=0.5, help="seconds a client waits between requests")
+    args = parser.parse_args()
+    # A short reset so recovery fits in the run
+    os.environ.setdefault("AI_BREAKER_RESET", "2")
+    settings.AI_BREAKER_RESET = float(os.environ["AI_BREAKER_RESET"])
+    asyncio.run(main(args))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Semantic search latency and recall
+
+Fills a temporary per-user vector index with synthetic chunks, then reports
+query latency (p50/p99) and recall@10 of the SimHash + re-rank search against
+exact brute-force cosine over the same vectors.
+
+    cd backend && python benchmarks/bench_vector_search.py --chunks 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.vector_index import HashingEmbedder, VectorIndex
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+
+def make_chunk(vocabulary, rng: random.Random, words: int = 120) -> str:
+    # Zipf-like skew so chunks share common terms the way real notes do
+    return " ".join(vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)] for _ in range(words))
+
+
+def main(args):
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(20000, rng)
+    rng.shuffle(vocabulary)
+    embedder = HashingEmbedder(settings.EMBEDDING_DIM)
+
+    with tempfile.TemporaryDirectory() as root:
+        index = VectorIndex(root, embedder, settings.VECTOR_CODE_BITS)
+        texts = [make_chunk(vocabulary, rng) for _ in range(args.chunks)]
+
+        start = time.perf_counter()
+        batch = 1000
+        for i in range(0, len(texts), batch):
+            index.add("document", f"doc-{i // batch}", texts[i:i + batch])
+        build = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root))
+        print(f"Indexed {len(index)} chunks in {build:.1f}s ({size / 2**20:.1f}MB on disk)")
+
+        queries = [" ".join(rng.sample(texts[rng.randrange(len(texts))].split(), 6)) for _ in range(args.queries)]
+        exact_vectors = np.asarray(index.vectors, dtype=np.float32)
+
+        latencies = []
+        recalls = []
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, 10, settings.VECTOR_RERANK_CANDIDATES)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            scores = exact_vectors @ embedder.embed(query)
+            exact = set(np.argsort(-scores)[:10].tolist())
+            found = {
+                int(item_id.split("-")[1]) * batch + chunk
+                for _, item_id, chunk, _ in hits
+            }
+            recalls.append(len(found & exact) / 10)
+
+        latencies.sort()
+        print(f"Search over {len(index)} chunks: p50={statistics.median(latencies):.2f} ms  "
+              f"p99={latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+        print(f"recall@10 vs exact cosine: {statistics.mean(recalls):.3f}")
+
+        start = time.perf_counter()
+        index.delete("document", "doc-0")
+        index.add("document", "doc-0", texts[:batch])
+        print(f"Incremental delete + re-add of {batch} chunks: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    main(parser.parse_args())
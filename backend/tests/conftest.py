@@ -0,0 +1,41 @@
+"""
+Shared fixtures: the backend app on scratch storage with the offline model stub
+
+    cd backend && python -m pytest tests
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import httpx
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="afternote-tests-")
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+
+# Settings are read at import time, so point them at scratch storage first
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(_workdir, "vector_index")
+os.environ["UPLOAD_DIR"] = os.path.join(_workdir, "uploads")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["INGESTION_WORKERS"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    """An HTTP client for the app, with its startup and shutdown hooks run around the test"""
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
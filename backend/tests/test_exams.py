@@ -0,0 +1,155 @@
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.models.database import AsyncSessionLocal, Exam
+from app.services.exams import UNANSWERED, assemble, clean_question, grade, question_stats, response_vector
+from app.services.resilience import AIBadResponse
+
+pytestmark = pytest.mark.anyio
+
+
+def question(text, answer=0, options=("alpha", "beta", "gamma", "delta")):
+    return {"question": text, "options": list(options), "correct_answer": answer, "explanation": f"Because {text}"}
+
+
+@pytest.mark.parametrize("raw", [
+    None,
+    {"question": "Q", "options": ["only one"], "correct_answer": 0},
+    {"question": "Q", "options": ["a", "b"], "correct_answer": 2},
+    {"question": "Q", "options": ["a", "b"], "correct_answer": True},
+    {"question": "Q", "options": ["a", 2], "correct_answer": 0},
+    {"options": ["a", "b"], "correct_answer": 0},
+])
+def test_ungradable_questions_are_dropped(raw):
+    assert clean_question(raw) is None
+
+
+def test_clean_question_strips_and_keeps_the_key():
+    cleaned = clean_question({"question": " Q? ", "options": [" a ", "b"], "correct_answer": 1, "explanation": 3})
+    assert cleaned == {"question": "Q?", "options": ["a", "b"], "correct_answer": 1, "explanation": None}
+
+
+def test_assemble_is_deterministic_and_keeps_the_key_on_the_right_option():
+    banks = [[question(f"note {i}", answer=i % 4) for i in range(6)], [question(f"doc {i}", answer=3) for i in range(6)]]
+    first = assemble(banks, 8, seed=42)
+    assert first == assemble(banks, 8, seed=42)
+    assert [q["id"] for q in first] == list(range(1, 9))
+
+    originals = {q["question"]: q for bank in banks for q in bank}
+    for drawn in first:
+        original = originals[drawn["question"]]
+        assert sorted(drawn["options"]) == sorted(original["options"])
+        assert drawn["options"][drawn["correct_answer"]] == original["options"][original["correct_answer"]]
+    # Round-robin: both banks contribute equally
+    assert sum(q["question"].startswith("note") for q in first) == 4
+
+
+def test_assemble_skips_repeats_and_stops_when_banks_run_out():
+    banks = [[question("Same question"), question("Other")], [question("same QUESTION")]]
+    drawn = assemble(banks, 10, seed=1)
+    assert sorted(q["question"].lower() for q in drawn) == ["other", "same question"]
+
+    with pytest.raises(AIBadResponse):
+        assemble([[], []], 5, seed=1)
+
+
+def test_response_vector_ignores_invalid_answers():
+    responses = response_vector({"1": 2, "3": "1", "4": 9, "0": 1, "9": 0, "x": 1, "2": None}, 4)
+    assert responses.tolist() == [2, UNANSWERED, 1, 9]
+
+
+def test_grade_per_attempt():
+    key = np.array([0, 1, 2], dtype=np.int16)
+    responses = np.array([[0, 1, 2], [1, 1, UNANSWERED]], dtype=np.int16)
+    assert grade(key, responses).tolist() == [[True, True, True], [False, True, False]]
+
+
+def test_question_stats():
+    key = np.array([0, 1, 2, 1], dtype=np.int16)
+    option_counts = np.array([2, 3, 3, 2], dtype=np.int16)
+    responses = np.array([
+        [0, 1, 2, 1],
+        [1, 1, UNANSWERED, 1],
+        [0, 2, 0, 1],
+        [UNANSWERED, 1, 0, 1],
+    ], dtype=np.int16)
+    stats = question_stats(key, option_counts, responses)
+
+    assert stats["accuracy"].tolist() == [0.5, 0.75, 0.25, 1.0]
+    assert stats["skip_rate"].tolist() == [0.25, 0.0, 0.25, 0.0]
+    assert stats["picks"].tolist() == [[2, 1, 0], [0, 3, 1], [2, 0, 1], [0, 4, 0]]
+    assert stats["common_wrong"].tolist() == [1, 2, 0, -1]
+
+    # Item-rest correlation, as np.corrcoef computes it; undefined without spread
+    right = (responses == key).astype(float)
+    rest = right.sum(axis=1, keepdims=True) - right
+    for i in range(3):
+        assert stats["discrimination"][i] == pytest.approx(np.corrcoef(right[:, i], rest[:, i])[0, 1])
+    assert np.isnan(stats["discrimination"][3])
+
+
+async def stored_exam(exam_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Exam).where(Exam.id == uuid.UUID(exam_id)))).scalar_one()
+
+
+async def test_generate_submit_and_aggregate(client):
+    response = await client.post("/api/notes/", json={
+        "title": "Cells",
+        "content": "\n\n".join(
+            f"The mitochondria{i} produces energy for the cell{i} through respiration{i}." for i in range(12)
+        )
+    })
+    assert response.status_code == 200
+    note_id = response.json()["id"]
+
+    response = await client.post("/api/exams/generate", json={"subject": "Biology", "note_ids": [note_id], "question_count": 4})
+    assert response.status_code == 200
+    exam = response.json()
+    count = exam["question_count"]
+    assert count >= 2
+    assert all("correct_answer" not in q for q in exam["questions"])
+    key = (await stored_exam(exam["id"])).answers
+
+    # All right, then the first question wrong and the second skipped
+    perfect = await client.post(f"/api/exams/{exam['id']}/submit", json={
+        "answers": {str(i + 1): answer for i, answer in enumerate(key)}
+    })
+    assert perfect.status_code == 200
+    assert perfect.json()["score"] == 100.0
+    assert perfect.json()["correct"] == count
+
+    answers = {str(i + 1): answer for i, answer in enumerate(key)}
+    answers["1"] = (key[0] + 1) % len(exam["questions"][0]["options"])
+    answers["2"] = None
+    partial = (await client.post(f"/api/exams/{exam['id']}/submit", json={"answers": answers})).json()
+    assert partial["correct"] == count - 2
+    assert partial["score"] == round(100 * (count - 2) / count, 2)
+    assert [r["correct"] for r in partial["results"][:2]] == [False, False]
+    assert partial["results"][1]["answer"] is None
+    assert [r["correct_answer"] for r in partial["results"]] == key
+
+    attempts = (await client.get(f"/api/exams/{exam['id']}/attempts")).json()
+    assert sorted(a["score"] for a in attempts) == sorted([100.0, partial["score"]])
+    summary = next(e for e in (await client.get("/api/exams/")).json() if e["id"] == exam["id"])
+    assert summary["attempts"] == 2
+    assert summary["best_score"] == 100.0
+
+    analytics = (await client.get(f"/api/exams/{exam['id']}/analytics")).json()
+    assert analytics["attempts"] == 2
+    assert analytics["mean_score"] == round((100.0 + partial["score"]) / 2, 2)
+    first, second = analytics["questions"][:2]
+    assert first["accuracy"] == 0.5
+    assert first["common_wrong_answer"] == int(answers["1"])
+    assert second["skip_rate"] == 0.5
+    assert sum(second["answer_counts"]) == 1
+
+
+async def test_submitting_to_an_unknown_exam_is_a_404(client):
+    response = await client.post(f"/api/exams/{uuid.uuid4()}/submit", json={"answers": {}})
+    assert response.status_code == 404
+    response = await client.post("/api/exams/not-an-id/submit", json={"answers": {}})
+    assert response.status_code == 404
@@ -0,0 +1,124 @@
+import random
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.database import AsyncSessionLocal, Note
+from app.services.gemini_service import gemini_service
+from app.services.note_enrichment import content_signature, needs_enrichment, note_enricher, similarity
+
+pytestmark = pytest.mark.anyio
+
+VOCABULARY = [f"term{i}" for i in range(5000)]
+
+
+def text(words=240, seed=3):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def edit(content, fraction, seed=5):
+    """Replace a contiguous run of about fraction of the words, somewhere chosen by seed"""
+    words = content.split()
+    count = max(int(len(words) * fraction), 1)
+    rng = random.Random(seed)
+    start = rng.randrange(len(words) - count)
+    words[start:start + count] = [rng.choice(VOCABULARY) for _ in range(count)]
+    return " ".join(words)
+
+
+def jaccard(a, b):
+    def shingles(content):
+        words = content.split()
+        return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_signature_shape():
+    signature = content_signature(text())
+    assert len(signature) == settings.NOTE_MINHASH_PERMUTATIONS
+    assert signature == content_signature(text())
+    assert content_signature("") == []
+    assert similarity(content_signature(""), content_signature("  ")) == 1.0
+
+
+@pytest.mark.parametrize("fraction", [0.02, 0.1, 0.3, 0.6])
+def test_similarity_estimates_shingle_overlap(fraction):
+    original = text()
+    edited = edit(original, fraction)
+    # Standard error of a 64-permutation estimate is at most 1/16
+    assert similarity(content_signature(original), content_signature(edited)) == pytest.approx(
+        jaccard(original, edited), abs=0.15
+    )
+
+
+def test_threshold():
+    original = text()
+    signature = content_signature(original)
+    assert not needs_enrichment(signature, original)
+    assert not needs_enrichment(signature, edit(original, 0.01))
+    assert needs_enrichment(signature, edit(original, 0.3))
+    assert needs_enrichment(signature, text(seed=4))
+    # Never enriched, or enriched before signatures were kept
+    assert needs_enrichment(None, original)
+
+
+async def note_state(note_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(Note.ai_dirty_at, Note.ai_signature).where(Note.id == uuid.UUID(note_id))
+        )).one()
+
+
+async def test_small_edits_add_up_to_one_re_enrichment(client, monkeypatch):
+    # Driven by hand below rather than by the polling task
+    await note_enricher.stop()
+    monkeypatch.setattr(settings, "NOTE_REENRICH_DEBOUNCE", 0.0)
+
+    original = text()
+    response = await client.post("/api/notes/", json={"title": "Drift", "content": original})
+    note_id = response.json()["id"]
+    dirty_at, signature = await note_state(note_id)
+    assert dirty_at is None and signature == content_signature(original)
+
+    # Each edit is small, but they are measured against the enriched text, so they accumulate
+    content, flagged_after = original, None
+    for step in range(1, 30):
+        content = edit(content, 0.02, seed=step)
+        assert (await client.put(f"/api/notes/{note_id}", json={"content": content})).status_code == 200
+        if (await note_state(note_id))[0] is not None:
+            flagged_after = step
+            break
+    assert flagged_after is not None and flagged_after > 1
+    assert needs_enrichment(signature, content)
+
+    calls = gemini_service.provider.calls
+    enriched = note_enricher.enriched
+    assert await note_enricher.run_once() >= 1
+    assert note_enricher.enriched == enriched + 1
+    assert gemini_service.provider.calls == calls + 1
+    dirty_at, signature = await note_state(note_id)
+    assert dirty_at is None and signature == content_signature(content)
+
+
+async def test_edits_that_were_undone_cost_no_model_call(client, monkeypatch):
+    await note_enricher.stop()
+    monkeypatch.setattr(settings, "NOTE_REENRICH_DEBOUNCE", 0.0)
+
+    original = text(seed=8)
+    note_id = (await client.post("/api/notes/", json={"title": "Undo", "content": original})).json()["id"]
+    await client.put(f"/api/notes/{note_id}", json={"content": text(seed=9)})
+    assert (await note_state(note_id))[0] is not None
+    # Saving again while flagged keeps the flag, even though this content is back where it was
+    await client.put(f"/api/notes/{note_id}", json={"content": original})
+    assert (await note_state(note_id))[0] is not None
+
+    calls, skipped = gemini_service.provider.calls, note_enricher.skipped
+    await note_enricher.run_once()
+    assert note_enricher.skipped == skipped + 1
+    assert gemini_service.provider.calls == calls
+    dirty_at, signature = await note_state(note_id)
+    assert dirty_at is None and signature == content_signature(original)
@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.api.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.models.database import Document, Folder, Note, engine
+
+pytestmark = pytest.mark.anyio
+
+
+def seed_folder():
+    """A folder of its own per test, so listings filtered to it see only that test's rows"""
+    folder_id = uuid.uuid4()
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Folder), [{
+            "id": folder_id, "name": "Pages", "owner_id": settings.DEMO_USER_ID, "path": f"/{folder_id}/",
+            "depth": 0, "created_at": now, "updated_at": now,
+        }])
+    return folder_id
+
+
+def timestamps():
+    """Seven update times where four items tie, so the id alone must order them"""
+    base = datetime(2024, 3, 1, 12, 0, 0, 123456)
+    return [base + timedelta(minutes=2), base, base, base, base, base - timedelta(minutes=1), base + timedelta(minutes=1)]
+
+
+def newest_first(rows):
+    return [str(item_id) for updated_at, item_id in sorted(rows, key=lambda row: (row[0], row[1]), reverse=True)]
+
+
+async def page_through(client, url, folder_id, key, limit):
+    seen, cursor = [], None
+    while True:
+        params = {"folder_id": str(folder_id), "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page[key]) <= limit
+        seen += [item["id"] for item in page[key]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip():
+    updated_at, item_id = datetime(2024, 3, 1, 12, 0, 0, 123456), uuid.uuid4()
+    cursor = encode_cursor(updated_at, item_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (updated_at, item_id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(datetime(2024, 1, 1), "nope"), "W10"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+async def test_notes_page_through_ties(client):
+    folder_id = seed_folder()
+    rows = [(updated_at, uuid.uuid4()) for updated_at in timestamps()]
+    with engine.begin() as connection:
+        # Core inserts skip the ORM search-index hooks, which listing does not need
+        connection.execute(insert(Note), [{
+            "id": item_id, "title": f"Note {i}", "content": "body", "owner_id": settings.DEMO_USER_ID,
+            "folder_id": folder_id, "created_at": updated_at, "updated_at": updated_at,
+        } for i, (updated_at, item_id) in enumerate(rows)])
+
+    for limit in (1, 2, 3, 7, 50):
+        assert await page_through(client, "/api/notes/", folder_id, "notes", limit) == newest_first(rows)
+
+
+async def test_documents_page_through_ties(client):
+    folder_id = seed_folder()
+    rows = [(updated_at, uuid.uuid4()) for updated_at in timestamps()]
+    with engine.begin() as connection:
+        connection.execute(insert(Document), [{
+            "id": item_id, "filename": f"{i}.txt", "original_filename": f"{i}.txt", "file_path": f"uploads/{i}.txt",
+            "file_type": "text/plain", "file_size": 1, "owner_id": settings.DEMO_USER_ID, "folder_id": folder_id,
+            "status": "ready", "progress": 100, "created_at": updated_at, "updated_at": updated_at,
+        } for i, (updated_at, item_id) in enumerate(rows)])
+
+    for limit in (1, 2, 3, 7, 50):
+        assert await page_through(client, "/api/documents/", folder_id, "documents", limit) == newest_first(rows)
+
+
+async def test_invalid_cursor_is_a_400(client):
+    response = await client.get("/api/notes/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+AfterNote Ingestion Worker
+Runs document ingestion jobs in a separate process. Set INGESTION_WORKERS=0
+on the API server when using this so uploads are only processed here.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.models.database import init_db
+from app.services.ingestion import ingestion_queue
+
+async def main(workers: int):
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    init_db()
+    await ingestion_queue.start(workers)
+    await ingestion_queue.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run AfterNote document ingestion workers")
+    parser.add_argument("--workers", type=int, default=4, help="number of concurrent jobs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.workers))